@@ -3,6 +3,9 @@ from dotenv import load_dotenv
 from pyairtable import Api
 from .customresponse import CustomResponse
 from RikPy.commonfunctions import rfplogger
+from .commonlogging import configure_logger
+
+logger = configure_logger(__name__)
 
 ### AIRTABLE CREDENTIALS
 load_dotenv()  
@@ -40,7 +43,7 @@ def airtable_update_filtered_rows(table_name, filter_formula, data):
         
     except Exception as e:
         message = f"Failed to update data: {e}"
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=400)
 
 def airtable_fetch_filtered_rows(table_name, filter_formula="", fields="", exclude_fields=[]):
@@ -81,7 +84,7 @@ def airtable_fetch_filtered_rows(table_name, filter_formula="", fields="", exclu
 
     except Exception as e:
         message = f"Failed to fetch data: {e}"
-        print(message)
+        logger.error(message)
         return CustomResponse (data=message, status_code=400)
 
 def airtable_delete_filtered_rows(table_name, filter_formula=""):
@@ -109,13 +112,13 @@ def airtable_delete_filtered_rows(table_name, filter_formula=""):
         for record in records_to_delete:
             table.delete(record['id'])
         
-        print(f"--- Deleted {len(records_to_delete)} records matching the filter formula.")
+        logger.info(f"--- Deleted {len(records_to_delete)} records matching the filter formula.")
 
         return CustomResponse(data=records_to_delete, status_code=200)
 
     except Exception as e:
         message = f"Failed to delete data: {e}"
-        print(message)
+        logger.error(message)
         return CustomResponse (data=message, status_code=400)
 
 def airtable_insert_row(table_name, data):
@@ -148,7 +151,7 @@ def airtable_insert_row(table_name, data):
         
     except Exception as e:
         message = (f"An error occurred: {e}")
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=400)
 
 def airtable_update_row(table_name, record_id, data):
@@ -183,7 +186,7 @@ def airtable_update_row(table_name, record_id, data):
         
     except Exception as e:
         message = (f"An error occurred: {e}")
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=400)
 
 def airtable_fetch_specific_row(table_name, record_id, exclude_fields=[]):
@@ -218,7 +221,7 @@ def airtable_fetch_specific_row(table_name, record_id, exclude_fields=[]):
 
     except Exception as e:
         message = f"Failed to fetch data: {e}"
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=400)
 
 def airtable_fetch_record_id_by_key(table_name, key_column, key_value):
@@ -252,7 +255,7 @@ def airtable_fetch_record_id_by_key(table_name, key_column, key_value):
 
     except Exception as e:
         message = f"Failed to fetch record ID: {e}"
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=400)
 
 ###### ONLY FOR TEST PURPOSES
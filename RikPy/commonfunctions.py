@@ -1,4 +1,12 @@
 import os
+import sys
+import atexit
+import queue
+import threading
+import json
+import shutil
+import hashlib
+import tempfile
 import requests
 import datetime
 import inspect
@@ -11,13 +19,89 @@ from urllib.parse import urlparse
 from datetime import date
 from dotenv import load_dotenv
 from .customresponse import CustomResponse
+from .commonlogging import configure_logger
+
+logger = configure_logger(__name__)
+
+RFPLOGGER_FILE = "logfile.txt"
+RFPLOGGER_BATCH_SIZE = 1000
+# Lines waiting for the writer thread, past this rfplogger writes synchronously
+RFPLOGGER_QUEUE_SIZE = 10000
+
+# Local cache for remote assets (S3 / Shopify CDN images), least recently used files are evicted above the size limit
+ASSET_CACHE_DIR = os.getenv("RIKPY_ASSET_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "RikPy", "assets"))
+ASSET_CACHE_MAX_BYTES = int(os.getenv("RIKPY_ASSET_CACHE_MAX_MB", "1024")) * 1024 * 1024
+
+_asset_cache = None
+_asset_cache_lock = threading.Lock()
+
+_rfplogger_queue = queue.Queue(maxsize=RFPLOGGER_QUEUE_SIZE)
+_rfplogger_thread = None
+_rfplogger_lock = threading.Lock()
+
+def _rfplogger_write(log_path, entries):
+    with open(log_path, "a", encoding='utf-8') as log_file:
+        log_file.write("".join(entries))
+
+def _rfplogger_writer(log_path):
+    # Keeps the log file open and writes whatever is queued in one go, flushing once per batch
+    with open(log_path, "a", encoding='utf-8') as log_file:
+        while True:
+            entries = [_rfplogger_queue.get()]
+            while len(entries) < RFPLOGGER_BATCH_SIZE:
+                try:
+                    entries.append(_rfplogger_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                log_file.write("".join(entry for entry in entries if entry is not None))
+                log_file.flush()
+            finally:
+                for _ in entries:
+                    _rfplogger_queue.task_done()
+            if None in entries:
+                return
+
+def _rfplogger_start():
+    # (Re)starts the writer when it is missing or has died, e.g. after a failed write
+    global _rfplogger_thread
+    with _rfplogger_lock:
+        if _rfplogger_thread is None or not _rfplogger_thread.is_alive():
+            _rfplogger_thread = threading.Thread(target=_rfplogger_writer, args=(os.path.abspath(RFPLOGGER_FILE),), name="rfplogger", daemon=True)
+            _rfplogger_thread.start()
+
+def _rfplogger_stop():
+    if _rfplogger_thread is not None and _rfplogger_thread.is_alive():
+        _rfplogger_queue.put(None)
+        _rfplogger_thread.join(timeout=5)
+
+def _rfplogger_after_fork():
+    # The writer thread does not survive a fork and the lock may be held, start the child clean
+    global _rfplogger_queue, _rfplogger_thread, _rfplogger_lock
+    _rfplogger_queue = queue.Queue(maxsize=RFPLOGGER_QUEUE_SIZE)
+    _rfplogger_thread = None
+    _rfplogger_lock = threading.Lock()
+
+atexit.register(_rfplogger_stop)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_rfplogger_after_fork)
+
+def rfplogger_flush():
+    '''Blocks until every queued log line has been written to the log file'''
+    if _rfplogger_thread is not None and _rfplogger_thread.is_alive():
+        _rfplogger_queue.join()
 
 def rfplogger(log_message):
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    calling_module = inspect.getframeinfo(inspect.currentframe().f_back).function
-    log_entry = f"{timestamp} - {calling_module}: {log_message}\n"
-    with open("logfile.txt", "a", encoding='utf-8') as log_file:
-        log_file.write(log_entry)
+    calling_module = sys._getframe(1).f_code.co_name
+    entry = f"{timestamp} - {calling_module}: {log_message}\n"
+
+    _rfplogger_start()
+    try:
+        _rfplogger_queue.put_nowait(entry)
+    except queue.Full:
+        # The writer is behind, write this line ourselves rather than let the queue grow
+        _rfplogger_write(os.path.abspath(RFPLOGGER_FILE), [entry])
 
 def extract_file_extension(file_url):
     # Parse the URL to handle both formats
@@ -34,8 +118,115 @@ def extract_file_extension(file_url):
 
     return file_extension
 
-def download_file_local(url):
+class AssetCache:
+    '''
+    On-disk cache of downloaded urls. Each entry is a data file plus a small .meta.json sidecar with the
+    ETag/Last-Modified used to revalidate it (If-None-Match / If-Modified-Since), so a 304 costs no body.
+    Files are written to a temp file and renamed into place, and a hit refreshes the file mtime,
+    which is what the LRU eviction sorts on.
+    '''
+    # Not plain .json, a cached url ending in .json would share its sidecar's path
+    META_SUFFIX = '.meta.json'
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or ASSET_CACHE_DIR
+        self.max_bytes = ASSET_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        extension = os.path.splitext(urlparse(url).path)[1][:10]
+        data_path = os.path.join(self.directory, key + extension)
+        return data_path, os.path.join(self.directory, key + self.META_SUFFIX)
+
+    def get(self, url, revalidate=True, timeout=60):
+        '''Returns the local path of url, downloading it only when missing or changed'''
+        data_path, meta_path = self._paths(url)
+        meta = {}
+        if os.path.exists(data_path):
+            try:
+                with open(meta_path, 'r') as file:
+                    meta = json.load(file)
+            except (FileNotFoundError, ValueError):
+                meta = {}
+            if not revalidate:
+                os.utime(data_path)
+                return data_path
+
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        with requests.get(url, headers=headers, stream=True, timeout=timeout) as r:
+            if r.status_code == 304 and os.path.exists(data_path):
+                os.utime(data_path)
+                return data_path
+            r.raise_for_status()
+            file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+            try:
+                with os.fdopen(file_descriptor, 'wb') as f:
+                    for chunk in r.iter_content(chunk_size=65536):
+                        f.write(chunk)
+                os.replace(temp_path, data_path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            meta = {'url': url, 'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified')}
+
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        with os.fdopen(file_descriptor, 'w') as file:
+            json.dump(meta, file)
+        os.replace(temp_path, meta_path)
+
+        self.evict(keep=data_path)
+        return data_path
+
+    def evict(self, keep=None):
+        '''Removes the least recently used entries until the cache fits in max_bytes'''
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.endswith((self.META_SUFFIX, '.part')):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                for stale in (path, os.path.splitext(path)[0] + self.META_SUFFIX):
+                    try:
+                        os.remove(stale)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+def get_asset_cache():
+    global _asset_cache
+    if _asset_cache is None:
+        with _asset_cache_lock:
+            if _asset_cache is None:
+                _asset_cache = AssetCache()
+    return _asset_cache
+
+def download_cached(url, local_filename):
+    '''Copies url from the asset cache to local_filename, callers may delete their copy as before'''
+    shutil.copyfile(get_asset_cache().get(url), local_filename)
+    return local_filename
+
+def download_file_local(url, use_cache=False):
     local_filename = url.split('/')[-1]
+    if use_cache:
+        return download_cached(url, local_filename)
     with requests.get(url, stream=True) as r:
         r.raise_for_status()
         with open(local_filename, 'wb') as f:
@@ -43,10 +234,7 @@ def download_file_local(url):
                 f.write(chunk)
     return local_filename
 
-def download_file_local_with_query_parameters(file_url, generate_random_filename=False):
-    response = requests.get(file_url)
-    response.raise_for_status()  # Raise an error for bad responses
-
+def download_file_local_with_query_parameters(file_url, generate_random_filename=False, use_cache=False):
     # Extract the path from the URL without query parameters
     parsed_url = urlparse(file_url)
     original_filename = os.path.basename(parsed_url.path)
@@ -58,6 +246,12 @@ def download_file_local_with_query_parameters(file_url, generate_random_filename
     else:
         file_name = original_filename
 
+    if use_cache:
+        return download_cached(file_url, file_name)
+
+    response = requests.get(file_url)
+    response.raise_for_status()  # Raise an error for bad responses
+
     # file_name = os.path.basename(parsed_url.path)
     with open(file_name, 'wb') as file:
         file.write(response.content)
@@ -77,13 +271,20 @@ def delete_local_file(file_name):
     except Exception as e:
         return f"An error occurred while deleting the file: {e}"
 
-def download_image(image_url, local_file_path):
+def download_image(image_url, local_file_path, use_cache=False):
+    if use_cache:
+        try:
+            download_cached(image_url, local_file_path)
+        except requests.RequestException as e:
+            logger.error(f"Failed to download image: {e}")
+        return
+
     response = requests.get(image_url)
     if response.status_code == 200:
         with open(local_file_path, 'wb') as file:
             file.write(response.content)
     else:
-        print(f"Failed to download image. Status code: {response.status_code}")
+        logger.error(f"Failed to download image. Status code: {response.status_code}")
 
     return
 
@@ -137,6 +338,7 @@ def send_email(email_type="info", email_message="Message", originator="", attach
         
         error_msg = f"Missing required environment variables: {', '.join(missing_vars)}"
         rfplogger(error_msg)
+        logger.error(error_msg)
         return CustomResponse(data=error_msg, status_code=400)
 
     # Validate and convert port to integer
@@ -145,6 +347,7 @@ def send_email(email_type="info", email_message="Message", originator="", attach
     except (ValueError, TypeError):
         error_msg = f"Invalid SMTP_PORT: {smtp_port}. Must be a valid integer."
         rfplogger(error_msg)
+        logger.error(error_msg)
         return CustomResponse(data=error_msg, status_code=400)
 
     # Handle multiple recipients
@@ -160,6 +363,7 @@ def send_email(email_type="info", email_message="Message", originator="", attach
     except ValueError as e:
         error_msg = f"Invalid email_recipient: {e}"
         rfplogger(error_msg)
+        logger.error(error_msg)
         return CustomResponse(data=error_msg, status_code=400)
 
     # Validate recipients
@@ -167,12 +371,14 @@ def send_email(email_type="info", email_message="Message", originator="", attach
         if not recipient or '@' not in recipient:
             error_msg = f"Invalid email recipient: {recipient}"
             rfplogger(error_msg)
+            logger.error(error_msg)
             return CustomResponse(data=error_msg, status_code=400)
     
     # Validate HTML message if provided
     if email_html_message and not isinstance(email_html_message, str):
         error_msg = "email_html_message must be a string"
         rfplogger(error_msg)
+        logger.error(error_msg)
         return CustomResponse(data=error_msg, status_code=400)
 
     # Retry logic
@@ -220,6 +426,7 @@ def send_email(email_type="info", email_message="Message", originator="", attach
                 except Exception as e:
                     error_msg = f"Error processing attachment: {e}"
                     rfplogger(error_msg)
+                    logger.error(error_msg)
                     return CustomResponse(data=error_msg, status_code=400)
 
             # Send email with timeout
@@ -231,21 +438,25 @@ def send_email(email_type="info", email_message="Message", originator="", attach
             # Success - log and return
             success_msg = f"Email sent successfully to {', '.join(recipients)} (attempt {attempt + 1})"
             rfplogger(success_msg)
+            logger.info(success_msg)
             return CustomResponse(data={"message": success_msg, "recipients": recipients, "attempt": attempt + 1}, status_code=200)
             
         except smtplib.SMTPAuthenticationError as e:
             error_msg = f"SMTP Authentication failed: {e}"
             rfplogger(error_msg)
+            logger.error(error_msg)
             return CustomResponse(data=error_msg, status_code=401)  # Don't retry auth errors
             
         except smtplib.SMTPRecipientsRefused as e:
             error_msg = f"SMTP Recipients refused: {e}"
             rfplogger(error_msg)
+            logger.error(error_msg)
             return CustomResponse(data=error_msg, status_code=400)  # Don't retry recipient errors
             
         except smtplib.SMTPException as e:
             last_error = f"SMTP Error (attempt {attempt + 1}/{max_retries}): {e}"
             rfplogger(last_error)
+            logger.error(last_error)
             if attempt < max_retries - 1:
                 import time
                 time.sleep(2 ** attempt)  # Exponential backoff
@@ -254,6 +465,7 @@ def send_email(email_type="info", email_message="Message", originator="", attach
         except Exception as e:
             last_error = f"Unexpected error (attempt {attempt + 1}/{max_retries}): {e}"
             rfplogger(last_error)
+            logger.error(last_error)
             if attempt < max_retries - 1:
                 import time
                 time.sleep(2 ** attempt)  # Exponential backoff
@@ -262,6 +474,7 @@ def send_email(email_type="info", email_message="Message", originator="", attach
     # All retries failed
     final_error = f"Failed to send email after {max_retries} attempts. Last error: {last_error}"
     rfplogger(final_error)
+    logger.error(final_error)
     return CustomResponse(data=final_error, status_code=500)
 
 def send_email_with_credentials(smtp_server, smtp_port, smtp_user, smtp_pass, email_recipient, email_subject="Subject", email_message="Message", email_html_message="", originator="", timeout=30, max_retries=3):
@@ -299,6 +512,7 @@ def send_email_with_credentials(smtp_server, smtp_port, smtp_user, smtp_pass, em
         
         error_msg = f"Missing required parameters: {', '.join(missing_params)}"
         rfplogger(error_msg)
+        logger.error(error_msg)
         return CustomResponse(data=error_msg, status_code=400)
 
     # Validate port
@@ -307,12 +521,14 @@ def send_email_with_credentials(smtp_server, smtp_port, smtp_user, smtp_pass, em
     except (ValueError, TypeError):
         error_msg = f"Invalid smtp_port: {smtp_port}. Must be a valid integer."
         rfplogger(error_msg)
+        logger.error(error_msg)
         return CustomResponse(data=error_msg, status_code=400)
 
     # Validate email recipient
     if '@' not in email_recipient:
         error_msg = f"Invalid email recipient: {email_recipient}"
         rfplogger(error_msg)
+        logger.error(error_msg)
         return CustomResponse(data=error_msg, status_code=400)
 
     # Retry logic
@@ -341,21 +557,25 @@ def send_email_with_credentials(smtp_server, smtp_port, smtp_user, smtp_pass, em
             # Success - log and return
             success_msg = f"Email sent successfully to {email_recipient} (attempt {attempt + 1})"
             rfplogger(success_msg)
+            logger.info(success_msg)
             return CustomResponse(data={"message": success_msg, "recipient": email_recipient, "attempt": attempt + 1}, status_code=200)
             
         except smtplib.SMTPAuthenticationError as e:
             error_msg = f"SMTP Authentication failed: {e}"
             rfplogger(error_msg)
+            logger.error(error_msg)
             return CustomResponse(data=error_msg, status_code=401)  # Don't retry auth errors
             
         except smtplib.SMTPRecipientsRefused as e:
             error_msg = f"SMTP Recipients refused: {e}"
             rfplogger(error_msg)
+            logger.error(error_msg)
             return CustomResponse(data=error_msg, status_code=400)  # Don't retry recipient errors
             
         except smtplib.SMTPException as e:
             last_error = f"SMTP Error (attempt {attempt + 1}/{max_retries}): {e}"
             rfplogger(last_error)
+            logger.error(last_error)
             if attempt < max_retries - 1:
                 import time
                 time.sleep(2 ** attempt)  # Exponential backoff
@@ -364,6 +584,7 @@ def send_email_with_credentials(smtp_server, smtp_port, smtp_user, smtp_pass, em
         except Exception as e:
             last_error = f"Unexpected error (attempt {attempt + 1}/{max_retries}): {e}"
             rfplogger(last_error)
+            logger.error(last_error)
             if attempt < max_retries - 1:
                 import time
                 time.sleep(2 ** attempt)  # Exponential backoff
@@ -372,6 +593,7 @@ def send_email_with_credentials(smtp_server, smtp_port, smtp_user, smtp_pass, em
     # All retries failed
     final_error = f"Failed to send email after {max_retries} attempts. Last error: {last_error}"
     rfplogger(final_error)
+    logger.error(final_error)
     return CustomResponse(data=final_error, status_code=500)
     
 def fetch_products_from_json_feed(url):
@@ -1,17 +1,16 @@
-from dotenv import load_dotenv
+from dotenv import load_dotenv, dotenv_values
 import requests
 import subprocess
+import io
 import os
-import uuid 
 import boto3
 from botocore.exceptions import NoCredentialsError, ClientError
 from urllib.parse import urlparse
-from datetime import datetime
-from .commonfunctions import download_file_local, delete_local_file
-from .commonlogging import configure_logger
+from .commons3 import generate_new_filename, get_boto3_s3_client, s3_run_concurrently, s3_client_delete_keys, s3_client_upload_from_url, s3_size_http_pool, S3_TRANSFER_CONFIG
+from .commonlogging import configure_logger, ProgressReporter
 from .customresponse import CustomResponse
 
-logger = configure_logger()
+logger = configure_logger(__name__)
 
 def heroku_environment():
     load_dotenv()  # This loads the environment variables from .env
@@ -40,30 +39,90 @@ def heroku_environment():
 
     return heroku_config_dict
 
-def heroku_update_config_variables(app_name):
+HEROKU_API_URL = "https://api.heroku.com"
+
+def get_cloudcube_client(heroku_config_dict):
+    '''Cached, thread-safe S3 client for the CloudCube credentials (shared with commons3's client pool)'''
+    if heroku_config_dict is None:
+        raise ValueError("heroku_config_dict is required for this function.")
+    return get_boto3_s3_client(access_key=heroku_config_dict.get("CLOUDCUBE_ACCESS_KEY_ID"),
+                               secret_key=heroku_config_dict.get("CLOUDCUBE_SECRET_ACCESS_KEY"))
+
+def heroku_api_headers(heroku_api_key):
+    return {
+        "Accept": "application/vnd.heroku+json; version=3",
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {heroku_api_key}"
+    }
+
+def heroku_sync_config_variables(app_name, heroku_api_key=None, env_file='.env', remove_missing=False):
+    '''
+    Sets the app config vars from env_file with one GET and a single PATCH holding only the changed
+    values, so the whole file costs one release. remove_missing also unsets vars that are not in the file.
+    Returns a CustomResponse with the changes sent (name -> value, None for removed vars).
+    '''
+    heroku_api_key = heroku_api_key or os.getenv("HEROKU_API_KEY")
+    if not heroku_api_key:
+        raise ValueError("heroku_api_key or the HEROKU_API_KEY environment variable is required for this function.")
+    if not os.path.isfile(env_file):
+        logger.error(f"{env_file} file not found!")
+        return CustomResponse(data=f"{env_file} file not found", status_code=404)
+
+    # Keys without a value (e.g. "KEY" alone) are skipped rather than cleared
+    env_vars = {key: value for key, value in dotenv_values(env_file).items() if value is not None}
+
+    url = f"{HEROKU_API_URL}/apps/{app_name}/config-vars"
+    headers = heroku_api_headers(heroku_api_key)
+    response = requests.get(url, headers=headers)
+    if response.status_code != 200:
+        logger.error(f"Failed to retrieve config vars from Heroku. Status Code: {response.status_code}")
+        return CustomResponse(data=response.text, status_code=response.status_code)
+    current_vars = response.json()
+
+    changes = {key: value for key, value in env_vars.items() if current_vars.get(key) != value}
+    if remove_missing:
+        changes.update({key: None for key in current_vars if key not in env_vars})
+    if not changes:
+        logger.info("Config vars already up to date.")
+        return CustomResponse(data={}, status_code=200)
+
+    response = requests.patch(url, headers=headers, json=changes)
+    if response.status_code != 200:
+        logger.error(f"Failed to update config vars. Status Code: {response.status_code}")
+        return CustomResponse(data=response.text, status_code=response.status_code)
+
+    logger.info(f"Updated {len(changes)} config vars on {app_name}: {', '.join(sorted(changes))}")
+    return CustomResponse(data=changes, status_code=200)
+
+def heroku_update_config_variables(app_name, env_file='.env'):
+    '''
+    Pushes env_file to the app config vars. Uses the Platform API diff when HEROKU_API_KEY is set,
+    otherwise one `heroku config:set` call with every variable (a single release either way).
+    '''
+    if os.getenv("HEROKU_API_KEY"):
+        return heroku_sync_config_variables(app_name, env_file=env_file)
+
     # Check if .env file exists
-    if not os.path.isfile('.env'):
-        print(".env file not found!")
+    if not os.path.isfile(env_file):
+        logger.error(f"{env_file} file not found!")
         return
 
-    with open('.env', 'r') as file:
-        lines = file.readlines()
-        for line in lines:
-            line = line.strip()
-            # Skip empty lines and comments
-            if line and not line.startswith('#'):
-                # Construct the Heroku CLI command
-                command = f"heroku config:set {line} --app {app_name}"
-                try:
-                    # Execute the command
-                    subprocess.run(command, shell=True, check=True)
-                except subprocess.CalledProcessError as e:
-                    print(f"An error occurred while setting config var: {e}")
-                except Exception as e:
-                    print(f"Unexpected error: {e}")
+    assignments = [f"{key}={value}" for key, value in dotenv_values(env_file).items() if value is not None]
+    if not assignments:
+        return
+    try:
+        # Arguments are passed without a shell, values need no quoting
+        subprocess.run(["heroku", "config:set", *assignments, "--app", app_name], check=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"An error occurred while setting config vars: {e}")
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
 
 def heroku_upload_file(file_name, folder=None, heroku_config_dict=None):
-
+    '''
+    Uploads the local file file_name into the cube folder and returns its CloudCube url.
+    Raises FileNotFoundError, or the boto3/botocore error, on failure.
+    '''
     # Ensure folder ends with a '/' if it's not empty
     if folder is None:
         folder = ''
@@ -74,119 +133,136 @@ def heroku_upload_file(file_name, folder=None, heroku_config_dict=None):
         raise ValueError("heroku_config_dict is required for this function.")
     
     # Extract relevant values from heroku_config_dict
-    CLOUDCUBE_ACCESS_KEY_ID = heroku_config_dict.get("CLOUDCUBE_ACCESS_KEY_ID")
-    CLOUDCUBE_SECRET_ACCESS_KEY = heroku_config_dict.get("CLOUDCUBE_SECRET_ACCESS_KEY")
-    CLOUDCUBE_URL = heroku_config_dict.get("CLOUDCUBE_URL")
     CUBE_PUBLIC = heroku_config_dict.get("CUBE_PUBLIC")
     BUCKET_NAME = heroku_config_dict.get("BUCKET_NAME")
 
     # Construct the full S3 object name
     object_name = CUBE_PUBLIC + folder + file_name
 
-    try:
-        # Create an S3 client with CloudCube credentials
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=CLOUDCUBE_ACCESS_KEY_ID,
-            aws_secret_access_key=CLOUDCUBE_SECRET_ACCESS_KEY
-        )
-
-        # Upload the file
-        s3_client.upload_file(file_name, BUCKET_NAME, object_name)
-
-         # Split the object_name by '/'
-        parts = object_name.split('/')
+    s3_client = get_cloudcube_client(heroku_config_dict)
 
-        # Exclude the first part (wwmx700brb7g) and join the rest with CLOUDCUBE_URL
-        full_url = f"{CLOUDCUBE_URL}/{'/'.join(parts[1:])}"
-        
-        return full_url
-    
-    except FileNotFoundError:
-        return "The file was not found."
-    except NoCredentialsError:
-        return "Credentials not available."
-    except Exception as e:
-        return f"An error occurred: {str(e)}"
-    
-def heroku_upload_file_from_url(file_url, folder, heroku_config_dict=None, bnewname=False):
-    
-    # Download the file to a local path
-    file_path = download_file_local(file_url)
-
-    if bnewname:
-        # Extract the file extension from the URL
-        parsed_url = urlparse(file_url)
-        file_extension = os.path.splitext(os.path.basename(parsed_url.path))[1]
-
-        # Generate a timestamp in the format YYYYMMDDHHMMSS
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    # Upload the file, errors are raised so they are never mistaken for a url
+    s3_client.upload_file(file_name, BUCKET_NAME, object_name)
 
-        # Generate a UUID
-        generated_uuid = uuid.uuid4()
+    return heroku_cube_url(object_name, heroku_config_dict)
 
-        # Convert the UUID to a hexadecimal string and truncate it to the desired length
-        shortened_uuid = str(generated_uuid.hex)[:8]  # Example: Truncate to 8 characters
+def heroku_cube_url(object_name, heroku_config_dict):
+    # Exclude the first part (the cube name, e.g. wwmx700brb7g) and join the rest with CLOUDCUBE_URL
+    parts = object_name.split('/')
+    return f"{heroku_config_dict.get('CLOUDCUBE_URL')}/{'/'.join(parts[1:])}"
 
-        # Create a new filename using the shortened UUID
-        new_filename = f"{timestamp}_{shortened_uuid}{file_extension}"
-
-        # Rename the local file with the new filename
-        new_file_path = os.path.join(os.path.dirname(file_path), new_filename)
-        os.rename(file_path, new_file_path)
-
-        # Upload the file with the new filename
-        object_name = heroku_upload_file(new_file_path, folder, heroku_config_dict)
+def heroku_upload_stream_from_url(file_url, folder=None, heroku_config_dict=None, bnewname=False, timeout=60):
+    '''
+    Streams file_url straight into the cube folder (no local file) with the pooled CloudCube client.
+    Returns the CloudCube url, raises requests.HTTPError or botocore ClientError on failure.
+    '''
+    if heroku_config_dict is None:
+        raise ValueError("heroku_config_dict is required for this function.")
 
-        # Delete the local file (both the original and renamed versions)
-        delete_local_file(new_file_path)
-    else:
-        # Upload the file with its original name
-        object_name = heroku_upload_file(file_path, folder, heroku_config_dict)
+    file_name = os.path.basename(urlparse(file_url).path)
+    if bnewname:
+        file_name = generate_new_filename(file_name)
+    object_name = heroku_cube_prefix(folder, heroku_config_dict) + file_name
+
+    s3_client_upload_from_url(get_cloudcube_client(heroku_config_dict), heroku_config_dict.get("BUCKET_NAME"), object_name, file_url, timeout=timeout)
+    logger.debug(f"Streamed '{file_url}' to '{object_name}'.")
+    return heroku_cube_url(object_name, heroku_config_dict)
+
+def heroku_upload_files_from_urls(file_urls, folder=None, heroku_config_dict=None, bnewname=False, max_workers=None):
+    '''
+    Streams several urls into the cube folder concurrently.
+    Returns a dict of source url -> CloudCube url, None for the urls that failed.
+    '''
+    s3_size_http_pool(max_workers)
+
+    def upload(file_url):
+        return heroku_upload_stream_from_url(file_url, folder=folder, heroku_config_dict=heroku_config_dict, bnewname=bnewname)
+
+    results = {}
+    progress = ProgressReporter(logger, "Uploading urls", total=len(file_urls))
+    for file_url, cube_url, exception in s3_run_concurrently(upload, file_urls, max_workers=max_workers):
+        if exception:
+            logger.error(f"An error occurred while uploading {file_url}: {exception}")
+        results[file_url] = cube_url
+        progress.update()
+    progress.done()
+    return results
+
+def heroku_upload_file_from_url(file_url, folder, heroku_config_dict=None, bnewname=False, transform=None):
+    '''
+    Streams file_url into the cube folder and returns its CloudCube url, None on failure.
+    transform, an optional commonimage.ImageTransform, uploads the converted variants instead of the original
+    and returns the url of the first one.
+    '''
+    if heroku_config_dict is None:
+        raise ValueError("heroku_config_dict is required for this function.")
 
-        # Delete the local file
-        delete_local_file(file_path)
+    if transform is None:
+        try:
+            return heroku_upload_stream_from_url(file_url, folder=folder, heroku_config_dict=heroku_config_dict, bnewname=bnewname)
+        except Exception as e:
+            logger.error(f"An error occurred while uploading the file: {str(e)}")
+            return None
 
-    return object_name
+    try:
+        # Transforms need the whole image, it is converted in memory so no local file is written or deleted
+        response = requests.get(file_url, timeout=60)
+        response.raise_for_status()
+        file_name = os.path.basename(urlparse(file_url).path)
+        if bnewname:
+            file_name = generate_new_filename(file_name)
+
+        s3_client = get_cloudcube_client(heroku_config_dict)
+        variant_urls = []
+        for variant_name, data in transform.apply_bytes(response.content, file_name):
+            object_name = heroku_cube_prefix(folder, heroku_config_dict) + variant_name
+            s3_client.upload_fileobj(io.BytesIO(data), heroku_config_dict.get("BUCKET_NAME"), object_name,
+                                     ExtraArgs={'ContentType': transform.mime_type}, Config=S3_TRANSFER_CONFIG)
+            variant_urls.append(heroku_cube_url(object_name, heroku_config_dict))
+        return variant_urls[0]
+    except Exception as e:
+        logger.error(f"An error occurred while uploading the transformed file: {str(e)}")
+        return None
+
+def heroku_cube_prefix(folder_name, heroku_config_dict):
+    '''Full key prefix for a cube folder, folder_name may already include CUBE_PUBLIC'''
+    cube_public = heroku_config_dict.get("CUBE_PUBLIC") or ""
+    folder_name = folder_name or ""
+    if folder_name and not folder_name.endswith('/'):
+        folder_name += '/'
+    if cube_public and folder_name.startswith(cube_public):
+        return folder_name
+    return cube_public + folder_name
+
+def heroku_iter_files(folder_name="", heroku_config_dict=None, include_metadata=False, page_size=1000):
+    '''
+    Yields every key under the cube folder, one listing page at a time.
+    With include_metadata, yields dicts with Key, Size, ETag and LastModified instead.
+    '''
+    if heroku_config_dict is None:
+        raise ValueError("heroku_config_dict is required for this function.")
+    bucket_name = heroku_config_dict.get("BUCKET_NAME")
+    s3_client = get_cloudcube_client(heroku_config_dict)
+    full_prefix = heroku_cube_prefix(folder_name, heroku_config_dict)
+
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=full_prefix, PaginationConfig={'PageSize': page_size}):
+        for obj in page.get('Contents', []):
+            if include_metadata:
+                yield {
+                    'Key': obj['Key'],
+                    'Size': obj['Size'],
+                    'ETag': obj['ETag'].strip('"'),
+                    'LastModified': obj['LastModified']
+                }
+            else:
+                yield obj['Key']
 
-def heroku_list_files_in_folder(folder_name, heroku_config_dict=None):
+def heroku_list_files_in_folder(folder_name, heroku_config_dict=None, include_metadata=False):
     try:
         if heroku_config_dict is None:
             raise ValueError("heroku_config_dict is required for this function.")
-
-        # Extract relevant values from heroku_config_dict
-        CLOUDCUBE_ACCESS_KEY_ID = heroku_config_dict.get("CLOUDCUBE_ACCESS_KEY_ID")
-        CLOUDCUBE_SECRET_ACCESS_KEY = heroku_config_dict.get("CLOUDCUBE_SECRET_ACCESS_KEY")
-        CUBE_PUBLIC = heroku_config_dict.get("CUBE_PUBLIC")
-        BUCKET_NAME = heroku_config_dict.get("BUCKET_NAME")
-
-        # Create an S3 client with CloudCube credentials
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=CLOUDCUBE_ACCESS_KEY_ID,
-            aws_secret_access_key=CLOUDCUBE_SECRET_ACCESS_KEY
-        )
-
-        # Set the prefix based on folder_name
-        full_prefix = CUBE_PUBLIC
-        full_prefix = ""
-        print(full_prefix)
-        if folder_name:
-            if not folder_name.endswith('/'):
-                folder_name += '/'
-            full_prefix += folder_name
-        print(full_prefix)
-
-        # List objects in the specified folder
-        response = s3_client.list_objects_v2(Bucket=BUCKET_NAME, Prefix=full_prefix)
-        print(f"response: {response}")
-        # Check if the bucket has contents
-        if 'Contents' in response:
-            print("Contents")
-            files = [item['Key'] for item in response['Contents']]
-            return files
-        else:
-            return []
+        return list(heroku_iter_files(folder_name, heroku_config_dict, include_metadata=include_metadata))
     except ValueError as ve:
         logger.error(f"An error occurred: {ve}")
         return f"ValueError: {str(ve)}"
@@ -202,17 +278,8 @@ def heroku_delete_file(file_key, heroku_config_dict=None):
         if heroku_config_dict is None:
             raise ValueError("heroku_config_dict is required for this function.")
 
-        # Extract relevant values from heroku_config_dict
-        CLOUDCUBE_ACCESS_KEY_ID = heroku_config_dict.get("CLOUDCUBE_ACCESS_KEY_ID")
-        CLOUDCUBE_SECRET_ACCESS_KEY = heroku_config_dict.get("CLOUDCUBE_SECRET_ACCESS_KEY")
         BUCKET_NAME = heroku_config_dict.get("BUCKET_NAME")
-
-        # Create an S3 client with CloudCube credentials
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=CLOUDCUBE_ACCESS_KEY_ID,
-            aws_secret_access_key=CLOUDCUBE_SECRET_ACCESS_KEY
-        )
+        s3_client = get_cloudcube_client(heroku_config_dict)
 
         # Delete the file
         response = s3_client.delete_object(Bucket=BUCKET_NAME, Key=file_key)
@@ -261,7 +328,7 @@ def heroku_download_files_in_folder_ORIGINAL(folder_name, heroku_config_dict=Non
         objects = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=full_prefix)['Contents']
         
         # Ensure the local_download_folder exists
-        print(local_download_folder)
+        logger.debug(f"Local folder: {local_download_folder}")
         os.makedirs(local_download_folder, exist_ok=True)
 
         # Download files to the local subfolder
@@ -272,112 +339,72 @@ def heroku_download_files_in_folder_ORIGINAL(folder_name, heroku_config_dict=Non
 
             # If bdelete is True, delete the file from the S3 bucket
             if bdelete:
-                print("Deleting file:")
-                print("Bucket Name:", bucket_name)
-                print("File Key:", file_key)
+                logger.debug(f"Deleting file: {file_key} from bucket {bucket_name}")
                 try:
                     heroku_delete_file(file_key=file_key, heroku_config_dict=heroku_config_dict)
                     #s3_client.delete_object(Bucket=bucket_name, Key=file_key)
                     #print(f"Deleted file {file_key} from bucket {bucket_name}.")
                 except ClientError as e:
-                    print(f"Error deleting file {file_key}: {e}")
+                    logger.error(f"Error deleting file {file_key}: {e}")
 
         return len(objects)
     
     except NoCredentialsError:
-        print("Credentials not available.")
+        logger.error("Credentials not available.")
         return 0
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logger.error(f"An error occurred: {e}")
         return 0
 
-def heroku_download_files_in_folder(folder_name, heroku_config_dict=None, bdelete=False):
-
+def heroku_download_files_in_folder(folder_name, heroku_config_dict=None, bdelete=False, max_workers=None):
+    '''
+    Downloads every file of the cube folder to ~/Downloads/<folder_name> on a thread pool with one shared client.
+    With bdelete, the files downloaded successfully are then deleted in DeleteObjects batches of up to 1,000.
+    Returns the number of files downloaded.
+    '''
     user_home = os.path.expanduser("~")
     local_download_folder = os.path.join(user_home, 'Downloads', folder_name)
 
-    CLOUDCUBE_ACCESS_KEY_ID = heroku_config_dict.get("CLOUDCUBE_ACCESS_KEY_ID")
-    CLOUDCUBE_SECRET_ACCESS_KEY = heroku_config_dict.get("CLOUDCUBE_SECRET_ACCESS_KEY")
-    cube_public = heroku_config_dict.get("CUBE_PUBLIC")
     bucket_name = heroku_config_dict.get("BUCKET_NAME")
+    s3_client = get_cloudcube_client(heroku_config_dict)
+    full_prefix = heroku_cube_prefix(folder_name, heroku_config_dict)
 
-    # Create an S3 client with CloudCube credentials
-    s3_client = boto3.client(
-        's3',
-        aws_access_key_id=CLOUDCUBE_ACCESS_KEY_ID,
-        aws_secret_access_key=CLOUDCUBE_SECRET_ACCESS_KEY
-    )
+    def file_keys():
+        return (file_key for file_key in heroku_iter_files(folder_name, heroku_config_dict) if not file_key.endswith('/'))
 
-    # Set the prefix based on folder_name
-    full_prefix = cube_public
-    if folder_name:
-        if not folder_name.endswith('/'):
-            folder_name += '/'
-        full_prefix += folder_name
+    def download(file_key):
+        local_file_path = os.path.join(local_download_folder, os.path.basename(file_key))
+        s3_client.download_file(bucket_name, file_key, local_file_path, Config=S3_TRANSFER_CONFIG)
+        logger.debug(f"Downloaded: {file_key} to {local_file_path}")
 
     try:
         # Ensure the local_download_folder exists
-        print(f"Local folder: {local_download_folder}")
+        logger.debug(f"Local folder: {local_download_folder}")
         os.makedirs(local_download_folder, exist_ok=True)
 
-        # Pagination variables
-        continuation_token = None
-        total_files_downloaded = 0
-
-        while True:
-            # Fetch a batch of objects, using the continuation token if there are more than 1000 files
-            if continuation_token:
-                response = s3_client.list_objects_v2(
-                    Bucket=bucket_name, 
-                    Prefix=full_prefix, 
-                    ContinuationToken=continuation_token
-                )
-            else:
-                response = s3_client.list_objects_v2(
-                    Bucket=bucket_name, 
-                    Prefix=full_prefix
-                )
-
-            # Check if there are contents in the response
-            if 'Contents' not in response:
-                print("No more files to download.")
-                break
-
-            # Download files to the local subfolder
-            objects = response['Contents']
-            for obj in objects:
-                file_key = obj['Key']
-                local_file_path = os.path.join(local_download_folder, os.path.basename(file_key))
-                
-                print(f"Downloading: {file_key} to {local_file_path}")
-                try:
-                    s3_client.download_file(bucket_name, file_key, local_file_path)
-                    total_files_downloaded += 1
-                except ClientError as e:
-                    print(f"Error downloading file {file_key}: {e}")
-
-                # If bdelete is True, delete the file from the S3 bucket
-                if bdelete:
-                    print(f"Deleting file: {file_key} from bucket {bucket_name}")
-                    try:
-                        heroku_delete_file(file_key=file_key, heroku_config_dict=heroku_config_dict)
-                    except ClientError as e:
-                        print(f"Error deleting file {file_key}: {e}")
-
-            # Check if there are more files to download (pagination)
-            if response.get('IsTruncated'):  # If True, there are more files to fetch
-                continuation_token = response.get('NextContinuationToken')
-            else:
-                break  # No more files to list
+        downloaded_keys = []
+        progress = ProgressReporter(logger, f"Downloading {full_prefix}")
+        for file_key, _, exception in s3_run_concurrently(download, file_keys(), max_workers=max_workers):
+            if exception:
+                logger.error(f"Error downloading file {file_key}: {exception}")
+                continue
+            downloaded_keys.append(file_key)
+            progress.update()
+        progress.done()
+
+        # Only files that reached the local folder are removed from the cube
+        if bdelete and downloaded_keys:
+            result = s3_client_delete_keys(s3_client, bucket_name, downloaded_keys, max_workers=max_workers)
+            for error in result['errors']:
+                logger.error(f"Error deleting file {error.get('Key')}: {error.get('Message')}")
 
-        print(f"Total files downloaded: {total_files_downloaded}")
-        return total_files_downloaded
+        return len(downloaded_keys)
 
     except NoCredentialsError:
-        print("Credentials not available.")
+        logger.error("Credentials not available.")
         return 0
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logger.error(f"An error occurred: {e}")
         return 0
 
 def get_heroku_credentials(heroku_config_dict=None):
@@ -408,21 +435,17 @@ def get_heroku_credentials(heroku_config_dict=None):
                 return CustomResponse(data=parse_database_url(db_url), status_code=200)
             else:
                 logger.error("Database URL not found in config vars")
-                print("Database URL not found in config vars")
                 return CustomResponse(data="Database URL not found in config vars", status_code=404)
  
         else:
             logger.error(f"Failed to retrieve config vars from Heroku. Status Code: {response.status_code}")
-            print("Failed to retrieve config vars from Heroku. Status Code:", response.status_code)
             return CustomResponse(data=f"Failed to retrieve config vars from Heroku. Status Code: {response.status_code}", status_code=404)
     
     except ValueError as ve:
         logger.error(f"ValueError: {str(ve)}")
-        print(f"ValueError: {str(ve)}")
         return CustomResponse(data=f"ValueError: {str(ve)}", status=404)
     except Exception as e:
         logger.error(f"An unexpected error occurred: {str(e)}")
-        print(f"An unexpected error occurred: {str(e)}")
         return CustomResponse(data=f"An unexpected error occurred: {str(e)}", status_code=404)
 
 def parse_database_url(db_url):
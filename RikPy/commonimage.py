@@ -0,0 +1,114 @@
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from .commonlogging import configure_logger
+
+logger = configure_logger(__name__)
+
+# Pillow format name, mime type and file extension for each output format
+IMAGE_FORMATS = {
+    'webp': ('WEBP', 'image/webp', '.webp'),
+    'avif': ('AVIF', 'image/avif', '.avif'),
+    'jpeg': ('JPEG', 'image/jpeg', '.jpg'),
+}
+
+_image_process_pool = None
+_image_process_pool_lock = threading.Lock()
+
+def _import_pil():
+    # Pillow is only needed when a transform is requested, the rest of RikPy works without it
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError("Pillow is required for image transforms: pip install Pillow")
+    return Image
+
+def get_image_process_pool(max_workers=None):
+    '''
+    Shared process pool for batch transforms, images are CPU bound and do not scale on threads.
+    Workers are spawned, not forked, since the pool is started from upload threads and a fork
+    there can copy a lock held by another thread.
+    '''
+    global _image_process_pool
+    if _image_process_pool is None:
+        with _image_process_pool_lock:
+            if _image_process_pool is None:
+                _image_process_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+    return _image_process_pool
+
+class ImageTransform:
+    '''
+    Converts an image to format ('webp', 'avif' or 'jpeg') at quality, once per width in widths
+    (None keeps the original size, images are never upscaled).
+    Variants are named <name>_<width>w<ext>, or <name><ext> without a width.
+    '''
+    def __init__(self, format='webp', widths=None, quality=80):
+        if format not in IMAGE_FORMATS:
+            raise ValueError(f"format must be one of {list(IMAGE_FORMATS)}")
+        self.format = format
+        self.widths = widths or [None]
+        self.quality = quality
+
+    @property
+    def mime_type(self):
+        return IMAGE_FORMATS[self.format][1]
+
+    def variant_name(self, file_name, width=None):
+        stem = os.path.splitext(os.path.basename(file_name))[0]
+        suffix = f"_{width}w" if width else ""
+        return f"{stem}{suffix}{IMAGE_FORMATS[self.format][2]}"
+
+    def apply_bytes(self, data, file_name):
+        '''Returns [(variant_name, bytes)] for the image in data'''
+        Image = _import_pil()
+        pil_format = IMAGE_FORMATS[self.format][0]
+        variants = []
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+            if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            for width in self.widths:
+                resized = image
+                if width and width < image.width:
+                    resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+                output = io.BytesIO()
+                resized.save(output, format=pil_format, quality=self.quality)
+                variants.append((self.variant_name(file_name, width), output.getvalue()))
+        logger.debug(f"Transformed {file_name} into {len(variants)} {self.format} variants")
+        return variants
+
+    def apply(self, file_path, output_dir=None):
+        '''
+        Writes the variants of file_path next to it (or in output_dir) and returns their paths.
+        Raises ValueError rather than overwrite file_path with a variant of the same name.
+        '''
+        with open(file_path, 'rb') as file:
+            variants = self.apply_bytes(file.read(), file_path)
+        output_dir = output_dir or os.path.dirname(file_path)
+        paths = []
+        for variant_name, data in variants:
+            path = os.path.join(output_dir, variant_name)
+            if os.path.abspath(path) == os.path.abspath(file_path):
+                raise ValueError(f"Variant {variant_name} would overwrite {file_path}, pass another output_dir")
+            with open(path, 'wb') as file:
+                file.write(data)
+            paths.append(path)
+        return paths
+
+def transform_images(file_paths, transform, output_dir=None, max_workers=None):
+    '''
+    Runs transform over many files in the process pool.
+    Returns a dict of file path -> variant paths, None for the files that failed.
+    '''
+    pool = get_image_process_pool(max_workers)
+    futures = {file_path: pool.submit(transform.apply, file_path, output_dir) for file_path in file_paths}
+    results = {}
+    for file_path, future in futures.items():
+        try:
+            results[file_path] = future.result()
+        except Exception as e:
+            logger.error(f"An error occurred while transforming {file_path}: {e}")
+            results[file_path] = None
+    return results
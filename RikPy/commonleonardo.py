@@ -9,6 +9,7 @@ import json
 from dotenv import load_dotenv
 from RikPy.commonfunctions import rfplogger, download_file_local_with_query_parameters, delete_local_file
 from RikPy.customresponse import CustomResponse
+from RikPy.commonlogging import configure_logger
 
 model_id_default = "6bef9f1b-29cb-40c7-b9df-32b51c1f67d3" #Default model # Leonardo Creative
 model_id_anime = "1aa0f478-51be-4efd-94e8-76bfc8f533af" #Anime pastel dream (Marie Angel default). Pastel anime styling. Use with PMv3 and the anime preset for incredible range. 
@@ -24,6 +25,8 @@ leonardo_key = os.getenv("LEONARDO_KEY")
 if not leonardo_key:
     raise ValueError("LEONARDO_KEY environment variable not set.")
 
+logger = configure_logger(__name__)
+
 negative_prompt = "long neck, deformed, long cloth, long dress, dark skin, ugly hands, bad hands"
 
 # Helper function to get image file extension
@@ -44,19 +47,19 @@ def check_generation_status(generation_id, max_retries=60, interval=5):
         if response.status_code == 200:
             generation_status = response.json().get('generations_by_pk', {}).get('status')
             if generation_status == 'COMPLETE':
-                print("Image generation completed.")
+                logger.info("Image generation completed.")
                 return 'COMPLETE'
             elif generation_status == 'PENDING':
-                print("Waiting for image generation to complete...")
+                logger.debug("Waiting for image generation to complete...")
                 time.sleep(interval)
             else:
-                print(f"Image generation failed or unknown status: {generation_status}")
+                logger.error(f"Image generation failed or unknown status: {generation_status}")
                 return None
         else:
-            print(f"Failed to get generation status. Status code: {response.status_code}")
+            logger.error(f"Failed to get generation status. Status code: {response.status_code}")
             return None
     
-    print("Image generation timed out.")
+    logger.error("Image generation timed out.")
     return None
 
 def create_payload(model_id, prompt, height, width, number_images, image_id=None, strength=0.5, guidance_scale=7, photoReal=False, alchemy=False, contrastRatio=1, promptMagic=True, promptMagicStrength=0.4):
@@ -119,7 +122,7 @@ def Leonardo_upload_image(image_file_path):
     response = requests.post(url, json=payload, headers=headers)
 
     if response.status_code != 200:
-        print(f"Failed to get presigned URL. Status code: {response.status_code}")
+        logger.error(f"Failed to get presigned URL. Status code: {response.status_code}")
         return None
 
     upload_response = response.json()['uploadInitImage']
@@ -133,7 +136,7 @@ def Leonardo_upload_image(image_file_path):
         try:
             fields = json.loads(fields)
         except json.JSONDecodeError:
-            print(f"Error: 'fields' is not in JSON format: {fields}")
+            logger.error(f"Error: 'fields' is not in JSON format: {fields}")
             return None
 
     # Step 3: Upload the image via presigned URL
@@ -142,15 +145,15 @@ def Leonardo_upload_image(image_file_path):
         response = requests.post(presigned_url, data=fields, files=files)
     
     if response.status_code == 204:
-        print(f"Image upload successful. Image ID: {image_id}")
+        logger.info(f"Image upload successful. Image ID: {image_id}")
         return image_id
     else:
-        print(f"Image upload failed. Status code: {response.status_code}")
+        logger.error(f"Image upload failed. Status code: {response.status_code}")
         return None
 
 def Leonardo_retrieve_image(generation_id):
     if generation_id is None:
-        print("No generation ID provided.")
+        logger.warning("No generation ID provided.")
         return []
 
     url = f"https://cloud.leonardo.ai/api/rest/v1/generations/{generation_id}"
@@ -163,7 +166,7 @@ def Leonardo_retrieve_image(generation_id):
     response = requests.get(url, headers=headers)
     
     if response.status_code == 200:
-        print("Image retrieval successful.")
+        logger.info("Image retrieval successful.")
         # Extract the array of image URLs and metadata
         image_array = response.json()
         image_urls=[]
@@ -172,8 +175,8 @@ def Leonardo_retrieve_image(generation_id):
 
         return image_urls  # Returns the full image array from the response
     else:
-        print(f"Image retrieval failed. Status code: {response.status_code}")
-        print("Response:", response.text)
+        logger.error(f"Image retrieval failed. Status code: {response.status_code}")
+        logger.error(f"Response: {response.text}")
         return []
     
 def Leonardo_list_all_models():
@@ -184,7 +187,7 @@ def Leonardo_list_all_models():
         "authorization": f"Bearer {leonardo_key}"
     }
     response = requests.get(url, headers=headers)
-    print(response.text)
+    logger.debug(f"Models: {response.text}")
     return response.text
 
 def Leonardo_create_model_map():
@@ -219,7 +222,7 @@ def Leonardo_create_model_map():
         
         return model_map
     else:
-        print(f"Failed to retrieve models. Status code: {response.status_code}")
+        logger.error(f"Failed to retrieve models. Status code: {response.status_code}")
         return {}
 
 def Leonardo_generate_image(model_name, prompt, height, width, payload="", number_images=1, image_file_path=None, strength=0.5, guidance_scale=7, 
@@ -231,16 +234,17 @@ def Leonardo_generate_image(model_name, prompt, height, width, payload="", numbe
     # If image_file_path is a URL, download it locally
     if image_file_path and image_file_path.startswith("http"):
         random_filename = f"{uuid.uuid4()}.png"  # Generate a random filename
-        print(f"Downloading image from URL: {image_file_path} as {random_filename}")
-        local_image_path=download_file_local_with_query_parameters(file_url=image_file_path, generate_random_filename=random_filename)
-        print(f"Image downloaded to {local_image_path}")
+        logger.info(f"Downloading image from URL: {image_file_path} as {random_filename}")
+        local_image_path=download_file_local_with_query_parameters(file_url=image_file_path, generate_random_filename=random_filename, use_cache=True)
+        logger.info(f"Image downloaded to {local_image_path}")
 
     if local_image_path and not local_image_path.startswith("http"):
         # If image_file_path is provided, upload the image and get the image ID
         image_id = Leonardo_upload_image(local_image_path)
         if not image_id:
             message="Image upload failed. Cannot proceed with image-to-image generation."
-            print(message)
+            rfplogger(message)
+            logger.error(message)
             return CustomResponse(data=message, status_code=400)
         
         # Optionally, delete the downloaded local file after uploading it
@@ -254,7 +258,7 @@ def Leonardo_generate_image(model_name, prompt, height, width, payload="", numbe
     engine_model_id = model_map.get(model_name, model_id_default)
 
     if model_name not in model_map:
-        print(f"Model '{model_name}' not found, using default model '{model_id_default}'.")
+        logger.warning(f"Model '{model_name}' not found, using default model '{model_id_default}'.")
 
     # Create the payload
     if not payload:
@@ -279,12 +283,13 @@ def Leonardo_generate_image(model_name, prompt, height, width, payload="", numbe
     # Send image generation request
     response = requests.post(url, json=payload, headers=headers)
     if response.status_code == 200:
-        print("Image generation initiated.")
+        logger.info("Image generation initiated.")
         response_data = response.json()
         generation_id = response_data.get('sdGenerationJob', {}).get('generationId')  # Adjust this according to the actual response structure
         if generation_id is None:
             message="Generation ID not found in response."
-            print(message)
+            rfplogger(message)
+            logger.error(message)
             return CustomResponse(data=message, status_code=400)
 
         # Check the status of the generation job periodically until it's completed
@@ -293,11 +298,13 @@ def Leonardo_generate_image(model_name, prompt, height, width, payload="", numbe
             return CustomResponse(data=generation_id, status_code=200)
         else:
             message=f"Image generation failed on generation check with generation ID {generation_id}."
-            print(message)
+            rfplogger(message)
+            logger.error(message)
             return CustomResponse(data=message, status_code=400)
     else:
         message = f"Image generation failed. Response: {response.text}. Status code: {response.status_code}"
-        print(message)
+        rfplogger(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=400)
 
 def Leonardo_generate_image_OLD(model_id, prompt, height, width, payload=None, number_images=1):
@@ -327,11 +334,11 @@ def Leonardo_generate_image_OLD(model_id, prompt, height, width, payload=None, n
     # Send image generation request
     response = requests.post(url, json=payload, headers=headers)
     if response.status_code == 200:
-        print("Image generation initiated.")
+        logger.info("Image generation initiated.")
         response_data = response.json()
         generation_id = response_data.get('sdGenerationJob', {}).get('generationId')  # Adjust this according to the actual response structure
         if generation_id is None:
-            print("Generation ID not found in response.")
+            logger.error("Generation ID not found in response.")
             return None
         
         # Check the status of the generation job periodically until it's completed
@@ -342,9 +349,9 @@ def Leonardo_generate_image_OLD(model_id, prompt, height, width, payload=None, n
             return None
         
     else:
-        print(f"Image generation failed. Status code: {response.status_code}")
+        logger.error(f"Image generation failed. Status code: {response.status_code}")
         rfplogger(response.text)
-        print("Response:", response.text)
+        logger.error(f"Response: {response.text}")
         return None
     
 ### FOR TEST PURPOSES
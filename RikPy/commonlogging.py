@@ -1,7 +1,82 @@
+import json
 import logging
+import os
+import time
 
-def configure_logger():  
-    # Configure the logger
-    logging.basicConfig(level=logging.INFO)  # Set the logging level to INFO or your preferred level
-    logger = logging.getLogger(__name__)  # Create a logger object for your module (__name__ will use the current module's name)
-    return logger
\ No newline at end of file
+# RIKPY_LOG_LEVEL sets the level of every RikPy logger (default INFO),
+# RIKPY_LOG_FORMAT=json switches the output to one JSON object per line
+LOG_LEVEL_ENV = "RIKPY_LOG_LEVEL"
+LOG_FORMAT_ENV = "RIKPY_LOG_FORMAT"
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        # Structured fields passed as logger.info(..., extra={'fields': {...}})
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logger(name="RikPy", level=None, json_format=None):
+    '''
+    Returns the logger for a RikPy module (pass __name__).
+    level and json_format default to the RIKPY_LOG_LEVEL and RIKPY_LOG_FORMAT environment variables.
+    Only the "RikPy" logger gets a handler and a level, the root logger is left to the application.
+    '''
+    if level is None:
+        level = os.getenv(LOG_LEVEL_ENV, "INFO").upper()
+    if json_format is None:
+        json_format = os.getenv(LOG_FORMAT_ENV, "").lower() == "json"
+
+    package_logger = logging.getLogger("RikPy")
+    package_logger.setLevel(level)
+    # Added once, by whichever module is imported first
+    if not any(getattr(handler, 'rikpy_handler', False) for handler in package_logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter() if json_format else logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+        handler.rikpy_handler = True
+        package_logger.addHandler(handler)
+        # Our handler already prints the records, a configured root would print them twice
+        package_logger.propagate = False
+
+    logger = logging.getLogger(name)  # Create a logger object for your module (__name__ will use the current module's name)
+    return logger
+
+class ProgressReporter:
+    '''
+    Rate-limited progress logging for hot loops: update() is cheap and only logs
+    once every interval seconds, done() logs the final count and rate.
+    '''
+    def __init__(self, logger, message, total=None, interval=5.0, level=logging.INFO):
+        self.logger = logger
+        self.message = message
+        self.total = total
+        self.interval = interval
+        self.level = level
+        self.count = 0
+        self.start = time.monotonic()
+        self.last_report = self.start
+
+    def _log(self, now):
+        elapsed = now - self.start
+        rate = self.count / elapsed if elapsed else 0.0
+        progress = f"{self.count}/{self.total}" if self.total else f"{self.count}"
+        self.logger.log(self.level, f"{self.message}: {progress} ({rate:.1f}/s)",
+                        extra={'fields': {'progress': self.count, 'total': self.total, 'elapsed': round(elapsed, 3)}})
+
+    def update(self, count=1):
+        self.count += count
+        now = time.monotonic()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            if self.logger.isEnabledFor(self.level):
+                self._log(now)
+
+    def done(self):
+        if self.logger.isEnabledFor(self.level):
+            self._log(time.monotonic())
@@ -1,12 +1,14 @@
 import openai
 import os
-import logging
 from .customresponse import CustomResponse
+from .commonlogging import configure_logger
 import requests
 import json
 import tiktoken
 from typing import Optional
 
+logger = configure_logger(__name__)
+
 def get_default_chat_model() -> str:
     """
     Returns the model your app should use when the caller
@@ -31,13 +33,13 @@ def OpenAI_generate_response(prompt: str, openai_key: str = "", model: Optional[
     
     try:
         # Executes the prompt and returns the response without parsing
-        logging.info("Warming Up the Wisdom Workshop!")
+        logger.info("Warming Up the Wisdom Workshop!")
         
         # Create client with API key (new OpenAI API pattern)
         client = openai.OpenAI(api_key=openai_key)
 
         chosen_model = model or get_default_chat_model()
-        logging.info(f"Assembling Words of Wisdom with {chosen_model}!")
+        logger.info(f"Assembling Words of Wisdom with {chosen_model}!")
 
         details_response = client.chat.completions.create(
             model=chosen_model,
@@ -53,19 +55,19 @@ def OpenAI_generate_response(prompt: str, openai_key: str = "", model: Optional[
     
     ## https://platform.openai.com/docs/guides/error-codes/python-library-error-types
     except openai.InternalServerError as e:
-        logging.error(f"OpenAI Internal Server Error: {str(e)}")
+        logger.error(f"OpenAI Internal Server Error: {str(e)}")
         return CustomResponse(data={"error": str(e)}, status_code=400)
     except openai.RateLimitError as e: 
-        logging.error(f"OpenAI Rate Limit Error: {str(e)}")
+        logger.error(f"OpenAI Rate Limit Error: {str(e)}")
         return CustomResponse(data={"error": str(e)}, status_code=429)
     except openai.BadRequestError as e:
-        logging.error(f"OpenAI Bad Request Error: {str(e)}")
+        logger.error(f"OpenAI Bad Request Error: {str(e)}")
         return CustomResponse(data={"error": str(e)}, status_code=500)
     except openai.APIError as e:
-        logging.error(f"OpenAI API Error: {str(e)}")
+        logger.error(f"OpenAI API Error: {str(e)}")
         return CustomResponse(data={"error": str(e)}, status_code=500)
     except Exception as e:
-        logging.error(f"Unexpected error in OpenAI_generate_response: {str(e)}")
+        logger.error(f"Unexpected error in OpenAI_generate_response: {str(e)}")
         return CustomResponse(data={"error": str(e)}, status_code=500)
         
 def OpenAI_generate_image(image_prompt: str, number_images: int = 1, quality: str = "standard", size: str = "1024x1024", 
@@ -75,14 +77,14 @@ def OpenAI_generate_image(image_prompt: str, number_images: int = 1, quality: st
     try:
         # Executes the prompt and returns the response without parsing
         
-        logging.info("Sparking the Synapses of Silicon!")
+        logger.info("Sparking the Synapses of Silicon!")
         
         # Create client with API key (new OpenAI API pattern)
         client = openai.OpenAI(api_key=openai_key)
 
         chosen_model = model or get_default_image_model()
-        logging.info(f"Summoning Pixels from the Digital Depths with {chosen_model}!")
-        logging.info(f"Image prompt: {image_prompt}")
+        logger.info(f"Summoning Pixels from the Digital Depths with {chosen_model}!")
+        logger.info(f"Image prompt: {image_prompt}")
         
         image_response = client.images.generate(
             model=chosen_model,
@@ -97,19 +99,19 @@ def OpenAI_generate_image(image_prompt: str, number_images: int = 1, quality: st
     
     ## https://platform.openai.com/docs/guides/error-codes/python-library-error-types
     except openai.InternalServerError as e:
-        logging.error(f"OpenAI Internal Server Error: {str(e)}")
+        logger.error(f"OpenAI Internal Server Error: {str(e)}")
         return CustomResponse(data={"error": str(e)}, status_code=400)
     except openai.RateLimitError as e: 
-        logging.error(f"OpenAI Rate Limit Error: {str(e)}")
+        logger.error(f"OpenAI Rate Limit Error: {str(e)}")
         return CustomResponse(data={"error": str(e)}, status_code=429)
     except openai.BadRequestError as e:
-        logging.error(f"OpenAI Bad Request Error: {str(e)}")
+        logger.error(f"OpenAI Bad Request Error: {str(e)}")
         return CustomResponse(data={"error": str(e)}, status_code=500)
     except openai.APIError as e:
-        logging.error(f"OpenAI API Error: {str(e)}")
+        logger.error(f"OpenAI API Error: {str(e)}")
         return CustomResponse(data={"error": str(e)}, status_code=500)
     except Exception as e:
-        logging.error(f"Unexpected error in OpenAI_generate_image: {str(e)}")
+        logger.error(f"Unexpected error in OpenAI_generate_image: {str(e)}")
         return CustomResponse(data={"error": str(e)}, status_code=500)
     
 def OpenAI_generate_image_request(image_prompt: str, number_images: int = 1, quality: str = "standard", size: str = "1024x1024", 
@@ -118,8 +120,8 @@ def OpenAI_generate_image_request(image_prompt: str, number_images: int = 1, qua
     
     try:
         chosen_model = model or get_default_image_model()
-        logging.info(f"Summoning Pixels from the Digital Depths with {chosen_model}!")
-        logging.info(f"Image prompt: {image_prompt}")
+        logger.info(f"Summoning Pixels from the Digital Depths with {chosen_model}!")
+        logger.info(f"Image prompt: {image_prompt}")
 
         url = "https://api.openai.com/v1/images/generations"
 
@@ -140,17 +142,17 @@ def OpenAI_generate_image_request(image_prompt: str, number_images: int = 1, qua
         response_json = response.json()
 
         # Log all headers for debugging
-        logging.info(f"Response Headers: {response.headers}")
+        logger.info(f"Response Headers: {response.headers}")
 
         if response.status_code != 200: 
-            logging.error(f"OpenAI API request failed with status {response.status_code}: {response_json.get('error', 'Unknown error')}")
+            logger.error(f"OpenAI API request failed with status {response.status_code}: {response_json.get('error', 'Unknown error')}")
             return CustomResponse(data={"error": response_json.get("error", "Unknown error")}, status_code=response.status_code)
         # Extract token usage information from headers
         token_usage = response.headers.get('X-OpenAI-Usage')
         return CustomResponse(data={"response": response_json, "usage": token_usage}, status_code=200)
 
     except requests.exceptions.RequestException as e:
-        logging.error(f"Request exception in OpenAI_generate_image_request: {str(e)}")
+        logger.error(f"Request exception in OpenAI_generate_image_request: {str(e)}")
         return CustomResponse(data={"error": str(e)}, status_code=500)
 
 def OpenAI_num_tokens_from_string(string: str, model: str) -> int:
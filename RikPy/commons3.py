@@ -1,12 +1,67 @@
+import io
 import os
 import uuid 
+import threading
+import json
+import hashlib
+import mimetypes
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+import requests
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import NoCredentialsError, ClientError
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 from datetime import datetime
-from .commonfunctions import download_file_local, delete_local_file, download_file_local_with_query_parameters
+from .commonfunctions import delete_local_file
+from .commonlogging import configure_logger, ProgressReporter
+from .commonimage import get_image_process_pool
 
+logger = configure_logger(__name__)
+
+# Size of each cached client's connection pool (botocore's default is 10), raise it for wide thread pools
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "50"))
+
+_s3_clients = {}
+_s3_clients_lock = threading.Lock()
+
+# (bucket, key) pairs known to exist, filled by s3_object_exists so repeated content-hash uploads skip the HEAD
+_s3_known_keys = set()
+_s3_known_keys_lock = threading.Lock()
+
+MB = 1024 * 1024
+
+# Longest lifetime SigV4 allows for a presigned url (7 days)
+S3_PRESIGN_MAX_EXPIRES = 604800
+
+# Threads per transfer for multipart objects, kept low because batch functions already run files in parallel
+S3_TRANSFER_CONFIG = TransferConfig(multipart_threshold=8 * MB, multipart_chunksize=8 * MB, max_concurrency=4)
+S3_MAX_WORKERS = int(os.getenv("S3_MAX_WORKERS", "16"))
+
+# Shared HTTP session for URL-to-S3 streaming, sized so every worker thread keeps its connection
+_http_session = requests.Session()
+_http_pool_size = 0
+_http_pool_lock = threading.Lock()
+
+def s3_size_http_pool(max_workers=None):
+    '''
+    Grows the shared session's connection pools to max_workers (default S3_MAX_WORKERS), so a batch
+    with more threads than the pool does not discard connections and reconnect per download.
+    '''
+    global _http_pool_size
+    pool_size = max_workers or S3_MAX_WORKERS
+    if pool_size <= _http_pool_size:
+        return
+    with _http_pool_lock:
+        if pool_size > _http_pool_size:
+            _http_session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=pool_size))
+            _http_session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=pool_size))
+            _http_pool_size = pool_size
+
+s3_size_http_pool()
 
 #### AUX FUNCTIONS
 def generate_new_filename(original_filename):
@@ -30,6 +85,203 @@ def generate_new_filename(original_filename):
 
     return new_filename
 
+def get_boto3_s3_client(access_key, secret_key, region=None, endpoint_url=None, max_pool_connections=None):
+    '''
+    Returns a cached boto3 S3 client for (access key, region, endpoint).
+    boto3 clients are thread-safe, so one client and its connection pool are shared by every caller.
+    Requests and presigned urls are signed with SigV4, which every region accepts.
+    '''
+    if max_pool_connections is None:
+        max_pool_connections = S3_MAX_POOL_CONNECTIONS
+    key = (access_key, region, endpoint_url, max_pool_connections)
+
+    client = _s3_clients.get(key)
+    if client is None:
+        with _s3_clients_lock:
+            client = _s3_clients.get(key)
+            if client is None:
+                client = boto3.client('s3',
+                                      aws_access_key_id=access_key,
+                                      aws_secret_access_key=secret_key,
+                                      region_name=region,
+                                      endpoint_url=endpoint_url,
+                                      config=Config(signature_version='s3v4', max_pool_connections=max_pool_connections))
+                _s3_clients[key] = client
+    return client
+
+def get_s3_client(s3_config_dict, max_pool_connections=None):
+    '''Returns the cached client for an s3_config_dict'''
+    if s3_config_dict is None:
+        raise ValueError("s3_config_dict is required for this function.")
+    return get_boto3_s3_client(access_key=s3_config_dict['S3_ACCESS_KEY_ID'],
+                               secret_key=s3_config_dict['S3_SECRET_ACCESS_KEY'],
+                               region=s3_config_dict.get('S3_CUBE_NAME'),
+                               endpoint_url=s3_config_dict.get('S3_ENDPOINT_URL'),
+                               max_pool_connections=max_pool_connections)
+
+def s3_clear_client_cache():
+    with _s3_clients_lock:
+        _s3_clients.clear()
+
+def s3_run_concurrently(func, items, max_workers=None):
+    '''
+    Runs func(item) on a thread pool and yields (item, result, exception) as calls finish.
+    items may be a generator, at most a few batches of work are queued at a time so memory stays flat.
+    '''
+    max_workers = max_workers or S3_MAX_WORKERS
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def drain(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                item = pending.pop(future)
+                exception = future.exception()
+                yield item, (None if exception else future.result()), exception
+
+        for item in items:
+            pending[executor.submit(func, item)] = item
+            if len(pending) >= max_workers * 4:
+                yield from drain(FIRST_COMPLETED)
+        while pending:
+            yield from drain(FIRST_COMPLETED)
+
+def s3_transfer_config(part_size_mb=8, threshold_mb=8, max_concurrency=10):
+    '''
+    TransferConfig for single large uploads/downloads: files above threshold_mb are sent in
+    part_size_mb parts, max_concurrency parts at a time.
+    '''
+    return TransferConfig(multipart_threshold=threshold_mb * MB, multipart_chunksize=part_size_mb * MB, max_concurrency=max_concurrency)
+
+def s3_upload_extra_args(file_name, make_public=False, content_type=None, cache_control=None):
+    '''ExtraArgs for upload_file/upload_fileobj, the ACL is set in the upload request itself'''
+    extra_args = {'ContentType': content_type or mimetypes.guess_type(file_name)[0] or 'application/octet-stream'}
+    if make_public:
+        extra_args['ACL'] = 'public-read'
+    if cache_control:
+        extra_args['CacheControl'] = cache_control
+    return extra_args
+
+class S3ProgressCallback:
+    '''
+    boto3 transfer callback that adds up the bytes sent by every part thread and calls
+    callback(bytes_transferred, total_bytes) with the running total.
+    '''
+    def __init__(self, callback, total_bytes=None):
+        self.callback = callback
+        self.total_bytes = total_bytes
+        self.bytes_transferred = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, bytes_amount):
+        with self._lock:
+            self.bytes_transferred += bytes_amount
+            bytes_transferred = self.bytes_transferred
+        self.callback(bytes_transferred, self.total_bytes)
+
+def file_md5(file_path, chunk_size=1024 * 1024):
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def content_hash_filename(digest, original_filename):
+    '''Content-addressed name: the first 32 hex characters of the SHA-256 plus the original extension'''
+    return f"{digest[:32]}{os.path.splitext(original_filename)[1].lower()}"
+
+class S3Manifest:
+    '''
+    Small JSON dict persisted on disk, shared by threads. Records what is known to be in the bucket
+    so repeated runs avoid HEAD requests and re-hashing. save() writes atomically.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r') as file:
+                self.entries = json.load(file)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self.entries.get(key, default)
+
+    def set(self, key, value):
+        with self._lock:
+            self.entries[key] = value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self.entries.pop(key, default)
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self.entries)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w') as file:
+            file.write(data)
+        os.replace(temp_path, self.path)
+
+def s3_object_exists(s3, bucket_name, object_key, manifest=None):
+    '''
+    HEAD check cached for the life of the process (and in manifest, an S3Manifest, across runs).
+    Only existing keys are cached, a missing key is checked again next time.
+    '''
+    manifest_key = f"{bucket_name}/{object_key}"
+    if (bucket_name, object_key) in _s3_known_keys or (manifest is not None and manifest.get(manifest_key)):
+        return True
+    try:
+        s3.head_object(Bucket=bucket_name, Key=object_key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+    s3_remember_key(bucket_name, object_key, manifest)
+    return True
+
+def s3_remember_key(bucket_name, object_key, manifest=None):
+    with _s3_known_keys_lock:
+        _s3_known_keys.add((bucket_name, object_key))
+    if manifest is not None:
+        manifest.set(f"{bucket_name}/{object_key}", True)
+
+def s3_forget_keys(bucket_name, object_keys, manifest=None):
+    '''Drops deleted keys from the known-key cache (and manifest) so s3_object_exists checks them again'''
+    with _s3_known_keys_lock:
+        for object_key in object_keys:
+            _s3_known_keys.discard((bucket_name, object_key))
+    if manifest is not None:
+        for object_key in object_keys:
+            manifest.pop(f"{bucket_name}/{object_key}")
+
+def s3_local_file_matches(local_path, obj, compare_etag=False):
+    '''
+    True when local_path already holds the object: same size and same mtime as LastModified,
+    or, with compare_etag, the same MD5 as a single-part ETag.
+    '''
+    try:
+        stat = os.stat(local_path)
+    except FileNotFoundError:
+        return False
+    if stat.st_size != obj['Size']:
+        return False
+    if int(stat.st_mtime) == int(obj['LastModified'].timestamp()):
+        return True
+    # Multipart ETags ("<md5>-<parts>") are not the MD5 of the content
+    if compare_etag and '-' not in obj['ETag']:
+        return file_md5(local_path) == obj['ETag']
+    return False
+
 #### MAIN FUNCTIONS
 
 def s3_environment():
@@ -42,6 +294,7 @@ def s3_environment():
     S3_CUBE_PUBLIC = os.getenv("S3_CUBE_PUBLIC", 'getaiir/public/')
     S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", 'getaiir')
     S3_CUBE_NAME = os.getenv("S3_CUBE_NAME", 'eu-central-1')
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # Only for S3-compatible services, None uses AWS
 
     # Create a dictionary to store the values
     s3_config_dict = {
@@ -50,98 +303,123 @@ def s3_environment():
         "S3_URL": S3_URL,
         "S3_CUBE_NAME": S3_CUBE_NAME,
         "S3_CUBE_PUBLIC": S3_CUBE_PUBLIC,
-        "S3_BUCKET_NAME": S3_BUCKET_NAME
+        "S3_BUCKET_NAME": S3_BUCKET_NAME,
+        "S3_ENDPOINT_URL": S3_ENDPOINT_URL
     }
 
     return s3_config_dict
 
+def s3_iter_objects(folder_name="", s3_config_dict=None, delimiter=None, start_after=None, page_size=1000):
+    '''
+    Yields every object under folder_name as a dict with Key, Size, ETag and LastModified,
+    one list_objects_v2 page at a time so memory stays constant however large the prefix is.
+    With a delimiter (e.g. '/') only the direct children are listed and sub-folders are yielded as {'Prefix': ...}.
+    start_after resumes a listing after the given key.
+    '''
+    bucket_name = s3_config_dict['S3_BUCKET_NAME']
+    s3 = get_s3_client(s3_config_dict)
+
+    prefix = folder_name if not folder_name or folder_name.endswith('/') else folder_name + '/'
+    params = {'Bucket': bucket_name, 'Prefix': prefix, 'PaginationConfig': {'PageSize': page_size}}
+    if delimiter:
+        params['Delimiter'] = delimiter
+    if start_after:
+        params['StartAfter'] = start_after
+
+    for page in s3.get_paginator('list_objects_v2').paginate(**params):
+        for common_prefix in page.get('CommonPrefixes', []):
+            yield {'Prefix': common_prefix['Prefix']}
+        for obj in page.get('Contents', []):
+            yield {
+                'Key': obj['Key'],
+                'Size': obj['Size'],
+                'ETag': obj['ETag'].strip('"'),
+                'LastModified': obj['LastModified']
+            }
+
 def s3_list_files_in_folder(folder_name="", s3_config_dict=None):
 
     '''
     Lists all object in a folder_name from the bucket_name
     '''
-    access_key=s3_config_dict['S3_ACCESS_KEY_ID']
-    secret_key=s3_config_dict['S3_SECRET_ACCESS_KEY']
-    bucket_name=s3_config_dict['S3_BUCKET_NAME']
-    cube_name=s3_config_dict['S3_CUBE_NAME']
-
-    #s3 = boto3.client('s3', aws_access_key_id=access_key, aws_secret_access_key=secret_key)
-    s3 = boto3.client('s3', 
-            aws_access_key_id=access_key, 
-            aws_secret_access_key=secret_key,
-            region_name=cube_name)
-
-    prefix = folder_name + '/' if folder_name else None
-    response = s3.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-  
-    # Check if objects were listed successfully
-    if 'Contents' in response:
-        objects = response['Contents']
-        for obj in objects:
-            print("Object Key:", obj['Key'])
-    else:
-        print("No objects found in the bucket.")
+    objects = list(s3_iter_objects(folder_name=folder_name, s3_config_dict=s3_config_dict))
+    if not objects:
+        logger.info("No objects found in the bucket.")
 
     return objects
 
-def s3_download_files_in_folder(folder_name="", destination_folder="", s3_config_dict=None):
+def s3_download_files_in_folder(folder_name="", destination_folder="", s3_config_dict=None, max_workers=None, skip_unchanged=True, compare_etag=False, transfer_config=None):
     '''
     Downloads all files in folder_name from the bucket_name to the destination_folder
+    Files run on max_workers threads; with skip_unchanged, files whose size and mtime (or ETag with compare_etag) already match are not downloaded again.
+    Returns a dict with the downloaded and skipped counts and the keys that failed.
     examples of working parameters
     dest_folder="C:\\Users\\rforn\\Dropbox\\Code\\RikPy\\Downloads\\Wine"
     folder_name="wine/image"
     '''
-    access_key = s3_config_dict['S3_ACCESS_KEY_ID']
-    secret_key = s3_config_dict['S3_SECRET_ACCESS_KEY']
     bucket_name = s3_config_dict['S3_BUCKET_NAME']
-    cube_name = s3_config_dict['S3_CUBE_NAME']
-
-    s3 = boto3.client('s3',
-                      aws_access_key_id=access_key,
-                      aws_secret_access_key=secret_key,
-                      region_name=cube_name)
-
-    prefix = folder_name + '/' if folder_name else None
-    response = s3.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-
-    if 'Contents' in response:
-        objects = response['Contents']
-        for obj in objects:
-            # Get the key (filename) of the object
-            key = obj['Key']
-            if key.endswith('/'):
-                print(f"Skipping folder: {key}")
+    s3 = get_s3_client(s3_config_dict)
+    transfer_config = transfer_config or S3_TRANSFER_CONFIG
+    if destination_folder:
+        os.makedirs(destination_folder, exist_ok=True)
+
+    def download(obj):
+        key = obj['Key']
+        destination_path = os.path.join(destination_folder, os.path.basename(key))
+        if skip_unchanged and s3_local_file_matches(destination_path, obj, compare_etag=compare_etag):
+            return False
+        s3.download_file(bucket_name, key, destination_path, Config=transfer_config)
+        # Keep the local mtime equal to LastModified so the next run can skip the file
+        modified = obj['LastModified'].timestamp()
+        os.utime(destination_path, (modified, modified))
+        logger.debug(f"Downloaded {key} to {destination_path}")
+        return True
+
+    def files():
+        for obj in s3_iter_objects(folder_name=folder_name, s3_config_dict=s3_config_dict):
+            if obj['Key'].endswith('/'):
+                logger.debug(f"Skipping folder: {obj['Key']}")
                 continue
-            filename = os.path.basename(key)
-            destination_path = os.path.join(destination_folder, filename)
-            s3.download_file(bucket_name, key, destination_path)
-            print(f"Downloaded {key} to {destination_path}")
-    else:
-        print("No objects found in the bucket.")
-    return
-
-def s3_upload_local_file(file_name="", folder_name=None, s3_config_dict=None, bnewname=False, make_public=False, b_delete_local_file=True):
+            yield obj
+
+    result = {'downloaded': 0, 'skipped': 0, 'failed': []}
+    progress = ProgressReporter(logger, f"Downloading {folder_name}")
+    for obj, downloaded, exception in s3_run_concurrently(download, files(), max_workers=max_workers):
+        if exception:
+            logger.error(f"Error downloading file {obj['Key']}: {exception}")
+            result['failed'].append(obj['Key'])
+        elif downloaded:
+            result['downloaded'] += 1
+        else:
+            result['skipped'] += 1
+        progress.update()
+    progress.done()
+
+    if not progress.count:
+        logger.info("No objects found in the bucket.")
+    return result
+
+def s3_upload_local_file(file_name="", folder_name=None, s3_config_dict=None, bnewname=False, make_public=False, b_delete_local_file=True,
+                         content_type=None, cache_control=None, transfer_config=None, progress_callback=None, bcontenthash=False, manifest=None,
+                         transform=None):
     '''
     Uploads from file name to the folder_name
     file_name is local, must not be a file_path
-    
+    content_type defaults to a guess from the extension; ACL, ContentType and CacheControl go in the upload request.
+    transfer_config (see s3_transfer_config) tunes multipart uploads, progress_callback(bytes_transferred, total_bytes) reports progress.
+    bcontenthash names the object by its SHA-256 and skips the upload when that key already exists (cached HEAD, optional S3Manifest).
+    transform, a commonimage.ImageTransform, uploads the converted variants instead and returns the url of the first one.
     '''
 
     if s3_config_dict is None:
         raise ValueError("s3_config_dict is required for this function.")
     
     # Extract relevant values from s3_config_dict
-    access_key=s3_config_dict['S3_ACCESS_KEY_ID']
-    secret_key=s3_config_dict['S3_SECRET_ACCESS_KEY']
     bucket_name=s3_config_dict['S3_BUCKET_NAME']
     s3_url=s3_config_dict['S3_URL']
-    cube_name=s3_config_dict['S3_CUBE_NAME']
     cube_public=s3_config_dict['S3_CUBE_PUBLIC']
 
-    s3 = boto3.client('s3', 
-                      aws_access_key_id=access_key, 
-                      aws_secret_access_key=secret_key,
-                      region_name=cube_name)
+    s3 = get_s3_client(s3_config_dict)
 
     # Ensure folder ends with a '/' if it's not empty
     if folder_name is None:
@@ -149,85 +427,369 @@ def s3_upload_local_file(file_name="", folder_name=None, s3_config_dict=None, bn
     elif not folder_name.endswith('/'):
         folder_name += '/'
 
-    if bnewname:
-        # Generate a new name for the file
-        new_file_name = generate_new_filename(file_name)
-        new_file_path = os.path.join(os.path.dirname(file_name), new_file_name)
-        os.rename(file_name, new_file_path)
-        file_name = new_file_path
-
-    # object_key = f"{folder_name}{file_name}"
-    object_key = f"{folder_name}{os.path.basename(file_name)}"
+    if transform is not None:
+        try:
+            with open(file_name, 'rb') as file:
+                variants = transform.apply_bytes(file.read(), generate_new_filename(file_name) if bnewname else file_name)
+            variant_urls = s3_upload_variants(variants, folder_name=folder_name, s3_config_dict=s3_config_dict, content_type=transform.mime_type,
+                                              make_public=make_public, cache_control=cache_control, bcontenthash=bcontenthash, manifest=manifest)
+        except Exception as e:
+            logger.error(f"An error occurred while uploading the file: {str(e)}")
+            return None
+        if b_delete_local_file: delete_local_file(file_name)
+        return variant_urls[0]
+
+    if bcontenthash:
+        # Same content, same key: the local file keeps its name
+        object_key = f"{folder_name}{content_hash_filename(file_sha256(file_name), file_name)}"
+    else:
+        if bnewname:
+            # Generate a new name for the file
+            new_file_name = generate_new_filename(file_name)
+            new_file_path = os.path.join(os.path.dirname(file_name), new_file_name)
+            os.rename(file_name, new_file_path)
+            file_name = new_file_path
+
+        # object_key = f"{folder_name}{file_name}"
+        object_key = f"{folder_name}{os.path.basename(file_name)}"
     s3_url = s3_config_dict['S3_URL']
     file_url = s3_url + '/' + object_key
 
     try:
-        response = s3.upload_file(file_name, bucket_name, object_key)
-
-        # Set the ACL to public-read if specified
-        if make_public:
-            s3.put_object_acl(Bucket=bucket_name, Key=object_key, ACL='public-read')
-
-        print(f"File '{object_key}' uploaded successfully to bucket '{bucket_name}'.")
+        if bcontenthash and s3_object_exists(s3, bucket_name, object_key, manifest):
+            logger.debug(f"File '{object_key}' already in bucket '{bucket_name}', upload skipped.")
+            if b_delete_local_file: delete_local_file(file_name)
+            return file_url
+
+        extra_args = s3_upload_extra_args(file_name, make_public=make_public, content_type=content_type, cache_control=cache_control)
+        callback = S3ProgressCallback(progress_callback, os.path.getsize(file_name)) if progress_callback else None
+        response = s3.upload_file(file_name, bucket_name, object_key, ExtraArgs=extra_args,
+                                  Config=transfer_config or s3_transfer_config(), Callback=callback)
+
+        logger.debug(f"File '{object_key}' uploaded successfully to bucket '{bucket_name}'.")
+        if bcontenthash: s3_remember_key(bucket_name, object_key, manifest)
         
         if b_delete_local_file: delete_local_file(file_name)
         
         return file_url
         return object_key
     except Exception as e:
-        print(f"An error occurred while uploading the file: {str(e)}")
+        logger.error(f"An error occurred while uploading the file: {str(e)}")
         return None
     
-def s3_delete_file(object_key, s3_config_dict):
-    access_key = s3_config_dict['S3_ACCESS_KEY_ID']
-    secret_key = s3_config_dict['S3_SECRET_ACCESS_KEY']
+def s3_sync_up(local_dir, prefix="", s3_config_dict=None, manifest_path=None, delete_orphans=False, make_public=False, cache_control=None, max_workers=None):
+    '''
+    Uploads the new and changed files of local_dir (recursively) under prefix, local files are kept.
+    With manifest_path, files are compared to the size, mtime and SHA-256 recorded by the previous sync,
+    otherwise to the remote listing (size, and local mtime newer than LastModified).
+    delete_orphans removes remote keys under prefix that no longer exist locally, in DeleteObjects batches.
+    Returns a dict with the uploaded, skipped and deleted counts and the failed keys.
+    '''
+    if s3_config_dict is None:
+        raise ValueError("s3_config_dict is required for this function.")
+    bucket_name = s3_config_dict['S3_BUCKET_NAME']
+    s3 = get_s3_client(s3_config_dict)
+    if prefix and not prefix.endswith('/'):
+        prefix += '/'
+
+    manifest = S3Manifest(manifest_path) if manifest_path else None
+    remote = None
+    if manifest is None or delete_orphans:
+        remote = {obj['Key']: obj for obj in s3_iter_objects(folder_name=prefix, s3_config_dict=s3_config_dict)}
+
+    def local_files():
+        for root, _, files in os.walk(local_dir):
+            for name in files:
+                local_path = os.path.join(root, name)
+                yield os.path.relpath(local_path, local_dir).replace(os.sep, '/'), local_path
+
+    def sync(item):
+        relative_path, local_path = item
+        object_key = prefix + relative_path
+        stat = os.stat(local_path)
+        entry = {'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+        if manifest is not None:
+            previous = manifest.get(relative_path)
+            if previous and previous['size'] == entry['size'] and previous['mtime'] == entry['mtime']:
+                return False
+            # Touched but identical files only cost a hash, not an upload
+            entry['sha256'] = file_sha256(local_path)
+            if previous and previous.get('sha256') == entry['sha256']:
+                manifest.set(relative_path, entry)
+                return False
+        else:
+            obj = remote.get(object_key)
+            if obj and obj['Size'] == entry['size'] and entry['mtime'] <= obj['LastModified'].timestamp():
+                return False
+
+        extra_args = s3_upload_extra_args(local_path, make_public=make_public, cache_control=cache_control)
+        s3.upload_file(local_path, bucket_name, object_key, ExtraArgs=extra_args, Config=S3_TRANSFER_CONFIG)
+        if manifest is not None:
+            manifest.set(relative_path, entry)
+        logger.debug(f"Uploaded {local_path} to {object_key}")
+        return True
+
+    result = {'uploaded': 0, 'skipped': 0, 'deleted': 0, 'failed': []}
+    local_keys = set()
+    progress = ProgressReporter(logger, f"Syncing {local_dir} to {prefix}")
+    for (relative_path, local_path), uploaded, exception in s3_run_concurrently(sync, local_files(), max_workers=max_workers):
+        local_keys.add(prefix + relative_path)
+        if exception:
+            logger.error(f"An error occurred while uploading {local_path}: {exception}")
+            result['failed'].append(prefix + relative_path)
+        elif uploaded:
+            result['uploaded'] += 1
+        else:
+            result['skipped'] += 1
+        progress.update()
+    progress.done()
+
+    if delete_orphans:
+        orphans = [key for key in remote if key not in local_keys and not key.endswith('/')]
+        if orphans:
+            deleted = s3_client_delete_keys(s3, bucket_name, orphans, max_workers=max_workers)
+            result['deleted'] = deleted['deleted']
+            result['failed'].extend(error.get('Key') for error in deleted['errors'])
+        if manifest is not None:
+            for key in orphans:
+                manifest.pop(key[len(prefix):])
+
+    if manifest is not None:
+        manifest.save()
+    return result
+
+def s3_upload_variants(variants, folder_name="", s3_config_dict=None, content_type=None, make_public=False, cache_control=None, bcontenthash=False, manifest=None):
+    '''
+    Uploads in-memory files given as [(file_name, bytes)], e.g. the output of ImageTransform.apply_bytes.
+    Returns their S3 file urls in the same order, raises on failure.
+    '''
     bucket_name = s3_config_dict['S3_BUCKET_NAME']
-    cube_name = s3_config_dict['S3_CUBE_NAME']
+    s3 = get_s3_client(s3_config_dict)
+    if folder_name and not folder_name.endswith('/'):
+        folder_name += '/'
 
-    #s3 = boto3.client('s3', aws_access_key_id=access_key, aws_secret_access_key=secret_key)
-    s3 = boto3.client('s3', 
-                    aws_access_key_id=access_key, 
-                    aws_secret_access_key=secret_key,
-                    region_name=cube_name)
+    file_urls = []
+    for file_name, data in variants:
+        if bcontenthash:
+            file_name = content_hash_filename(hashlib.sha256(data).hexdigest(), file_name)
+        object_key = f"{folder_name or ''}{file_name}"
+        if not (bcontenthash and s3_object_exists(s3, bucket_name, object_key, manifest)):
+            extra_args = s3_upload_extra_args(file_name, make_public=make_public, content_type=content_type, cache_control=cache_control)
+            s3.upload_fileobj(io.BytesIO(data), bucket_name, object_key, ExtraArgs=extra_args, Config=S3_TRANSFER_CONFIG)
+            if bcontenthash: s3_remember_key(bucket_name, object_key, manifest)
+        file_urls.append(s3_config_dict['S3_URL'] + '/' + object_key)
+    return file_urls
+
+def s3_delete_file(object_key, s3_config_dict, manifest=None):
+    bucket_name = s3_config_dict['S3_BUCKET_NAME']
+    s3 = get_s3_client(s3_config_dict)
 
     try:
         response = s3.delete_object(Bucket=bucket_name, Key=object_key)
-        print(f"File '{object_key}' deleted successfully from bucket '{bucket_name}'.")
+        s3_forget_keys(bucket_name, [object_key], manifest)
+        logger.debug(f"File '{object_key}' deleted successfully from bucket '{bucket_name}'.")
         return response
     except Exception as e:
-        print(f"An error occurred while deleting the file: {str(e)}")
+        logger.error(f"An error occurred while deleting the file: {str(e)}")
         return None
    
-def s3_upload_file_from_url(file_url="", folder_name="", s3_config_dict=None, bnewname=False, make_public=False):
-       
+def s3_generate_presigned_urls(object_keys, s3_config_dict=None, method="get", expires_in=3600, content_type=None):
+    '''
+    Returns a dict of object key -> presigned url so clients can GET (method="get") or PUT (method="put")
+    the objects directly against S3 until the urls expire (expires_in seconds).
+    Signing is done locally with the cached client, no request is made per key.
+    content_type, for PUT urls, must then be sent by the client as its Content-Type header.
+    SigV4 urls live at most 7 days, a longer expires_in raises ValueError.
+    '''
     if s3_config_dict is None:
         raise ValueError("s3_config_dict is required for this function.")
+    if not 0 < expires_in <= S3_PRESIGN_MAX_EXPIRES:
+        raise ValueError(f"expires_in must be between 1 and {S3_PRESIGN_MAX_EXPIRES} seconds")
+    operations = {'get': 'get_object', 'put': 'put_object'}
+    if method.lower() not in operations:
+        raise ValueError(f"method must be one of {list(operations)}")
+    operation = operations[method.lower()]
 
-    # Download the file to a local path
-    #file_path = download_file_local(file_url)
-    file_path = download_file_local_with_query_parameters(file_url=file_url)
+    bucket_name = s3_config_dict['S3_BUCKET_NAME']
+    s3 = get_s3_client(s3_config_dict)
+
+    presigned_urls = {}
+    for object_key in object_keys:
+        params = {'Bucket': bucket_name, 'Key': object_key}
+        if content_type and operation == 'put_object':
+            params['ContentType'] = content_type
+        presigned_urls[object_key] = s3.generate_presigned_url(operation, Params=params, ExpiresIn=expires_in)
+    return presigned_urls
+
+def s3_generate_presigned_url(object_key, s3_config_dict=None, method="get", expires_in=3600, content_type=None):
+    return s3_generate_presigned_urls([object_key], s3_config_dict=s3_config_dict, method=method, expires_in=expires_in, content_type=content_type)[object_key]
+
+def s3_iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def s3_client_delete_keys(s3, bucket_name, keys, max_workers=None, batch_size=1000, manifest=None):
+    '''
+    Deletes keys (any iterable) from bucket_name with DeleteObjects requests of up to 1,000 keys,
+    several batches at a time. Works with any boto3 S3 client, so CloudCube callers can reuse it.
+    The keys are dropped from the known-key cache and manifest.
+    Returns a dict with the deleted count and the per-key errors as {'Key', 'Code', 'Message'}.
+    '''
+    def delete(batch):
+        # Forget first, a key that survives a failed delete only costs a HEAD later
+        s3_forget_keys(bucket_name, batch, manifest)
+        # Quiet mode only reports the keys that failed
+        response = s3.delete_objects(Bucket=bucket_name, Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True})
+        return response.get('Errors', [])
+
+    result = {'deleted': 0, 'errors': []}
+    progress = ProgressReporter(logger, f"Deleting from {bucket_name}")
+    for batch, errors, exception in s3_run_concurrently(delete, s3_iter_batches(keys, batch_size), max_workers=max_workers):
+        if exception:
+            logger.error(f"An error occurred while deleting {len(batch)} keys: {exception}")
+            errors = [{'Key': key, 'Code': type(exception).__name__, 'Message': str(exception)} for key in batch]
+        for error in errors:
+            logger.debug(f"Error deleting file {error.get('Key')}: {error.get('Code')} {error.get('Message')}")
+        result['errors'].extend(errors)
+        result['deleted'] += len(batch) - len(errors)
+        progress.update(len(batch))
+    progress.done()
+    return result
+
+def s3_delete_keys(keys, s3_config_dict=None, max_workers=None, manifest=None):
+    '''Deletes a list of object keys in batches, see s3_client_delete_keys for the result'''
+    if s3_config_dict is None:
+        raise ValueError("s3_config_dict is required for this function.")
+    return s3_client_delete_keys(get_s3_client(s3_config_dict), s3_config_dict['S3_BUCKET_NAME'], keys, max_workers=max_workers, manifest=manifest)
 
-    if bnewname:
-        # Generate a new filename
-        new_filename = generate_new_filename(file_path)
-
-        # Rename the local file with the new filename
-        new_file_path = os.path.join(os.path.dirname(file_path), new_filename)
-        os.rename(file_path, new_file_path)
-
-        # Upload the file with the new filename
-        file_url = s3_upload_local_file(file_name=new_file_path, folder_name=folder_name, s3_config_dict=s3_config_dict, make_public=make_public)
-        # print(f"object_key {object_key}")
-        # Delete the local file (both the original and renamed versions)
-        delete_local_file(new_file_path)
-    else:
-        # Upload the file with its original name
-        file_url = s3_upload_local_file(file_name=file_path, folder_name=folder_name, s3_config_dict=s3_config_dict)
+def s3_delete_prefix(folder_name, s3_config_dict=None, max_workers=None, manifest=None):
+    '''
+    Deletes every object under folder_name, deleting each listing page as it arrives.
+    An empty folder_name is refused so a missing argument cannot empty the bucket.
+    '''
+    if not folder_name:
+        raise ValueError("folder_name is required for this function.")
+    keys = (obj['Key'] for obj in s3_iter_objects(folder_name=folder_name, s3_config_dict=s3_config_dict))
+    return s3_delete_keys(keys, s3_config_dict=s3_config_dict, max_workers=max_workers, manifest=manifest)
 
-        # Delete the local file
-        delete_local_file(file_path)
+@contextmanager
+def s3_open_url_stream(file_url, timeout=60):
+    '''
+    Opens file_url on the shared session and yields the response, whose raw stream is the
+    decoded body ready for upload_fileobj. Raises requests.HTTPError on a bad status.
+    '''
+    with _http_session.get(file_url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        # Undo any Content-Encoding so the stored object is the file itself
+        response.raw.decode_content = True
+        yield response
 
-    # s3_url = s3_config_dict['S3_URL']
-    # file_url = s3_url + '/' + object_key
-    
-    return file_url
\ No newline at end of file
+def s3_client_upload_from_url(s3, bucket_name, object_key, file_url, extra_args=None, transfer_config=None, timeout=60):
+    '''
+    Pipes the body of file_url into bucket_name/object_key with upload_fileobj, with any boto3 client.
+    ContentType defaults to the one the source sent. Raises on failure.
+    '''
+    with s3_open_url_stream(file_url, timeout=timeout) as response:
+        extra_args = dict(extra_args or {})
+        extra_args.setdefault('ContentType', response.headers.get('Content-Type') or mimetypes.guess_type(object_key)[0] or 'application/octet-stream')
+        s3.upload_fileobj(response.raw, bucket_name, object_key, ExtraArgs=extra_args, Config=transfer_config or S3_TRANSFER_CONFIG)
+
+def s3_upload_stream_from_url(file_url="", folder_name="", s3_config_dict=None, bnewname=False, make_public=False, transfer_config=None, timeout=60,
+                              bcontenthash=False, manifest=None, transform=None, transform_pool=None):
+    '''
+    Streams file_url straight into the bucket with a multipart upload, nothing is written to disk
+    and memory is bounded by the transfer chunk size. Returns the S3 file url.
+    With bcontenthash the body is hashed into a spooled buffer first (on disk only above 16MB) and
+    the upload is skipped when an object with the same content already exists.
+    transform, a commonimage.ImageTransform, reads the image into memory, uploads the converted variants and
+    returns the url of the first one; transform_pool (a ProcessPoolExecutor) runs the conversion off this process.
+    Raises requests.HTTPError or botocore ClientError on failure.
+    '''
+    if s3_config_dict is None:
+        raise ValueError("s3_config_dict is required for this function.")
+
+    bucket_name = s3_config_dict['S3_BUCKET_NAME']
+    s3 = get_s3_client(s3_config_dict)
+
+    if folder_name and not folder_name.endswith('/'):
+        folder_name += '/'
+    file_name = os.path.basename(urlparse(file_url).path)
+    if bnewname:
+        file_name = generate_new_filename(file_name)
+    object_key = f"{folder_name or ''}{file_name}"
+
+    if transform is None and not bcontenthash:
+        # The ContentType is left to s3_client_upload_from_url, which prefers the one the source sent
+        extra_args = {'ACL': 'public-read'} if make_public else None
+        s3_client_upload_from_url(s3, bucket_name, object_key, file_url, extra_args=extra_args, transfer_config=transfer_config, timeout=timeout)
+        logger.debug(f"Streamed '{file_url}' to '{object_key}' in bucket '{bucket_name}'.")
+        return s3_config_dict['S3_URL'] + '/' + object_key
+
+    with s3_open_url_stream(file_url, timeout=timeout) as response:
+        if transform is not None:
+            if transform_pool is not None:
+                variants = transform_pool.submit(transform.apply_bytes, response.content, file_name).result()
+            else:
+                variants = transform.apply_bytes(response.content, file_name)
+            return s3_upload_variants(variants, folder_name=folder_name, s3_config_dict=s3_config_dict, content_type=transform.mime_type,
+                                      make_public=make_public, bcontenthash=bcontenthash, manifest=manifest)[0]
+        extra_args = s3_upload_extra_args(object_key, make_public=make_public, content_type=response.headers.get('Content-Type'))
+        with tempfile.SpooledTemporaryFile(max_size=16 * MB) as buffer:
+            sha256 = hashlib.sha256()
+            for chunk in iter(lambda: response.raw.read(MB), b''):
+                sha256.update(chunk)
+                buffer.write(chunk)
+            object_key = f"{folder_name or ''}{content_hash_filename(sha256.hexdigest(), file_name)}"
+            if s3_object_exists(s3, bucket_name, object_key, manifest):
+                logger.debug(f"'{file_url}' already in bucket '{bucket_name}' as '{object_key}', upload skipped.")
+                return s3_config_dict['S3_URL'] + '/' + object_key
+            buffer.seek(0)
+            s3.upload_fileobj(buffer, bucket_name, object_key, ExtraArgs=extra_args, Config=transfer_config or S3_TRANSFER_CONFIG)
+        s3_remember_key(bucket_name, object_key, manifest)
+
+    logger.debug(f"Streamed '{file_url}' to '{object_key}' in bucket '{bucket_name}'.")
+    return s3_config_dict['S3_URL'] + '/' + object_key
+
+def s3_upload_files_from_urls(file_urls, folder_name="", s3_config_dict=None, bnewname=False, make_public=False, max_workers=None, bcontenthash=False, manifest=None,
+                              transform=None):
+    '''
+    Streams several urls into the bucket concurrently, with transform the conversions run in the shared image process pool.
+    Returns a dict of source url -> S3 file url, None for the urls that failed.
+    '''
+    transform_pool = get_image_process_pool() if transform is not None else None
+    s3_size_http_pool(max_workers)
+
+    def upload(file_url):
+        return s3_upload_stream_from_url(file_url=file_url, folder_name=folder_name, s3_config_dict=s3_config_dict, bnewname=bnewname, make_public=make_public,
+                                         bcontenthash=bcontenthash, manifest=manifest, transform=transform, transform_pool=transform_pool)
+
+    results = {}
+    progress = ProgressReporter(logger, "Uploading urls", total=len(file_urls))
+    for file_url, s3_file_url, exception in s3_run_concurrently(upload, file_urls, max_workers=max_workers):
+        if exception:
+            logger.error(f"An error occurred while uploading {file_url}: {exception}")
+        results[file_url] = s3_file_url
+        progress.update()
+    progress.done()
+    if manifest is not None:
+        manifest.save()
+    return results
+
+def s3_upload_file_from_url(file_url="", folder_name="", s3_config_dict=None, bnewname=False, make_public=False, bcontenthash=False, manifest=None, transform=None):
+       
+    if s3_config_dict is None:
+        raise ValueError("s3_config_dict is required for this function.")
+
+    try:
+        return s3_upload_stream_from_url(file_url=file_url, folder_name=folder_name, s3_config_dict=s3_config_dict, bnewname=bnewname, make_public=make_public,
+                                         bcontenthash=bcontenthash, manifest=manifest, transform=transform)
+    except Exception as e:
+        logger.error(f"An error occurred while uploading the file: {str(e)}")
+        return None
@@ -4,15 +4,25 @@ from requests_toolbelt.multipart.encoder import MultipartEncoder
 from .customresponse import CustomResponse
 from datetime import datetime, timezone
 from .commonfunctions import rfplogger, download_file_local, delete_local_file
+from .commonlogging import configure_logger, ProgressReporter
 import time
 import json
 import os
 from dotenv import load_dotenv
 import random
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+logger = configure_logger(__name__)
 
 # Shopify API Version - Update this to change API version for all functions
 API_VERSION = "2025-10"
 
+# Admin API base URL, overridable to point the module at a local stand-in server
+SHOPIFY_ADMIN_URL = os.getenv("SHOPIFY_ADMIN_URL", "https://{shop}.myshopify.com/admin/api/{api_version}")
+
 def chunker(seq, size):
     return (seq[pos:pos + size] for pos in range(0, len(seq), size))
 
@@ -23,12 +33,19 @@ class ShopifyRateLimiter:
         self.retry_count = 0
         self.max_retries = 5
         self.base_delay = 1  # Base delay in seconds
+        self.throttle_status = None  # Last GraphQL throttleStatus seen
+        self.last_query_cost = None  # Last GraphQL requestedQueryCost seen
+        self.wait_time = 0.0  # Seconds slept since the last instrumented request
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+        self.wait_time += seconds
 
     def wait(self):
         current_time = time.time()
         time_since_last_request = current_time - self.last_request_time
         if time_since_last_request < 1/self.max_requests_per_second:
-            time.sleep(1/self.max_requests_per_second - time_since_last_request)
+            self.sleep(1/self.max_requests_per_second - time_since_last_request)
         self.last_request_time = time.time()
 
     def handle_throttle(self):
@@ -38,12 +55,170 @@ class ShopifyRateLimiter:
         
         # Exponential backoff with jitter
         delay = self.base_delay * (2 ** (self.retry_count - 1)) + random.uniform(0, 1)
-        time.sleep(delay)
+        self.sleep(delay)
+        return True
+
+    def handle_retry_after(self, retry_after):
+        '''Sleeps for the Retry-After of a 429 (seconds), exponential backoff when the header is missing'''
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            return self.handle_throttle()
+        self.retry_count += 1
+        if self.retry_count > self.max_retries:
+            raise Exception("Max retries exceeded")
+        self.sleep(delay)
         return True
 
     def reset_retry_count(self):
         self.retry_count = 0
 
+    def wait_for_cost(self, throttle_status, requested_cost):
+        '''
+        Sleeps until the GraphQL leaky bucket has room for requested_cost points,
+        based on the throttleStatus returned in the previous response extensions.
+        '''
+        if not throttle_status or not requested_cost:
+            return
+        available = throttle_status.get('currentlyAvailable', 0)
+        restore_rate = throttle_status.get('restoreRate') or 50
+        if available < requested_cost:
+            self.sleep((requested_cost - available) / restore_rate)
+
+class ShopifyAPIError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+##### INSTRUMENTATION
+# Hooks are called with one record dict per HTTP call made by this module:
+# endpoint, operation, method, status_code, wall_time, bytes_sent, bytes_received,
+# requested_cost, actual_cost, throttle_wait, retries
+_instrumentation_hooks = []
+
+def Shopify_add_instrumentation_hook(hook):
+    _instrumentation_hooks.append(hook)
+
+def Shopify_remove_instrumentation_hook(hook):
+    if hook in _instrumentation_hooks:
+        _instrumentation_hooks.remove(hook)
+
+class ShopifyCallStats:
+    '''Instrumentation hook that keeps every call record and aggregates them per endpoint and operation'''
+    summed_fields = ('wall_time', 'bytes_sent', 'bytes_received', 'requested_cost', 'actual_cost', 'throttle_wait', 'retries')
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        with self._lock:
+            self.calls.append(record)
+
+    def summary(self):
+        '''Returns {"endpoint operation": totals} plus a "TOTAL" entry, heaviest wall time first'''
+        with self._lock:
+            calls = list(self.calls)
+        summary = {}
+        for record in calls:
+            for key in (f"{record['endpoint']} {record['operation']}", 'TOTAL'):
+                totals = summary.setdefault(key, dict({'calls': 0}, **{field: 0 for field in self.summed_fields}))
+                totals['calls'] += 1
+                for field in self.summed_fields:
+                    totals[field] += record.get(field) or 0
+        return dict(sorted(summary.items(), key=lambda item: item[1]['wall_time'], reverse=True))
+
+    def print_summary(self):
+        for key, totals in self.summary().items():
+            print(f"{key}: {totals['calls']} calls, {totals['wall_time']:.2f}s, "
+                  f"{totals['bytes_received'] / 1024:.0f}KB in, cost {totals['actual_cost']}/{totals['requested_cost']}, "
+                  f"throttled {totals['throttle_wait']:.2f}s, {totals['retries']} retries")
+
+@contextmanager
+def Shopify_instrumented(hook=None):
+    '''
+    Records every call made inside the block, e.g.
+    with Shopify_instrumented() as stats:
+        Shopify_collection_unpublish(...)
+    stats.print_summary()
+    '''
+    if hook is None:
+        hook = ShopifyCallStats()
+    Shopify_add_instrumentation_hook(hook)
+    try:
+        yield hook
+    finally:
+        Shopify_remove_instrumentation_hook(hook)
+
+def shopify_operation_name(query):
+    '''Operation name of a GraphQL document, or its first root field when it is anonymous'''
+    match = re.match(r'\s*(?:query|mutation)\s*(\w+)', query)
+    if match:
+        return match.group(1)
+    match = re.search(r'\{\s*(\w+)', query)
+    return match.group(1) if match else ''
+
+def shopify_endpoint(url):
+    '''Admin API path with ids collapsed, or the host for calls outside the Admin API'''
+    parsed = urlparse(url)
+    path = re.sub(r'^.*?/admin/api/[^/]+/', '', parsed.path)
+    if path == parsed.path:
+        return parsed.netloc
+    return re.sub(r'/\d+', '/{id}', path)
+
+def shopify_request(method, url, rate_limiter=None, **kwargs):
+    '''
+    Sends an HTTP request with requests and reports it to the instrumentation hooks.
+    Throttle sleeps and retries are read from rate_limiter when one is passed.
+    '''
+    start = time.perf_counter()
+    response = requests.request(method, url, **kwargs)
+    if not _instrumentation_hooks:
+        return response
+    wall_time = time.perf_counter() - start
+
+    payload = kwargs.get('json') or {}
+    data = kwargs.get('data')
+    if isinstance(data, str) and not payload:
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            payload = {}
+    is_graphql = isinstance(payload, dict) and bool(payload.get('query'))
+    operation = shopify_operation_name(payload['query']) if is_graphql else os.path.basename(urlparse(url).path)
+
+    if kwargs.get('stream'):
+        bytes_received = int(response.headers.get('Content-Length') or 0)
+    else:
+        bytes_received = len(response.content)
+    request_body = response.request.body or b''
+
+    cost = {}
+    if is_graphql and response.status_code == 200:
+        try:
+            cost = response.json().get('extensions', {}).get('cost', {})
+        except ValueError:
+            pass
+
+    record = {
+        'endpoint': shopify_endpoint(url),
+        'operation': operation,
+        'method': method,
+        'status_code': response.status_code,
+        'wall_time': wall_time,
+        'bytes_sent': len(request_body) if isinstance(request_body, (bytes, str)) else getattr(request_body, 'len', 0),
+        'bytes_received': bytes_received,
+        'requested_cost': cost.get('requestedQueryCost'),
+        'actual_cost': cost.get('actualQueryCost'),
+        'throttle_wait': rate_limiter.wait_time if rate_limiter else 0.0,
+        'retries': rate_limiter.retry_count if rate_limiter else 0
+    }
+    if rate_limiter:
+        rate_limiter.wait_time = 0.0
+    for hook in list(_instrumentation_hooks):
+        hook(record)
+    return response
+
 ##### Prepare the GraphQL MUTATIONS
 rik = 1
 
@@ -103,6 +278,8 @@ def get_mime_type(file_extension):
         "png": "image/png",
         "gif": "image/gif",
         "bmp": "image/bmp",
+        "webp": "image/webp",
+        "avif": "image/avif",
         # Add more types as needed
     }
     return mime_types.get(file_extension.lower(), "application/octet-stream")
@@ -114,6 +291,7 @@ def get_file_extension(mime_type):
         "image/gif": "gif",
         "image/bmp": "bmp",
         "image/webp": "webp",
+        "image/avif": "avif",
         "image/tiff": "tiff",
         "image/x-icon": "ico",
         # Add more MIME types and their corresponding file extensions as needed
@@ -132,33 +310,201 @@ def verify_token(shop="", access_token="", api_version=API_VERSION):
     Returns:
         bool: True if token is valid, False otherwise
     """
-    # Ensure shop has .myshopify.com domain
-    if not shop.endswith('.myshopify.com'):
-        shop = f"{shop}.myshopify.com"
-    url = f"https://{shop}/admin/api/{api_version}/shop.json"
+    # shopify_admin_url adds the .myshopify.com domain (or points at SHOPIFY_ADMIN_URL)
+    if shop.endswith('.myshopify.com'):
+        shop = shop[:-len('.myshopify.com')]
+    url = shopify_admin_url(shop, api_version, "shop.json")
     headers = {'X-Shopify-Access-Token': access_token}
     
     try:
-        response = requests.get(url, headers=headers)
-        print("Token verification status code:", response.status_code)
+        response = shopify_request('GET', url, headers=headers)
+        logger.debug(f"Token verification status code: {response.status_code}")
         
         if response.status_code != 200:
-            print("Token verification failed. Response:", response.text[:200])
+            logger.error(f"Token verification failed. Response: {response.text[:200]}")
             return False
             
         return True
         
     except Exception as e:
-        print(f"Error verifying token: {str(e)}")
+        logger.error(f"Error verifying token: {str(e)}")
         return False
 
+def shopify_admin_url(shop, api_version=API_VERSION, path="graphql.json"):
+    return SHOPIFY_ADMIN_URL.format(shop=shop, api_version=api_version) + '/' + path
+
+def shopify_gid(resource, resource_id):
+    '''Returns the GraphQL global id for a REST id, leaving ids that already are gids untouched'''
+    resource_id = str(resource_id)
+    if resource_id.startswith('gid://'):
+        return resource_id
+    return f"gid://shopify/{resource}/{resource_id}"
+
+def shopify_next_link(response):
+    '''Returns the rel="next" URL of a paginated REST response, or None on the last page'''
+    links = response.headers.get('Link', None)
+    if not links:
+        return None
+    for link in links.split(','):
+        if 'rel="next"' in link:
+            return link.split(';')[0].strip('<> ')
+    return None
+
+def Shopify_rest_paginate(url, headers, key, rate_limiter=None):
+    '''
+    Follows the Link header of a REST listing and returns all items under key.
+    Paces requests with rate_limiter and retries 429s after their Retry-After.
+    Raises ShopifyAPIError on failure.
+    '''
+    if rate_limiter is None:
+        rate_limiter = ShopifyRateLimiter()
+    items = []
+    while url:
+        rate_limiter.wait()
+        response = shopify_request('GET', url, rate_limiter=rate_limiter, headers=headers)
+        if response.status_code == 429:
+            try:
+                rate_limiter.handle_retry_after(response.headers.get('Retry-After'))
+            except Exception as e:
+                raise ShopifyAPIError(f"Throttled: {e}", 429)
+            continue
+        if response.status_code != 200:
+            raise ShopifyAPIError(response.text, response.status_code)
+        rate_limiter.reset_retry_count()
+        items.extend(response.json()[key])
+        url = shopify_next_link(response)
+    return items
+
+def Shopify_graphql(shop="", access_token="", api_version=API_VERSION, query="", variables=None, rate_limiter=None):
+    '''
+    Runs a GraphQL query and returns the 'data' dict.
+    Waits on the query cost reported by the previous call and backs off on THROTTLED/429.
+    Raises ShopifyAPIError on HTTP or GraphQL errors.
+    '''
+    url = shopify_admin_url(shop, api_version)
+    headers = {
+        'Content-Type': 'application/json',
+        'X-Shopify-Access-Token': access_token
+    }
+    if rate_limiter is None:
+        rate_limiter = ShopifyRateLimiter()
+
+    while True:
+        rate_limiter.wait_for_cost(rate_limiter.throttle_status, rate_limiter.last_query_cost)
+        response = shopify_request('POST', url, rate_limiter=rate_limiter, json={'query': query, 'variables': variables or {}}, headers=headers)
+
+        throttled = response.status_code == 429
+        if not throttled:
+            if response.status_code != 200:
+                raise ShopifyAPIError(f"GraphQL request failed: {response.status_code} {response.text[:200]}", response.status_code)
+            response_json = response.json()
+            cost = response_json.get('extensions', {}).get('cost', {})
+            rate_limiter.throttle_status = cost.get('throttleStatus')
+            rate_limiter.last_query_cost = cost.get('requestedQueryCost')
+            errors = response_json.get('errors')
+            if not errors:
+                rate_limiter.reset_retry_count()
+                return response_json.get('data') or {}
+            throttled = any(error.get('extensions', {}).get('code') == 'THROTTLED' for error in errors)
+            if not throttled:
+                raise ShopifyAPIError(f"GraphQL Error: {errors}", 400)
+
+        try:
+            rate_limiter.handle_throttle()
+        except Exception as e:
+            raise ShopifyAPIError(f"Throttled: {e}", 429)
+
+def Shopify_graphql_paginate(shop="", access_token="", api_version=API_VERSION, query="", connection="", variables=None, rate_limiter=None):
+    '''
+    Yields the nodes of a cursor-paginated connection, one page in memory at a time.
+    query must declare $cursor and select nodes and pageInfo { hasNextPage endCursor } on the connection.
+    connection is the dotted path to the connection in the response data, e.g. "collection.products".
+    '''
+    if rate_limiter is None:
+        rate_limiter = ShopifyRateLimiter()
+    variables = dict(variables or {})
+    cursor = None
+
+    while True:
+        variables['cursor'] = cursor
+        data = Shopify_graphql(shop=shop, access_token=access_token, api_version=api_version, query=query, variables=variables, rate_limiter=rate_limiter)
+        for key in connection.split('.'):
+            data = data.get(key) if data else None
+        if data is None:
+            raise ShopifyAPIError(f"{connection} not found in response", 404)
+
+        for node in data['nodes']:
+            yield node
+
+        page_info = data['pageInfo']
+        if not page_info['hasNextPage']:
+            return
+        cursor = page_info['endCursor']
+
+def Shopify_run_bulk_query(shop="", access_token="", api_version=API_VERSION, bulk_query="", poll_interval=5):
+    '''
+    Starts a bulkOperationRunQuery and polls it until it finishes.
+    Returns the JSONL results URL (None when the query matched nothing).
+    '''
+    mutation = '''
+    mutation bulkOperationRunQuery($query: String!) {
+      bulkOperationRunQuery(query: $query) {
+        bulkOperation {
+          id
+          status
+        }
+        userErrors {
+          field
+          message
+        }
+      }
+    }
+    '''
+    data = Shopify_graphql(shop=shop, access_token=access_token, api_version=api_version, query=mutation, variables={'query': bulk_query})
+    result = data['bulkOperationRunQuery']
+    if result['userErrors']:
+        raise ShopifyAPIError(f"Bulk query rejected: {result['userErrors']}", 400)
+    operation_id = result['bulkOperation']['id']
+
+    status_query = '''
+    query ($id: ID!) {
+      node(id: $id) {
+        ... on BulkOperation {
+          id
+          status
+          errorCode
+          objectCount
+          url
+        }
+      }
+    }
+    '''
+    while True:
+        operation = Shopify_graphql(shop=shop, access_token=access_token, api_version=api_version, query=status_query, variables={'id': operation_id})['node']
+        status = operation['status']
+        if status == 'COMPLETED':
+            return operation['url']
+        if status in ('FAILED', 'CANCELED', 'EXPIRED'):
+            raise ShopifyAPIError(f"Bulk operation {operation_id} {status}: {operation.get('errorCode')}", 500)
+        time.sleep(poll_interval)
+
+def Shopify_iter_bulk_results(results_url):
+    '''Streams the JSONL output of a bulk operation line by line'''
+    if not results_url:
+        return
+    with shopify_request('GET', results_url, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
 ######################### GRAPHQL FUNCTIONS
 
 def Shopify_get_metaobject_gid(shop="", access_token="", api_version=API_VERSION, metaobject_type="", handle=""):
 
     # print(f"Access token: {access_token}")
 
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
@@ -191,7 +537,7 @@ def Shopify_get_metaobject_gid(shop="", access_token="", api_version=API_VERSION
 
     # print(f"payload: {payload}")
     
-    response = requests.post(url, json=payload, headers=headers)
+    response = shopify_request('POST', url, json=payload, headers=headers)
     # response = requests.post(url, json={'query': query}, headers=headers)
     
     if response.status_code == 200:
@@ -202,16 +548,16 @@ def Shopify_get_metaobject_gid(shop="", access_token="", api_version=API_VERSION
             return result_id
         except TypeError as e:
             # Handle the case where the expected structure is not present
-            print(f"TypeError occurred: {e}")
-            print("The response structure was not as expected:", response_json)
+            logger.error(f"TypeError occurred: {e}")
+            logger.error(f"The response structure was not as expected: {response_json}")
             return None
         except KeyError as e:
             # Handle the case where a key is missing
-            print(f"KeyError occurred: {e}")
-            print("The response structure was not as expected:", response_json)
+            logger.error(f"KeyError occurred: {e}")
+            logger.error(f"The response structure was not as expected: {response_json}")
             return None
     else:
-        print(f"Error: {response.status_code}")
+        logger.error(f"Error: {response.status_code}")
         return None
 
 def Shopify_update_metaobject(shop, access_token, api_version=API_VERSION, metaobject_gid="", banner_url="", mobile_banner_url="", 
@@ -223,7 +569,7 @@ def Shopify_update_metaobject(shop, access_token, api_version=API_VERSION, metao
         return CustomResponse(data="Missing access_token arguement.", status_code=400)
     
     # Push to shopify banner object for vinzo
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
@@ -271,37 +617,38 @@ def Shopify_update_metaobject(shop, access_token, api_version=API_VERSION, metao
         } 
     }
 
-    response = requests.post(url, json={'query': mutation, 'variables': variables}, headers=headers)
+    response = shopify_request('POST', url, json={'query': mutation, 'variables': variables}, headers=headers)
     
     if response.status_code == 200:
         return CustomResponse(data=response.json(), status_code=200)
     else:
         message=f"Error loading to shopify: {response.status_code}"
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=response.status_code)
 
 def Shopify_get_products(shop="", access_token="", api_version=API_VERSION, number_products=0):
 
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/products.json?limit=250"
+    url = shopify_admin_url(shop, api_version, "products.json?limit=250")
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
     }
 
     all_products = []
+    progress = ProgressReporter(logger, "Getting products")
     i = 0
     while url:
         if number_products != 0 and i*250 > number_products: break
         i+=1
-        print(i)
-        response = requests.get(url, headers=headers)
+        response = shopify_request('GET', url, headers=headers)
         if response.status_code != 200:
             message=f"Failed to retrieve products: {response.text}"
-            print(message)
+            logger.error(message)
             return CustomResponse(data=message, status_code=response.status_code)
         
         products=response.json()['products']
         all_products.extend(products)
+        progress.update(len(products))
         links = response.headers.get('Link', None)
         next_url = None
         if links:
@@ -314,73 +661,220 @@ def Shopify_get_products(shop="", access_token="", api_version=API_VERSION, numb
         else:
             break
         
+    progress.done()
     return CustomResponse(data=all_products, status_code=200)
     
 def Shopify_get_collections(shop="", access_token="", api_version=API_VERSION):
 
-    url_custom = f"https://{shop}.myshopify.com/admin/api/{api_version}/custom_collections.json"
-    url_smart = f"https://{shop}.myshopify.com/admin/api/{api_version}/smart_collections.json"
+    url_custom = shopify_admin_url(shop, api_version, "custom_collections.json?limit=250")
+    url_smart = shopify_admin_url(shop, api_version, "smart_collections.json?limit=250")
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
     }
 
-    response = requests.get(url_smart, headers=headers)
-    if response.status_code != 200:
-        print(f"Failed to retrieve smart collections: {response.status_code}")
-        print(f"response {response.text}")
-        return CustomResponse(data=response.text, status_code=response.status_code)
-    smart_collections = response.json()['smart_collections']
-    
-    response = requests.get(url_custom, headers=headers)
-    if response.status_code != 200:
-        print(f"Failed to retrieve custom collections: {response.status_code}")
-        print(f"response {response.text}")
-        return CustomResponse(data=response.text, status_code=response.status_code)
-    custom_collections = response.json()['custom_collections']
+    # Both listings are paginated independently, fetch them at the same time
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        smart_future = executor.submit(Shopify_rest_paginate, url_smart, headers, 'smart_collections')
+        custom_future = executor.submit(Shopify_rest_paginate, url_custom, headers, 'custom_collections')
+
+    try:
+        smart_collections = smart_future.result()
+        custom_collections = custom_future.result()
+    except ShopifyAPIError as e:
+        logger.error(f"Failed to retrieve collections: {e.status_code} {e}")
+        return CustomResponse(data=str(e), status_code=e.status_code)
     
     all_collections = smart_collections + custom_collections
 
     return CustomResponse(data=all_collections, status_code=200)
 
-def Shopify_get_collection_metadata(shop="", access_token="", api_version=API_VERSION, collection_id=""):
-    '''Returns metafields and metadata'''
-    metadata_url = f"https://{shop}.myshopify.com/admin/api/{api_version}/collections/{collection_id}.json"
-    
-    headers = {
-        'Content-Type': 'application/json',
-        'X-Shopify-Access-Token': access_token
+# (shop, api_version) -> (fetched_at, index)
+_collections_index_cache = {}
+
+def Shopify_get_collections_index(shop="", access_token="", api_version=API_VERSION, use_cache=True, cache_ttl=300):
+    '''
+    Returns a compact [{id, admin_graphql_api_id, handle, title, type}] list of every collection,
+    type being "smart" or "custom". Fetched through a single paginated GraphQL connection and
+    cached in memory for cache_ttl seconds.
+    '''
+    cache_key = (shop, api_version)
+    cached = _collections_index_cache.get(cache_key)
+    if use_cache and cached and time.time() - cached[0] < cache_ttl:
+        return CustomResponse(data=cached[1], status_code=200)
+
+    query = '''
+    query ($cursor: String) {
+        collections(first: 250, after: $cursor) {
+            nodes {
+                id
+                legacyResourceId
+                handle
+                title
+                ruleSet {
+                    appliedDisjunctively
+                }
+            }
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+        }
+    }
+    '''
+
+    try:
+        index = [
+            {
+                'id': int(node['legacyResourceId']),
+                'admin_graphql_api_id': node['id'],
+                'handle': node['handle'],
+                'title': node['title'],
+                'type': 'smart' if node.get('ruleSet') else 'custom'
+            }
+            for node in Shopify_graphql_paginate(shop=shop, access_token=access_token, api_version=api_version, query=query, connection='collections')
+        ]
+    except ShopifyAPIError as e:
+        logger.error(f"Failed to retrieve collections index: {e.status_code}")
+        return CustomResponse(data=str(e), status_code=e.status_code)
+
+    _collections_index_cache[cache_key] = (time.time(), index)
+    return CustomResponse(data=index, status_code=200)
+
+collection_metadata_fields = '''
+    id
+    legacyResourceId
+    handle
+    title
+    descriptionHtml
+    updatedAt
+    sortOrder
+    templateSuffix
+    productsCount {
+        count
+    }
+    ruleSet {
+        appliedDisjunctively
+        rules {
+            column
+            relation
+            condition
+        }
+    }
+    image {
+        url
+        altText
+        width
+        height
+    }
+    metafields(first: %d) {
+        nodes {
+            id
+            legacyResourceId
+            namespace
+            key
+            value
+            type
+        }
     }
+'''
 
-    response = requests.get(metadata_url, headers=headers)
+def collection_node_to_dict(node):
+    '''
+    Maps a GraphQL collection node to the REST collection.json layout, metafields included.
+    rules and disjunctive are only set for smart collections. published_at and published_scope
+    are left out, GraphQL publishes per sales channel and has no single equivalent.
+    '''
+    collection_id = int(node['legacyResourceId'])
+    image = node.get('image')
+    rule_set = node.get('ruleSet')
+    products_count = node.get('productsCount')
+    collection = {
+        'id': collection_id,
+        'handle': node.get('handle', ''),
+        'title': node.get('title', ''),
+        'body_html': node.get('descriptionHtml', ''),
+        'updated_at': node.get('updatedAt', ''),
+        'sort_order': (node.get('sortOrder') or '').lower().replace('_', '-'),
+        'template_suffix': node.get('templateSuffix', None),
+        'admin_graphql_api_id': node['id'],
+        'products_count': products_count.get('count') if products_count else None,
+        'image': {
+            'src': image.get('url', ''),
+            'alt': image.get('altText', ''),
+            'width': image.get('width', ''),
+            'height': image.get('height', '')
+        } if image else None,
+        'metafields': [
+            {
+                'id': int(metafield['legacyResourceId']),
+                'namespace': metafield['namespace'],
+                'key': metafield['key'],
+                'value': metafield['value'],
+                'type': metafield['type'],
+                'owner_id': collection_id,
+                'owner_resource': 'collection',
+                'admin_graphql_api_id': metafield['id']
+            }
+            for metafield in node.get('metafields', {}).get('nodes', [])
+        ]
+    }
+    if rule_set:
+        collection['disjunctive'] = rule_set.get('appliedDisjunctively', False)
+        collection['rules'] = [
+            {'column': rule['column'].lower(), 'relation': rule['relation'].lower(), 'condition': rule['condition']}
+            for rule in rule_set.get('rules', [])
+        ]
+    return collection
 
-    if response.status_code != 200:
-        print(f"Failed to retrieve metadata for collection ID {collection_id}. Status code: {response.status_code}")
-        print(f"Response: {response.text}")
-        return CustomResponse(data=response.text, status_code=400)
-    
-    collection_metadata = response.json()['collection']
-    
-    # Retrieve metafields for the collection
-    metafields_url = f"https://{shop}.myshopify.com/admin/api/{api_version}/collections/{collection_id}/metafields.json"
-    response = requests.get(metafields_url, headers=headers)
+def Shopify_get_collections_metadata(shop="", access_token="", api_version=API_VERSION, collection_ids=None, batch_size=10, metafields_limit=50):
+    '''
+    Returns metadata and metafields for many collections, keyed by the ids passed in.
+    Collections are resolved batch_size at a time with a single nodes(ids:) query per batch;
+    ids that don't exist map to None.
+    '''
+    query = '''
+    query ($ids: [ID!]!) {
+        nodes(ids: $ids) {
+            ... on Collection {
+                %s
+            }
+        }
+    }
+    ''' % (collection_metadata_fields % metafields_limit)
 
-    if response.status_code != 200:
-        print(f"Failed to retrieve metafields for collection ID {collection_id}. Status code: {response.status_code}")
-        print(f"Metafields response: {response.text}")
-        return CustomResponse(data=response.text, status_code=400)
-    metafields_data = response.json()['metafields']
+    rate_limiter = ShopifyRateLimiter()
+    collections_metadata = {}
+    for chunk in chunker(list(collection_ids or []), batch_size):
+        variables = {'ids': [shopify_gid('Collection', collection_id) for collection_id in chunk]}
+        try:
+            data = Shopify_graphql(shop=shop, access_token=access_token, api_version=api_version, query=query, variables=variables, rate_limiter=rate_limiter)
+        except ShopifyAPIError as e:
+            logger.error(f"Failed to retrieve metadata for collections {chunk}. Status code: {e.status_code}")
+            return CustomResponse(data=str(e), status_code=e.status_code)
 
-    # Join metadata and metafield 
-    collection_metadata['metafields'] = metafields_data
+        for collection_id, node in zip(chunk, data.get('nodes', [])):
+            collections_metadata[collection_id] = collection_node_to_dict(node) if node else None
 
-    # print(f"collection_metadata: {collection_metadata}")
+    return CustomResponse(data=collections_metadata, status_code=200)
+
+def Shopify_get_collection_metadata(shop="", access_token="", api_version=API_VERSION, collection_id=""):
+    '''Returns metafields and metadata'''
+    custom_response = Shopify_get_collections_metadata(shop=shop, access_token=access_token, api_version=api_version, collection_ids=[collection_id])
+    if custom_response.status_code != 200:
+        return CustomResponse(data=custom_response.data, status_code=400)
+
+    collection_metadata = custom_response.data.get(collection_id)
+    if collection_metadata is None:
+        message = f"Failed to retrieve metadata for collection ID {collection_id}. Collection not found"
+        logger.error(message)
+        return CustomResponse(data=message, status_code=400)
 
     return CustomResponse(data=collection_metadata, status_code=200)
 
 def Shopify_get_collection_url(shop="", access_token="", api_version=API_VERSION, collection_id=""):    
-    collection_url = f"https://{shop}.myshopify.com/admin/api/{api_version}/collections/{collection_id}"
-    response = requests.get(collection_url)    
+    collection_url = shopify_admin_url(shop, api_version, f"collections/{collection_id}")
+    response = shopify_request('GET', collection_url)    
     if response.status_code == 200:
         return CustomResponse(data=collection_url, status_code=200)
     else:
@@ -395,7 +889,7 @@ def Shopify_get_products_in_collection(shop="", access_token="", api_version=API
     any: Retrieves both active and archived products (default).
     '''
 
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/collections/{collection_id}/products.json?limit=250"
+    url = shopify_admin_url(shop, api_version, f"collections/{collection_id}/products.json?limit=250")
 
     headers = {
         'Content-Type': 'application/json',
@@ -404,21 +898,22 @@ def Shopify_get_products_in_collection(shop="", access_token="", api_version=API
 
     all_products = []
     rate_limiter = ShopifyRateLimiter()
+    progress = ProgressReporter(logger, f"Getting products from collection {collection_id}")
     i = 0
 
     while url:
-        print(f"[Request {i+1}] Getting products from collection...")
+        logger.debug(f"[Request {i+1}] Getting products from collection...")
         i += 1
 
         # Apply rate limiting
         rate_limiter.wait()
 
-        response = requests.get(url, headers=headers)
+        response = shopify_request('GET', url, rate_limiter=rate_limiter, headers=headers)
         
         if response.status_code == 200:
             products = response.json()['products']
             all_products.extend(products)
-            print(f"[Success] Retrieved {len(products)} products in this batch")
+            progress.update(len(products))
             
             links = response.headers.get('Link', None)
             next_url = None
@@ -435,25 +930,25 @@ def Shopify_get_products_in_collection(shop="", access_token="", api_version=API
             rate_limiter.reset_retry_count()  # Reset retry count on successful request
 
         else:
-            print(f"[Error] Failed to retrieve products in collection {collection_id}: {response.status_code}")
+            logger.error(f"[Error] Failed to retrieve products in collection {collection_id}: {response.status_code}")
             
             # Check if it's a throttling error
             if response.status_code == 429:
-                print(f"[Rate Limiter] Throttling detected. Retry count: {rate_limiter.retry_count}")
+                logger.warning(f"[Rate Limiter] Throttling detected. Retry count: {rate_limiter.retry_count}")
                 if rate_limiter.handle_throttle():
-                    print(f"[Rate Limiter] Retrying after backoff...")
+                    logger.debug(f"[Rate Limiter] Retrying after backoff...")
                     continue  # Retry the request
                 else:
-                    print(f"[Rate Limiter] Max retries ({rate_limiter.max_retries}) exceeded")
+                    logger.error(f"[Rate Limiter] Max retries ({rate_limiter.max_retries}) exceeded")
                     return CustomResponse(data="Rate limit exceeded", status_code=429)
             
             return CustomResponse(data=response.text, status_code=400)
 
-    print(f"[Complete] Total products retrieved: {len(all_products)}")
+    progress.done()
     return CustomResponse(data=all_products, status_code=200)
 
 def Shopify_get_products_query(shop="", access_token="", api_version=API_VERSION, test_mode=False, max_batches=2):
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
@@ -463,17 +958,18 @@ def Shopify_get_products_query(shop="", access_token="", api_version=API_VERSION
     cursor = None
     filtered_products = []
     rate_limiter = ShopifyRateLimiter()
+    progress = ProgressReporter(logger, "Getting products from shopify")
     
     i = 0
     while True:
         # Test mode: limit number of batches
         if test_mode and i >= max_batches:
-            print(f"[Test Mode] Limited to {max_batches} batches for faster testing")
+            logger.info(f"[Test Mode] Limited to {max_batches} batches for faster testing")
             break
             
-        print(f"[Request {i+1}] Getting products from shopify...")
+        logger.debug(f"[Request {i+1}] Getting products from shopify...")
         if test_mode:
-            print(f"[Test Mode] Batch {i}/{max_batches}")
+            logger.debug(f"[Test Mode] Batch {i}/{max_batches}")
         i += 1
         
         # Construct GraphQL query with pagination
@@ -560,11 +1056,11 @@ def Shopify_get_products_query(shop="", access_token="", api_version=API_VERSION
         rate_limiter.wait()
         
         # Send request to Shopify GraphQL API
-        response = requests.post(url, json={'query': query, 'variables': {'cursor': cursor}}, headers=headers)
+        response = shopify_request('POST', url, rate_limiter=rate_limiter, json={'query': query, 'variables': {'cursor': cursor}}, headers=headers)
 
         if response.status_code != 200:
             error_message = f"Failed to retrieve products: {response.status_code}"
-            print(f"[Error] {error_message}")
+            logger.error(f"[Error] {error_message}")
             return CustomResponse(data=error_message, status_code=400)
         
         response_json = response.json()
@@ -572,23 +1068,23 @@ def Shopify_get_products_query(shop="", access_token="", api_version=API_VERSION
         # Check for GraphQL errors
         if 'errors' in response_json:
             error_message = f"GraphQL Error: {response_json['errors']}"
-            print(f"[Error] {error_message}")
+            logger.error(f"[Error] {error_message}")
             
             # Check if it's a throttling error
             if any(error.get('extensions', {}).get('code') == 'THROTTLED' for error in response_json['errors']):
-                print(f"[Rate Limiter] Throttling detected. Retry count: {rate_limiter.retry_count}")
+                logger.warning(f"[Rate Limiter] Throttling detected. Retry count: {rate_limiter.retry_count}")
                 if rate_limiter.handle_throttle():
-                    print(f"[Rate Limiter] Retrying after backoff...")
+                    logger.debug(f"[Rate Limiter] Retrying after backoff...")
                     continue  # Retry the request
                 else:
-                    print(f"[Rate Limiter] Max retries ({rate_limiter.max_retries}) exceeded")
+                    logger.error(f"[Rate Limiter] Max retries ({rate_limiter.max_retries}) exceeded")
                     return CustomResponse(data=error_message, status_code=429)
             
             return CustomResponse(data=error_message, status_code=400)
 
         if 'data' not in response_json:
             error_message = "No data in response"
-            print(f"[Error] {error_message}")
+            logger.error(f"[Error] {error_message}")
             return CustomResponse(data=error_message, status_code=400)
 
         products = response_json['data']['products']['edges']
@@ -682,32 +1178,31 @@ def Shopify_get_products_query(shop="", access_token="", api_version=API_VERSION
 
             filtered_products.append(product_dict)
 
-        print(f"[Success] Retrieved {len(products)} products in this batch")
+        progress.update(len(products))
         rate_limiter.reset_retry_count()  # Reset retry count on successful request
 
         if not page_info['hasNextPage']:
-            print(f"[Complete] No more pages to fetch")
             break
 
-    print(f"[Complete] Total products retrieved: {len(filtered_products)}")
+    progress.done()
 
     return CustomResponse(data=filtered_products, status_code=200)
 
 def Shopify_get_product_variants(shop="", access_token="", api_version=API_VERSION, product_id=""):
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/products/{product_id}/variants.json"
+    url = shopify_admin_url(shop, api_version, f"products/{product_id}/variants.json")
     
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
     }
 
-    response = requests.get(url, headers=headers)
+    response = shopify_request('GET', url, headers=headers)
     
     if response.status_code == 200:
         variants=response.json()['variants']
         return CustomResponse(data=variants, status_code=200)
     else:
-        print(f"Failed to retrieve product variants for product {product_id}: {response.status_code}")
+        logger.error(f"Failed to retrieve product variants for product {product_id}: {response.status_code}")
         return CustomResponse(data=response.text, status_code=400)
 
 def Shopify_get_product_variants_mutation(shop="", access_token="", api_version=API_VERSION, product_id=""):
@@ -754,16 +1249,16 @@ def Shopify_get_product_variants_mutation(shop="", access_token="", api_version=
     }
     ''' % product_id
     
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
     }
     data = {'query': graphql_query}
-    response = requests.post(url, headers=headers, data=json.dumps(data))
+    response = shopify_request('POST', url, headers=headers, data=json.dumps(data))
     
     if response.status_code != 200:
-        print(f"Failed to retrieve product variants for product {product_id}: {response.status_code}")
+        logger.error(f"Failed to retrieve product variants for product {product_id}: {response.status_code}")
         return CustomResponse(data=response.text, status_code=400)
 
     data = response.json()
@@ -780,7 +1275,7 @@ def Shopify_get_product_variants_mutation(shop="", access_token="", api_version=
 
 def Shopify_get_customers(shop="", access_token="", api_version=API_VERSION):
     # Endpoint URL for fetching customers
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/customers.json"
+    url = shopify_admin_url(shop, api_version, "customers.json?limit=250")
     
     # Headers for the request, including the required access token for authentication
     headers = {
@@ -788,24 +1283,62 @@ def Shopify_get_customers(shop="", access_token="", api_version=API_VERSION):
         'X-Shopify-Access-Token': access_token
     }
 
-    # Making the GET request to the API
-    response = requests.get(url, headers=headers)
-    
-    # Check the response status code
-    if response.status_code != 200:
-        # If the request was not successful, print an error message and return a custom response
-        print(f"Failed to retrieve customers: {response.status_code}")
-        print(f"response: {response.text}")
-        return CustomResponse(data=response.text, status_code=response.status_code)
-    
-    # If the request was successful, parse the JSON response to get the customers
-    customers = response.json()['customers']
+    try:
+        # Follows every page, waiting out 429s
+        customers = Shopify_rest_paginate(url, headers, 'customers')
+    except ShopifyAPIError as e:
+        logger.error(f"Failed to retrieve customers: {e.status_code} {e}")
+        return CustomResponse(data=str(e), status_code=e.status_code)
     
     # Return a custom response containing the customers and a successful status code
     return CustomResponse(data=customers, status_code=200)
 
+CUSTOMER_MARKETING_FIELDS = '''
+    id
+    firstName
+    lastName
+    defaultEmailAddress {
+        emailAddress
+        marketingState
+    }
+    defaultPhoneNumber {
+        phoneNumber
+        marketingState
+    }
+'''
+
+def Shopify_iter_customers(shop="", access_token="", api_version=API_VERSION, search_query="", fields=CUSTOMER_MARKETING_FIELDS, page_size=250, bulk=False):
+    '''
+    Yields every customer matching search_query (Shopify search syntax), selecting only fields.
+    Pages through the customers connection, or with bulk=True runs a bulk query and streams
+    its JSONL result, which is the cheaper option for very large stores.
+    Raises ShopifyAPIError on failure.
+    '''
+    if bulk:
+        arguments = f"(query: {json.dumps(search_query)})" if search_query else ""
+        bulk_query = "{ customers%s { edges { node { %s } } } }" % (arguments, fields)
+        results_url = Shopify_run_bulk_query(shop=shop, access_token=access_token, api_version=api_version, bulk_query=bulk_query)
+        yield from Shopify_iter_bulk_results(results_url)
+        return
+
+    query = '''
+    query ($cursor: String, $first: Int!, $query: String) {
+        customers(first: $first, after: $cursor, query: $query) {
+            nodes {
+                %s
+            }
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+        }
+    }
+    ''' % fields
+    variables = {'first': page_size, 'query': search_query or None}
+    yield from Shopify_graphql_paginate(shop=shop, access_token=access_token, api_version=api_version, query=query, connection='customers', variables=variables)
+
 def Shopify_get_products_with_metafields(shop="", access_token="", api_version=API_VERSION, metafield_key="custom.unpublish_after", filterdate="23/02/2024"):
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
@@ -814,10 +1347,10 @@ def Shopify_get_products_with_metafields(shop="", access_token="", api_version=A
     # Initialize variables for pagination
     cursor = None
     filtered_products = []
+    progress = ProgressReporter(logger, "Getting products")
     
     i = 0
     while True:
-        print(f"Getting products... {i}", end='\r', flush=True)
         i += 1
         # Construct GraphQL query with pagination
         query = '''
@@ -842,16 +1375,17 @@ def Shopify_get_products_with_metafields(shop="", access_token="", api_version=A
         ''' % (metafield_key)
 
         # Send request to Shopify GraphQL API
-        response = requests.post(url, json={'query': query, 'variables': {'cursor': cursor}}, headers=headers)
+        response = shopify_request('POST', url, json={'query': query, 'variables': {'cursor': cursor}}, headers=headers)
         
         if response.status_code != 200:
             error_message = f"Failed to retrieve products with metafields: {response.status_code}"
-            print(error_message)
+            logger.error(error_message)
             return CustomResponse(data=error_message, status_code=400)
         
         products = response.json()['data']['products']['edges']
         page_info = response.json()['data']['products']['pageInfo']
         cursor = page_info['endCursor'] if page_info['hasNextPage'] else None
+        progress.update(len(products))
               
         for product in products:
             # Attempt to retrieve the 'metafield' if it exists, otherwise use an empty dictionary
@@ -879,15 +1413,16 @@ def Shopify_get_products_with_metafields(shop="", access_token="", api_version=A
                         })
             
                 except ValueError as e:
-                    print(f"Error parsing date for product {product['node']['id']}: {e}")
+                    logger.warning(f"Error parsing date for product {product['node']['id']}: {e}")
 
         if not page_info['hasNextPage']:
             break
 
+    progress.done()
     return CustomResponse(data=filtered_products, status_code=200)
 
 def Shopify_get_products_and_inventoryid_with_metafields(shop="", access_token="", api_version=API_VERSION, metafield_key="custom.unpublish_after", filterdate="23/02/2024"):
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
@@ -896,10 +1431,11 @@ def Shopify_get_products_and_inventoryid_with_metafields(shop="", access_token="
     # Initialize variables for pagination
     cursor = None
     filtered_products = []
+    rate_limiter = ShopifyRateLimiter()
+    progress = ProgressReporter(logger, "Getting products and inventory id")
     
     i = 0
     while True:
-        print(f"Getting products and inventory id... {i}", end='\r', flush=True)
         i += 1
         # Construct GraphQL query with pagination and include variant inventory_item_id
         query = '''
@@ -935,16 +1471,17 @@ def Shopify_get_products_and_inventoryid_with_metafields(shop="", access_token="
         ''' % (metafield_key)
 
         # Send request to Shopify GraphQL API
-        response = requests.post(url, json={'query': query, 'variables': {'cursor': cursor}}, headers=headers)
+        response = shopify_request('POST', url, rate_limiter=rate_limiter, json={'query': query, 'variables': {'cursor': cursor}}, headers=headers)
         
         if response.status_code != 200:
             error_message = f"Failed to retrieve products with metafields: {response.status_code}"
-            print(error_message)
+            logger.error(error_message)
             return CustomResponse(data=error_message, status_code=400)
         
         products = response.json()['data']['products']['edges']
         page_info = response.json()['data']['products']['pageInfo']
         cursor = page_info['endCursor'] if page_info['hasNextPage'] else None
+        progress.update(len(products))
 
         for product in products:
             # Attempt to retrieve the 'metafield' if it exists, otherwise use an empty dictionary
@@ -975,14 +1512,15 @@ def Shopify_get_products_and_inventoryid_with_metafields(shop="", access_token="
                         })
             
                 except ValueError as e:
-                    print(f"Error parsing date for product {product['node']['id']}: {e}")
+                    logger.warning(f"Error parsing date for product {product['node']['id']}: {e}")
 
         if not page_info['hasNextPage']:
             break
         
         #print("Wait 3 seconds...")
-        time.sleep(3) # Query takes 288 tokens, wait 3 seconds so never deplete
+        rate_limiter.sleep(3) # Query takes 288 tokens, wait 3 seconds so never deplete
 
+    progress.done()
     return CustomResponse(data=filtered_products, status_code=200)
 
 def Shopify_unpublish_products_channel(shop="", access_token="", api_version=API_VERSION, products=[], channel_id=""):
@@ -991,7 +1529,7 @@ def Shopify_unpublish_products_channel(shop="", access_token="", api_version=API
     Upublishes products for a channel id by removing from channel id
     '''
 
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
@@ -1017,7 +1555,7 @@ def Shopify_unpublish_products_channel(shop="", access_token="", api_version=API
                 "publicationId": channel_id
             }]
         }
-        response = requests.post(url, json={'query': mutation, 'variables': variables}, headers=headers)
+        response = shopify_request('POST', url, json={'query': mutation, 'variables': variables}, headers=headers)
         if response.status_code == 200:
             errors = response.json().get('errors', [])  
             if errors:
@@ -1028,7 +1566,7 @@ def Shopify_unpublish_products_channel(shop="", access_token="", api_version=API
             # print(f"Product {product['id']} unpublished successfully.")
         else:
             allpublished=False
-            print(f"Failed to unpublish product {product['id']}: {response.status_code}")
+            logger.error(f"Failed to unpublish product {product['id']}: {response.status_code}")
 
     message = "All products were unpublished correctly"
     if allpublished != True:
@@ -1037,7 +1575,7 @@ def Shopify_unpublish_products_channel(shop="", access_token="", api_version=API
     return CustomResponse(data=message, status_code=200)
 
 def Shopify_get_online_store_channel_id(shop="", access_token="", api_version=API_VERSION):
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
 
     headers = {
         'Content-Type': 'application/json',
@@ -1055,7 +1593,7 @@ def Shopify_get_online_store_channel_id(shop="", access_token="", api_version=AP
       }
     }
     '''
-    response = requests.post(url, json={'query': query}, headers=headers)
+    response = shopify_request('POST', url, json={'query': query}, headers=headers)
     if response.status_code == 200:
         data = response.json()
         publications = data['data']['publications']['edges']
@@ -1067,7 +1605,7 @@ def Shopify_get_online_store_channel_id(shop="", access_token="", api_version=AP
 def Shopify_reduce_inventory_by_9999(shop="", access_token="", api_version=API_VERSION, inventory_item_ids="", location_id=""):
     # inventory_item_ids = ["inventory-item-id-1", "inventory-item-id-2"]  # List of inventory item IDs
 
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
@@ -1090,30 +1628,32 @@ def Shopify_reduce_inventory_by_9999(shop="", access_token="", api_version=API_V
     '''
     # Preparing the adjustments input for the GraphQL mutation
     adjustments = [{"inventoryItemId": item_id, "availableDelta": -9999} for item_id in inventory_item_ids]
-    print(adjustments)
+    logger.debug(adjustments)
     variables = {
         "inventoryItemAdjustments": adjustments,
         "locationId": location_id
         
     }
 
-    response = requests.post(url, json={'query': mutation, 'variables': variables}, headers=headers)
+    response = shopify_request('POST', url, json={'query': mutation, 'variables': variables}, headers=headers)
     if response.status_code == 200:
         message="Inventory set to zero successfully."
-        print(message)
+        logger.info(message)
         return CustomResponse(data=message, status_code=200)
         
     else:
         message=f"Failed to set inventory to zero: {response.status_code}"
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=400)
 
 def Shopify_set_inventory_to_zero(shop="", access_token="", api_version=API_VERSION, inventory_item_ids="", location_id="", reason="correction", reference_document_uri=""):
     
+    rate_limiter = ShopifyRateLimiter()
+
     # Loop through each chunk and make the API call
     for chunk in chunker(inventory_item_ids, 250):
 
-        url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+        url = shopify_admin_url(shop, api_version)
         headers = {
             'Content-Type': 'application/json',
             'X-Shopify-Access-Token': access_token
@@ -1145,38 +1685,38 @@ def Shopify_set_inventory_to_zero(shop="", access_token="", api_version=API_VERS
             }
         }
 
-        response = requests.post(url, json={'query': mutation, 'variables': variables}, headers=headers)
+        response = shopify_request('POST', url, rate_limiter=rate_limiter, json={'query': mutation, 'variables': variables}, headers=headers)
         
         if response.status_code != 200:
             message = f"Failed to set inventory to zero for chunk: {response.status_code}"
-            print(message)
+            logger.error(message)
             return CustomResponse(data=message, status_code=400)
 
-        print("Waiting...")
-        time.sleep(2)
+        logger.debug("Waiting...")
+        rate_limiter.sleep(2)
 
     message="Inventory set to zero successfully for all items."
-    print(message)
+    logger.info(message)
     return CustomResponse(data=message, status_code=200)
     
 def Shopify_get_locations(shop="", access_token="", api_version=API_VERSION):
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/locations.json"
+    url = shopify_admin_url(shop, api_version, "locations.json")
     headers = {"X-Shopify-Access-Token": access_token}
-    response = requests.get(url, headers=headers)
+    response = shopify_request('GET', url, headers=headers)
     if response.status_code == 200:
         return CustomResponse(data=response.json()['locations'], status_code=200)  # Returns a list of locations
     else:
-        print(f"Failed to retrieve locations: {response.status_code}")
+        logger.error(f"Failed to retrieve locations: {response.status_code}")
         return CustomResponse(data="", status_code=400)
     
 def Shopify_get_publication_id(shop="", access_token="", api_version=API_VERSION, name="Online Store"):
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
     }
     
-    response = requests.post(url, json={'query': queryPublicationID}, headers=headers)
+    response = shopify_request('POST', url, json={'query': queryPublicationID}, headers=headers)
     publications = response.json().get('data', {}).get('publications', {}).get('edges', [])
     for pub in publications:
         # print(f"Publication ID: {pub['node']['id']}, Name: {pub['node']['name']}")
@@ -1187,7 +1727,7 @@ def Shopify_get_publication_id(shop="", access_token="", api_version=API_VERSION
     return publication_id
 
 def Shopify_get_publications(shop="", access_token="", api_version=API_VERSION):
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     
     query = '''
     {
@@ -1205,11 +1745,11 @@ def Shopify_get_publications(shop="", access_token="", api_version=API_VERSION):
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
     }
-    response = requests.post(url, json={'query': query}, headers=headers)
+    response = shopify_request('POST', url, json={'query': query}, headers=headers)
     return response.json()
 
 def Shopify_start_bulk_operation(shop, access_token, api_version, products):
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token,
@@ -1246,7 +1786,7 @@ def Shopify_start_bulk_operation(shop, access_token, api_version, products):
     }
     '''
 
-    response = requests.post(url, json={'query': bulk_operation_query}, headers=headers)
+    response = shopify_request('POST', url, json={'query': bulk_operation_query}, headers=headers)
     response_json = response.json()
 
     # Extract the operation ID and return it for polling
@@ -1254,7 +1794,7 @@ def Shopify_start_bulk_operation(shop, access_token, api_version, products):
     return operation_id
 
 def Shopify_poll_bulk_operation_status(shop, access_token, api_version, operation_id):
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token,
@@ -1276,14 +1816,14 @@ def Shopify_poll_bulk_operation_status(shop, access_token, api_version, operatio
     '''
 
     while True:
-        response = requests.post(url, json={'query': check_status_query}, headers=headers)
+        response = shopify_request('POST', url, json={'query': check_status_query}, headers=headers)
         response_json = response.json()
         current_operation_id = response_json['data']['currentBulkOperation']['id']
         operation_status = response_json['data']['currentBulkOperation']['status']
 
         # Check if the current operation ID matches the one we're interested in
         if current_operation_id != operation_id:
-            print(f"Current operation ID ({current_operation_id}) does not match the expected operation ID ({operation_id}).")
+            logger.error(f"Current operation ID ({current_operation_id}) does not match the expected operation ID ({operation_id}).")
             # Handle this situation, e.g., by breaking or continuing to poll
             break
 
@@ -1292,10 +1832,10 @@ def Shopify_poll_bulk_operation_status(shop, access_token, api_version, operatio
             return results_url
         elif operation_status == 'FAILED':
             # Handle failure here
-            print("Bulk operation failed.")
+            logger.error("Bulk operation failed.")
             break
         else:
-            print("Bulk operation is still processing...")
+            logger.debug("Bulk operation is still processing...")
             time.sleep(10)  # Poll every 10 seconds
 
 def Shopify_archive_products(shop, access_token, api_version, product_ids):
@@ -1307,8 +1847,8 @@ def Shopify_archive_products(shop, access_token, api_version, product_ids):
     :param api_version: The Shopify API version to use.
     :param product_ids: List of product GraphQL IDs to archive.
     """
-    print("Starting archive products")
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    logger.info("Starting archive products")
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token,
@@ -1340,11 +1880,11 @@ def Shopify_archive_products(shop, access_token, api_version, product_ids):
 
         
         # Make the request to archive the product
-        response = requests.post(url, headers=headers, json={'query': mutation_string, 'variables': variables})
+        response = shopify_request('POST', url, headers=headers, json={'query': mutation_string, 'variables': variables})
 
         if response.status_code != 200:
             message = f"Failed to archive product {product_id}. Status code: {response.status_code}, Response: {response.text}"
-            print(message)
+            logger.error(message)
             return CustomResponse(data=message, status_code=response.status_code)
 
         # Check for any errors in the response
@@ -1352,7 +1892,7 @@ def Shopify_archive_products(shop, access_token, api_version, product_ids):
         
         if 'errors' in response_json:
             error_message = response_json['errors'][0]['message']
-            print(f"Error received for product {product_id}: {error_message}")
+            logger.error(f"Error received for product {product_id}: {error_message}")
             return CustomResponse(data=error_message, status_code=400)
 
         
@@ -1368,7 +1908,7 @@ def Shopify_bulk_unpublish_products(shop, access_token, api_version, product_ids
     :param product_ids: List of product IDs to unpublish.
     """
 
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token,
@@ -1390,10 +1930,10 @@ def Shopify_bulk_unpublish_products(shop, access_token, api_version, product_ids
             json_line = json.dumps(line_dict)
             file.write(f"{json_line}\n")
 
-    print(f"JSONL file created and saved to {file_path}")
+    logger.info(f"JSONL file created and saved to {file_path}")
 
     # STEP 2: UPLOAD JSONL FILE TO SHOPIFY
-    print(f"Uploading JSONL file")
+    logger.info(f"Uploading JSONL file")
     # GraphQL mutation for stagedUploadsCreate
     mutation = '''
     mutation stagedUploadsCreate($input: [StagedUploadInput!]!) {
@@ -1427,13 +1967,13 @@ def Shopify_bulk_unpublish_products(shop, access_token, api_version, product_ids
     }
 
     # Send the request to create a staged upload
-    print(f"Creating staged upload...")
-    response = requests.post(url, headers=headers, data=json.dumps({'query': mutation, 'variables': variables}))
+    logger.info(f"Creating staged upload...")
+    response = shopify_request('POST', url, headers=headers, data=json.dumps({'query': mutation, 'variables': variables}))
 
     # Check response
     if response.status_code != 200:
         message="Failed to create staged upload."
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=response.status_code)
 
     response_json=response.json()
@@ -1441,10 +1981,10 @@ def Shopify_bulk_unpublish_products(shop, access_token, api_version, product_ids
         error_message = response_json['errors'][0]['message']
         # Log the error message or handle it as needed
         message=f"Error received: {error_message}"
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=400)
 
-    print(f"Staged upload created.")
+    logger.info(f"Staged upload created.")
 
     upload_url = response_json['data']['stagedUploadsCreate']['stagedTargets'][0]['url']
     upload_parameters = response_json['data']['stagedUploadsCreate']['stagedTargets'][0]['parameters']
@@ -1454,20 +1994,20 @@ def Shopify_bulk_unpublish_products(shop, access_token, api_version, product_ids
     #print(f"Upload parameters: {upload_parameters}")
     #print(f"Resource url: {resource_url}")
 
-    print(f"Uploading JSONL...")
+    logger.info(f"Uploading JSONL...")
     multipart_data = MultipartEncoder(
         fields={**{param['name']: param['value'] for param in upload_parameters}, 'file': ('unpublish_products.jsonl', open(file_path, 'rb'), 'text/jsonl')}
     )
 
     #print(f"Multipart data: {multipart_data}")
 
-    response = requests.post(upload_url, data=multipart_data, headers={'Content-Type': multipart_data.content_type})
+    response = shopify_request('POST', upload_url, data=multipart_data, headers={'Content-Type': multipart_data.content_type})
     if response.status_code not in [200, 201]:
         message=f"Failed to upload file. Status Code: {response.status_code} Response: {response.text}"
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=response.status_code)
 
-    print("File uploaded successfully.")
+    logger.info("File uploaded successfully.")
 
     key_value = next((param['value'] for param in upload_parameters if param['name'] == 'key'), None)
     staged_upload_path=key_value
@@ -1508,15 +2048,15 @@ def Shopify_bulk_unpublish_products(shop, access_token, api_version, product_ids
     }
 
     # Make the GraphQL POST request to start the bulk operation
-    response = requests.post(url, headers=headers, json={'query': bulk_mutation, 'variables': variables})
+    response = shopify_request('POST', url, headers=headers, json={'query': bulk_mutation, 'variables': variables})
 
     # Inspect the response
     if response.status_code != 200:
         message=f"Failed to initiate bulk operation. {response.text}. Status code: {response.status_code}"
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=response.status_code)    
 
-    print("Bulk operation initiated successfully.")
+    logger.info("Bulk operation initiated successfully.")
      
     ## STEP 4 WAIT UNTIL FINISHED
     query = '''
@@ -1531,25 +2071,25 @@ def Shopify_bulk_unpublish_products(shop, access_token, api_version, product_ids
     '''
 
     while True:
-        response = requests.post(url, headers=headers, json={'query': query})
+        response = shopify_request('POST', url, headers=headers, json={'query': query})
         if response.status_code == 200:
             response_json = response.json()
             if response_json['data']['currentBulkOperation']:
                 current_status = response_json['data']['currentBulkOperation']['status']
                 if current_status == 'COMPLETED':
-                    print("Bulk operation completed.")
+                    logger.info("Bulk operation completed.")
                     break
                 elif current_status == 'RUNNING':
-                    print("Bulk operation is still running. Checking again in 10 seconds...")
+                    logger.debug("Bulk operation is still running. Checking again in 10 seconds...")
                     time.sleep(5)
                 else:
-                    print(f"Bulk operation status: {current_status}")
+                    logger.info(f"Bulk operation status: {current_status}")
                     break
             else:
-                print("No current bulk operation found. It might have not started properly or already finished.")
+                logger.info("No current bulk operation found. It might have not started properly or already finished.")
                 break
         else:
-            print(f"Failed to query bulk operation status. Status code: {response.status_code}")
+            logger.error(f"Failed to query bulk operation status. Status code: {response.status_code}")
             break
     
     return CustomResponse(data="OK", status_code=200)
@@ -1579,7 +2119,7 @@ def Shopify_process_handle(input_string):
 
 def Shopify_execute_bulk_mutation(shop="", access_token="", api_version="", mutation="", staged_upload_path=""):
     
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
@@ -1591,16 +2131,16 @@ def Shopify_execute_bulk_mutation(shop="", access_token="", api_version="", muta
     }
 
     # Make the GraphQL POST request to start the bulk operation
-    response = requests.post(url, headers=headers, json={'query': mutationbulkOperationRunMutation, 'variables': variables})
+    response = shopify_request('POST', url, headers=headers, json={'query': mutationbulkOperationRunMutation, 'variables': variables})
 
     # Inspect the response
     if response.status_code != 200:
         message=f"Failed to initiate bulk operation. {response.text}. Status code: {response.status_code}"
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=response.status_code)    
 
-    print("Bulk operation initiated successfully.")
-    print(response.text)
+    logger.info("Bulk operation initiated successfully.")
+    logger.debug(response.text)
     
     ## STEP 4 WAIT UNTIL FINISHED
     query = '''
@@ -1615,36 +2155,36 @@ def Shopify_execute_bulk_mutation(shop="", access_token="", api_version="", muta
     '''
 
     while True:
-        response = requests.post(url, headers=headers, json={'query': query})
+        response = shopify_request('POST', url, headers=headers, json={'query': query})
         
         if response.status_code == 200:
             response_json = response.json()
             if response_json['data']['currentBulkOperation']:
                 current_status = response_json['data']['currentBulkOperation']['status']
                 if current_status == 'COMPLETED':
-                    print("Bulk operation completed.")
+                    logger.info("Bulk operation completed.")
                     break
                 elif current_status == 'RUNNING':
-                    print("Bulk operation is still running. Checking again in 10 seconds...")
+                    logger.debug("Bulk operation is still running. Checking again in 10 seconds...")
                     time.sleep(10)
                 else:
-                    print(f"Bulk operation status: {current_status}")
+                    logger.info(f"Bulk operation status: {current_status}")
                     break
             else:
-                print("No current bulk operation found. It might have not started properly or already finished.")
+                logger.info("No current bulk operation found. It might have not started properly or already finished.")
                 break
         else:
-            print(f"Failed to query bulk operation status. Status code: {response.status_code}")
+            logger.error(f"Failed to query bulk operation status. Status code: {response.status_code}")
             break
 
-    print(response.text)
+    logger.debug(response.text)
     return CustomResponse(data=response.text, status_code=response.status_code)  
 
 def Shopify_upload_jsonl(shop="", access_token="", api_version="", file_path=""):
     # GraphQL mutation for stagedUploadsCreate
     mutation=mutationstagedUploadsCreate
 
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
@@ -1663,13 +2203,13 @@ def Shopify_upload_jsonl(shop="", access_token="", api_version="", file_path="")
     }
 
     # Send the request to create a staged upload
-    print(f"Creating staged upload...")
-    response = requests.post(url, headers=headers, data=json.dumps({'query': mutation, 'variables': variables}))
+    logger.info(f"Creating staged upload...")
+    response = shopify_request('POST', url, headers=headers, data=json.dumps({'query': mutation, 'variables': variables}))
     
     # Check response
     if response.status_code != 200:
         message="Failed to create staged upload."
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=response.status_code)
 
     response_json=response.json()
@@ -1677,27 +2217,27 @@ def Shopify_upload_jsonl(shop="", access_token="", api_version="", file_path="")
         error_message = response_json['errors'][0]['message']
         # Log the error message or handle it as needed
         message=f"Error received: {error_message}"
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=400)
 
-    print(f"Staged upload created.")
+    logger.info(f"Staged upload created.")
 
     upload_url = response_json['data']['stagedUploadsCreate']['stagedTargets'][0]['url']
     upload_parameters = response_json['data']['stagedUploadsCreate']['stagedTargets'][0]['parameters']
     resource_url = response_json['data']['stagedUploadsCreate']['stagedTargets'][0]['resourceUrl']
 
-    print(f"Uploading JSONL...")
+    logger.info(f"Uploading JSONL...")
     multipart_data = MultipartEncoder(
         fields={**{param['name']: param['value'] for param in upload_parameters}, 'file': (file_path, open(file_path, 'rb'), 'text/jsonl')}
     )
 
-    response = requests.post(upload_url, data=multipart_data, headers={'Content-Type': multipart_data.content_type})
+    response = shopify_request('POST', upload_url, data=multipart_data, headers={'Content-Type': multipart_data.content_type})
     if response.status_code not in [200, 201]:
         message=f"Failed to upload file. Status Code: {response.status_code} Response: {response.text}"
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=response.status_code)
 
-    print("File uploaded successfully.")
+    logger.info("File uploaded successfully.")
 
     key_value = next((param['value'] for param in upload_parameters if param['name'] == 'key'), None)
     staged_upload_path=key_value
@@ -1711,17 +2251,17 @@ def Shopify_bulk_update_products(shop="", access_token="", api_version="", file_
     """
 
     # UPLOAD JSONL FILE TO SHOPIFY
-    print(f"Bulk Product Update: Uploading JSONL file")
+    logger.info(f"Bulk Product Update: Uploading JSONL file")
     custom_response=Shopify_upload_jsonl(shop=shop, access_token=access_token, api_version=api_version, file_path=file_path)
     if custom_response.status_code!=200:
         message=f"Error creating staged response: {custom_response.data}"
-        print(message)
+        logger.error(message)
         return CustomResponse(data=message, status_code=400)
     staged_upload_path = custom_response.data
-    print(f"Staged upload path: {staged_upload_path}")
+    logger.info(f"Staged upload path: {staged_upload_path}")
 
     # EXECUTE THE MUTATION
-    print(f"Executing mutation staged_upload_path...")
+    logger.info(f"Executing mutation staged_upload_path...")
     # print(f"Executing mutation {mutation} from path {staged_upload_path}...")
     custom_response=Shopify_execute_bulk_mutation(shop=shop, access_token=access_token, api_version=api_version, mutation=mutation, staged_upload_path=staged_upload_path)
     
@@ -1747,21 +2287,21 @@ def Shopify_get_image_url_from_gid(shop, access_token, api_version, gid, retries
         "id": gid
     }
     
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         "X-Shopify-Access-Token": access_token,
         "Content-Type": "application/json"
     }
     
     for attempt in range(retries):
-        response = requests.post(url, headers=headers, json={"query": query, "variables": variables})
+        response = shopify_request('POST', url, headers=headers, json={"query": query, "variables": variables})
         
         if response.status_code == 200:
             response_data = response.json()
-            print(f"Response JSON (Attempt {attempt+1}): {response_data}")  # Log the response JSON for debugging
+            logger.debug(f"Response JSON (Attempt {attempt+1}): {response_data}")  # Log the response JSON for debugging
             
             if 'errors' in response_data:
-                print(f"GraphQL errors: {response_data['errors']}")
+                logger.error(f"GraphQL errors: {response_data['errors']}")
                 return None
             
             node = response_data.get('data', {}).get('node', None)
@@ -1769,13 +2309,13 @@ def Shopify_get_image_url_from_gid(shop, access_token, api_version, gid, retries
             if node and node.get('image') and node['image']['url']:
                 return node['image']['url']
             else:
-                print("Image URL not found in the response. Retrying...")
+                logger.debug("Image URL not found in the response. Retrying...")
                 time.sleep(delay)  # Wait before retrying
         else:
-            print(f"Error fetching image URL: {response.status_code} - {response.text}")
+            logger.error(f"Error fetching image URL: {response.status_code} - {response.text}")
             return None
     
-    print("Exceeded maximum retries. Image URL not found.")
+    logger.error("Exceeded maximum retries. Image URL not found.")
     return None
 
 def Shopify_get_image_url_from_gid_OLD(shop, access_token, api_version, gid):
@@ -1798,67 +2338,68 @@ def Shopify_get_image_url_from_gid_OLD(shop, access_token, api_version, gid):
         "id": gid
     }
     
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+    url = shopify_admin_url(shop, api_version)
     headers = {
         "X-Shopify-Access-Token": access_token,
         "Content-Type": "application/json"
     }
     
-    response = requests.post(url, headers=headers, json={"query": query, "variables": variables})
-    print(f"response.json() {response.json()}")
+    response = shopify_request('POST', url, headers=headers, json={"query": query, "variables": variables})
+    logger.debug(f"response.json() {response.json()}")
     if response.status_code == 200:
         response_data = response.json()
         if 'errors' in response_data:
-            print(f"GraphQL errors: {response_data['errors']}")
+            logger.error(f"GraphQL errors: {response_data['errors']}")
             return None
         node = response_data.get('data', {}).get('node', {})
         if node and 'image' in node:
-            print(f"node {node}")
+            logger.debug(f"node {node}")
             image_url = node['image']['url']
             return image_url
         else:
-            print("Image URL not found in the response.")
+            logger.error("Image URL not found in the response.")
             return None
     else:
-        print(f"Error fetching image URL: {response.status_code} - {response.text}")
+        logger.error(f"Error fetching image URL: {response.status_code} - {response.text}")
         return None
 
 ###################### SPECIFIC FUNCTIONS
     
-def Shopify_get_marketing_customer_list(shop="", access_token="", api_version=API_VERSION):
+# Server-side pre-filters for each marketing list. The customers search has no SMS consent
+# filter, so SMS narrows to customers with a phone and consent is confirmed on the returned node.
+CUSTOMER_MARKETING_QUERIES = {
+    'newsletter_subscribers': ('accepts_marketing:true', 'defaultEmailAddress'),
+    'sms_marketing_subscribers': ('phone:*', 'defaultPhoneNumber'),
+}
+
+def Shopify_get_marketing_customer_list(shop="", access_token="", api_version=API_VERSION, bulk=False):
     ''' Returns a dictionary with 2 lists, customer who are subscribe to email marketing and cutomers subscribed to SMS marketing'''
-    # Assume Shopify_get_customers is defined elsewhere and correctly returns customer data
-    response = Shopify_get_customers(shop, access_token, api_version)
-    
     # Initialize dictionaries to hold subscribers
     marketing_lists = {
         'newsletter_subscribers': [],
         'sms_marketing_subscribers': []
     }
-    
-    # Proceed only if the response was successful
-    if response.status_code != 200:
-        print("Failed to retrieve customers. Status Code:", response.status_code)
-        return response
 
-    # Iterate through the customer data
-    for customer in response.data:
-        email_marketing_consent = customer.get('email_marketing_consent')
-        if email_marketing_consent and email_marketing_consent.get('state') == 'subscribed':
-            marketing_lists['newsletter_subscribers'].append({
-                'first_name': customer.get('first_name', ''),
-                'last_name': customer.get('last_name', ''),
-                'email': customer.get('email', '')
-            })
-        
-        sms_marketing_consent = customer.get('sms_marketing_consent')
-        # Adjusted to check if sms_marketing_consent is not None and then proceed
-        if sms_marketing_consent and sms_marketing_consent.get('state') == 'subscribed':
-            marketing_lists['sms_marketing_subscribers'].append({
-                'first_name': customer.get('first_name', ''),
-                'last_name': customer.get('last_name', ''),
-                'email': customer.get('email', '')  # Assuming you want the email for SMS subscribers
-            })
+    try:
+        for list_name, (search_query, contact_field) in CUSTOMER_MARKETING_QUERIES.items():
+            # Consent is filtered by Shopify, only the matching customers are streamed back
+            customers = Shopify_iter_customers(shop=shop, access_token=access_token, api_version=api_version, search_query=search_query, bulk=bulk)
+            for customer in customers:
+                contact = customer.get(contact_field) or {}
+                if contact.get('marketingState') != 'SUBSCRIBED':
+                    continue
+                email_address = customer.get('defaultEmailAddress') or {}
+                subscriber = {
+                    'first_name': customer.get('firstName') or '',
+                    'last_name': customer.get('lastName') or '',
+                    'email': email_address.get('emailAddress') or ''
+                }
+                if contact_field == 'defaultPhoneNumber':
+                    subscriber['phone'] = contact.get('phoneNumber') or ''
+                marketing_lists[list_name].append(subscriber)
+    except ShopifyAPIError as e:
+        logger.error(f"Failed to retrieve customers. Status Code: {e.status_code}")
+        return CustomResponse(data=str(e), status_code=e.status_code)
     
     return CustomResponse(data=marketing_lists, status_code=200)
     
@@ -1872,7 +2413,7 @@ def Shopify_set_stock_zero_metafield_unpublish(shop="", access_token="", api_ver
     custom_response = Shopify_get_products_and_inventoryid_with_metafields(shop=shop, access_token=access_token, api_version=API_VERSION, metafield_key=metafield_key, filterdate=filter_date)
     if custom_response.status_code != 200:
         error_message = "Error getting product with metafield value"
-        print(error_message)
+        logger.error(error_message)
         return CustomResponse(data=error_message, status_code=400)
 
     filtered_products = custom_response.data
@@ -1883,7 +2424,7 @@ def Shopify_set_stock_zero_metafield_unpublish(shop="", access_token="", api_ver
     custom_response = Shopify_get_locations(shop=shop, access_token=access_token, api_version=API_VERSION)
     if custom_response.status_code!=200:
         error_message = "Error getting locations"
-        print(error_message)
+        logger.error(error_message)
         return CustomResponse(data=error_message, status_code=400)
     locations = custom_response.data
     if locations:
@@ -1893,7 +2434,7 @@ def Shopify_set_stock_zero_metafield_unpublish(shop="", access_token="", api_ver
         location_id = f"gid://shopify/Location/{location_id}"
     else:
         error_message = "Error No locations found."
-        print(error_message)
+        logger.error(error_message)
         return CustomResponse(data=error_message, status_code=400)
     
     # SET STOCK TO ZERO. VERY FAST, JUST 1 MUTATION WITH ALL INVENTORY ITEMS
@@ -1901,37 +2442,74 @@ def Shopify_set_stock_zero_metafield_unpublish(shop="", access_token="", api_ver
     custom_response=Shopify_set_inventory_to_zero(shop=shop, access_token=access_token, api_version=API_VERSION, inventory_item_ids=inventory_item_ids, location_id=location_id, reason=reason, reference_document_uri=reference_document_uri)
     if custom_response.status_code != 200:
         error_message = "Error setting inventory to zero"
-        print(error_message)
+        logger.error(error_message)
         return CustomResponse(data=error_message, status_code=400)
     
     return CustomResponse(data="All OK", status_code=200)
 
+def Shopify_get_collection_products_publication_status(shop="", access_token="", api_version=API_VERSION, collection_id="", publication_id=""):
+    '''
+    Returns {product_gid: published} for every product in a collection, where published tells
+    whether the product is on publication_id. Only ids and the flag are fetched.
+    '''
+    query = '''
+    query ($id: ID!, $publicationId: ID!, $cursor: String) {
+        collection(id: $id) {
+            products(first: 250, after: $cursor) {
+                nodes {
+                    id
+                    publishedOnPublication(publicationId: $publicationId)
+                }
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+            }
+        }
+    }
+    '''
+    variables = {'id': shopify_gid('Collection', collection_id), 'publicationId': publication_id}
+
+    try:
+        products = Shopify_graphql_paginate(shop=shop, access_token=access_token, api_version=api_version, query=query, connection='collection.products', variables=variables)
+        publication_status = {product['id']: product['publishedOnPublication'] for product in products}
+    except ShopifyAPIError as e:
+        logger.error(f"Failed to retrieve publication status for collection {collection_id}: {e.status_code}")
+        return CustomResponse(data=str(e), status_code=e.status_code)
+
+    return CustomResponse(data=publication_status, status_code=200)
+
 def Shopify_collection_unpublish(shop="", access_token="", api_version=API_VERSION, collection_id=""):
     
-    # GET PRODUCTS IN COLLECTION   
-    print(f"Collection id: {collection_id}") 
-    custom_response = Shopify_get_products_in_collection(shop=shop, access_token=access_token, collection_id=collection_id)
+    logger.info(f"Collection id: {collection_id}")
+    channel_id = Shopify_get_online_store_channel_id(shop=shop, access_token=access_token, api_version=api_version) 
+    if not channel_id:
+        error_message="Couldn't get online store channel id"
+        logger.error(error_message)
+        return CustomResponse(data=error_message, status_code=400)
+
+    # GET PRODUCT IDS IN COLLECTION WITH THEIR ONLINE STORE PUBLICATION STATUS
+    custom_response = Shopify_get_collection_products_publication_status(shop=shop, access_token=access_token, api_version=api_version, collection_id=collection_id, publication_id=channel_id)
     if custom_response.status_code!= 200:
         error_message="Couldn't get products from collection"
-        print(error_message)
+        logger.error(error_message)
         return CustomResponse(data=error_message, status_code=400)
-    products = custom_response.data
-    print(f"Total products in collection {len(products)}")
-    
-    # Filter products already unpublished to speed up
-    # Filter wasn't working,
-    # products = [product for product in products if product['published_at'] is not None]
-    print(f"Total unpublished products in collection {len(products)}")
+    publication_status = custom_response.data
+    logger.info(f"Total products in collection {len(publication_status)}")
+    
+    # Only products still published need unpublishing
+    product_ids = [product_id for product_id, published in publication_status.items() if published]
+    logger.info(f"Total published products in collection {len(product_ids)}")
+    if not product_ids:
+        message=f"Collection {collection_id}: no published products left to unpublish."
+        return CustomResponse(data=message, status_code=200)
 
-    channel_id = Shopify_get_online_store_channel_id(shop=shop, access_token=access_token, api_version=api_version) 
-    
     # Bulk unpublish
-    product_ids = [product['admin_graphql_api_id'] for product in products]
     custom_response=Shopify_bulk_unpublish_products(shop=shop, access_token=access_token, api_version=api_version, product_ids=product_ids, channel_id=channel_id)
-    if custom_response!=200:
+    if custom_response.status_code!=200:
         return CustomResponse(data=custom_response.data, status_code=custom_response.status_code)
     
-    message=f"Collection {collection_id}: {len(products)} products unpublished successfully."
+    message=f"Collection {collection_id}: {len(product_ids)} products unpublished successfully."
     return CustomResponse(data=message, status_code=200)
 
 def Shopify_collection_archive(shop="", access_token="", api_version=API_VERSION, collection_id=""):
@@ -1945,17 +2523,17 @@ def Shopify_collection_archive(shop="", access_token="", api_version=API_VERSION
     """
 
     # STEP 1: Get products in the collection
-    print(f"Fetching products for collection id: {collection_id}")
+    logger.info(f"Fetching products for collection id: {collection_id}")
     # Only get active products to optimize
     custom_response = Shopify_get_products_in_collection(shop=shop, access_token=access_token, collection_id=collection_id)
     
     if custom_response.status_code != 200:
         error_message = "Couldn't get products from collection"
-        print(error_message)
+        logger.error(error_message)
         return CustomResponse(data=error_message, status_code=400)
     
     products = custom_response.data
-    print(f"Total products in collection: {len(products)}")
+    logger.info(f"Total products in collection: {len(products)}")
     
     # STEP 2: Filter products by their status (e.g., 'active', 'archived', or 'draft')
     active_products = [product for product in products if product.get('status') == 'active']    
@@ -1965,22 +2543,22 @@ def Shopify_collection_archive(shop="", access_token="", api_version=API_VERSION
     
     if len(product_ids) == 0:
         message = f"No products found in collection {collection_id} to archive."
-        print(message)
+        logger.info(message)
         return CustomResponse(data=message, status_code=200)
     message = f"Found {len(product_ids)} products in collection {collection_id} to archive."
-    print(message)
+    logger.info(message)
 
     # STEP 2: Call Shopify_archive_products to archive the products
-    print(f"Archiving products in collection {collection_id}...")
+    logger.info(f"Archiving products in collection {collection_id}...")
     custom_response = Shopify_archive_products(shop=shop, access_token=access_token, api_version=api_version, product_ids=product_ids)
     
     if custom_response.status_code != 200:
         error_message = "Failed to archive products in collection"
-        print(error_message)
+        logger.error(error_message)
         return custom_response
     
     message = f"Collection {collection_id}: {len(product_ids)} products archived successfully."
-    print(message)
+    logger.info(message)
     return CustomResponse(data=message, status_code=200)
 
 def Shopify_publish_blog_post(shop="", access_token="", api_version=API_VERSION, blog_id="", title="", content="", author="", tags=[], published_at=None, image_path=None, image_url=None):
@@ -2010,11 +2588,11 @@ def Shopify_publish_blog_post(shop="", access_token="", api_version=API_VERSION,
     """
     # Upload the image if provided
     if image_url is not None:
-        print("--- Downloading file to local")
-        image_path = download_file_local(url=image_url)
+        logger.info("--- Downloading file to local")
+        image_path = download_file_local(url=image_url, use_cache=True)
 
     if image_path:
-        print("--- Uploading file to shopify")
+        logger.info("--- Uploading file to shopify")
         file_name = os.path.basename(image_path)
         upload_response = Shopify_upload_file(shop=shop, access_token=access_token, api_version=api_version, file_path=image_path, file_name=file_name, alt_text=title)  
 
@@ -2022,15 +2600,15 @@ def Shopify_publish_blog_post(shop="", access_token="", api_version=API_VERSION,
             gid = upload_response.data['data']['fileCreate']['files'][0]['id']
             upload_image_url = Shopify_get_image_url_from_gid(shop, access_token, api_version, gid)
             if not upload_image_url:
-                print("Failed to retrieve image URL.")
+                logger.error("Failed to retrieve image URL.")
                 return CustomResponse(data="Failed to retrieve image URL", status_code=422)           
         else:
-            print(f"Image upload failed: {upload_response.data}")
+            logger.error(f"Image upload failed: {upload_response.data}")
             return upload_response
     
         delete_local_file(file_name=image_path)
 
-    url = f"https://{shop}.myshopify.com/admin/api/{api_version}/blogs/{blog_id}/articles.json"
+    url = shopify_admin_url(shop, api_version, f"blogs/{blog_id}/articles.json")
     headers = {
         'Content-Type': 'application/json',
         'X-Shopify-Access-Token': access_token
@@ -2054,15 +2632,15 @@ def Shopify_publish_blog_post(shop="", access_token="", api_version=API_VERSION,
             "src": upload_image_url
         }
 
-    response = requests.post(url, json=data, headers=headers)
+    response = shopify_request('POST', url, json=data, headers=headers)
     
     if response.status_code == 201:
         return CustomResponse(data=response.json(), status_code=200)
     else:
-        print(f"Error: {response.status_code} - {response.text}")
+        logger.error(f"Error: {response.status_code} - {response.text}")
         return CustomResponse(data=response.text, status_code=response.status_code)
 
-def Shopify_upload_file(shop, access_token, api_version=API_VERSION, file_path="", file_name="", alt_text=""):
+def Shopify_upload_file(shop, access_token, api_version=API_VERSION, file_path="", file_name="", alt_text="", transform=None):
     """
     Uploads a file to Shopify.
 
@@ -2072,13 +2650,18 @@ def Shopify_upload_file(shop, access_token, api_version=API_VERSION, file_path="
     :param file_path: The local path to the file to be uploaded.
     :param file_name: The name of the file to be uploaded.
     :param alt_text: The alt text for the file.
+    :param transform: Optional commonimage.ImageTransform, the first variant is uploaded instead of the original.
     :return: A CustomResponse object with the API response.
     """
     try:
         # Read the file
         with open(file_path, 'rb') as file:
             file_data = file.read()
-        file_size = os.path.getsize(file_path)
+
+        if transform is not None:
+            # Transformed in memory, the file on disk is left alone. Shopify builds its own
+            # sizes from the upload, so only the first variant is sent
+            file_name, file_data = transform.apply_bytes(file_data, file_name or file_path)[0]
 
         file_extension = os.path.splitext(file_name)[1][1:].lower()
         mime_type = get_mime_type(file_extension)
@@ -2114,13 +2697,13 @@ def Shopify_upload_file(shop, access_token, api_version=API_VERSION, file_path="
             ]
         }
 
-        url = f"https://{shop}.myshopify.com/admin/api/{api_version}/graphql.json"
+        url = shopify_admin_url(shop, api_version)
         headers = {
             "X-Shopify-Access-Token": access_token,
             "Content-Type": "application/json"
         }
 
-        response = requests.post(
+        response = shopify_request('POST', 
             url,
             headers=headers,
             data=json.dumps({
@@ -2146,10 +2729,10 @@ def Shopify_upload_file(shop, access_token, api_version=API_VERSION, file_path="
 
         # Prepare form data for AWS S3 upload
         form_data = {param['name']: param['value'] for param in params}
-        form_data['file'] = (file_name, file_data, 'image/jpeg')
+        form_data['file'] = (file_name, file_data, mime_type)
 
         # Upload to AWS S3
-        upload_response = requests.post(
+        upload_response = shopify_request('POST', 
             upload_url,
             files=form_data
         )
@@ -2183,7 +2766,7 @@ def Shopify_upload_file(shop, access_token, api_version=API_VERSION, file_path="
             ]
         }
 
-        response = requests.post(
+        response = shopify_request('POST', 
             url,
             headers=headers,
             data=json.dumps({
@@ -2273,7 +2856,7 @@ def main():
         }
 
         # Make the GET request to the Shopify API
-        response = requests.get(url, headers=headers)
+        response = shopify_request('GET', url, headers=headers)
 
         # Print the response status code and text for debugging
         print(response.status_code)
@@ -1,11 +1,32 @@
 class CustomResponse:
+    __slots__ = ('data', 'status_code', '_text')
+
     def __init__(self, data, status_code):
         self.data = data
         self.status_code = status_code
-        self.text = str(data)
+        self._text = None
+
+    @property
+    def text(self):
+        # Built on first access only, large payloads are never stringified otherwise
+        if self._text is None:
+            self._text = str(self.data)
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        self._text = value
+
+    @property
+    def is_stream(self):
+        '''True when data is an iterator (e.g. a generator) that is consumed while iterating'''
+        return hasattr(self.data, '__next__')
+
+    def __iter__(self):
+        return iter(self.data)
 
     def json(self):
         try:
             return self.data
         except ValueError:
-            raise Exception("Invalid JSON")
\ No newline at end of file
+            raise Exception("Invalid JSON")
@@ -0,0 +1,201 @@
+'''
+Offline throughput benchmarks for commons3 and commonheroku against a local moto S3 server.
+
+    pip install "moto[server]"
+    python -m benchmarks.bench_s3 --objects 2000 --size-kb 64
+    python -m benchmarks.bench_s3 --only s3_download s3_delete_prefix
+
+Each benchmark runs in a fresh process with its own bucket, seeded before the clock starts.
+moto runs in a process of its own, so the peak memory reported (see benchmarks.common) is
+only the benchmark's. Reports objects per second, MB/s and peak memory.
+'''
+import argparse
+import http.server
+import importlib.util
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+
+from benchmarks.common import add_common_arguments, quiet_output, measure, result_dict, run_benchmarks
+
+ACCESS_KEY = "benchmark"
+SECRET_KEY = "benchmark"
+REGION = "us-east-1"
+PREFIX = "bench/"
+
+def s3_config(endpoint_url, bucket_name):
+    return {
+        "S3_ACCESS_KEY_ID": ACCESS_KEY,
+        "S3_SECRET_ACCESS_KEY": SECRET_KEY,
+        "S3_URL": f"{endpoint_url}/{bucket_name}",
+        "S3_CUBE_NAME": REGION,
+        "S3_CUBE_PUBLIC": "",
+        "S3_BUCKET_NAME": bucket_name,
+        "S3_ENDPOINT_URL": endpoint_url
+    }
+
+def heroku_config(endpoint_url, bucket_name):
+    return {
+        "CLOUDCUBE_ACCESS_KEY_ID": ACCESS_KEY,
+        "CLOUDCUBE_SECRET_ACCESS_KEY": SECRET_KEY,
+        "CLOUDCUBE_URL": f"{endpoint_url}/{bucket_name}/cube",
+        "CUBE_PUBLIC": "cube/public/",
+        "BUCKET_NAME": bucket_name
+    }
+
+def seed_bucket(commons3, s3_config_dict, args, prefix=PREFIX):
+    s3 = commons3.get_s3_client(s3_config_dict)
+    body = os.urandom(args.size_kb * 1024)
+    list(commons3.s3_run_concurrently(lambda i: s3.put_object(Bucket=s3_config_dict['S3_BUCKET_NAME'], Key=f"{prefix}{i:07d}.bin", Body=body),
+                                      range(args.objects)))
+
+def write_local_files(directory, args):
+    body = os.urandom(args.size_kb * 1024)
+    for i in range(args.objects):
+        with open(os.path.join(directory, f"{i:07d}.bin"), 'wb') as file:
+            file.write(body)
+
+# Each benchmark gets (commons3, context, args), seeds what it needs, and returns a callable to time
+
+def bench_s3_list(commons3, context, args):
+    seed_bucket(commons3, context['s3'], args)
+    return lambda: sum(1 for _ in commons3.s3_iter_objects(PREFIX, context['s3']))
+
+def bench_s3_download(commons3, context, args):
+    seed_bucket(commons3, context['s3'], args)
+    return lambda: commons3.s3_download_files_in_folder(PREFIX, context['tmp'], context['s3'], max_workers=args.workers)['downloaded']
+
+def bench_s3_upload(commons3, context, args):
+    write_local_files(context['tmp'], args)
+    return lambda: commons3.s3_sync_up(context['tmp'], PREFIX, context['s3'], max_workers=args.workers)['uploaded']
+
+def bench_s3_upload_loop(commons3, context, args):
+    # One s3_upload_local_file call per file, the way scripts used to upload folders
+    write_local_files(context['tmp'], args)
+
+    def run():
+        for name in sorted(os.listdir(context['tmp'])):
+            commons3.s3_upload_local_file(os.path.join(context['tmp'], name), PREFIX, context['s3'], b_delete_local_file=False)
+        return args.objects
+    return run
+
+def bench_s3_delete_prefix(commons3, context, args):
+    seed_bucket(commons3, context['s3'], args)
+    return lambda: commons3.s3_delete_prefix(PREFIX, context['s3'], max_workers=args.workers)['deleted']
+
+def bench_s3_url_transfer(commons3, context, args):
+    file_urls = [f"{context['http_url']}/{i:07d}.bin" for i in range(args.objects)]
+    results = lambda: commons3.s3_upload_files_from_urls(file_urls, PREFIX, context['s3'], max_workers=args.workers)
+    return lambda: sum(1 for s3_file_url in results().values() if s3_file_url)
+
+def bench_heroku_list(commons3, context, args):
+    from RikPy import commonheroku
+    seed_bucket(commons3, context['s3'], args, prefix=context['heroku']['CUBE_PUBLIC'] + PREFIX)
+    return lambda: len(commonheroku.heroku_list_files_in_folder(PREFIX, context['heroku']))
+
+def bench_heroku_download(commons3, context, args):
+    from RikPy import commonheroku
+    seed_bucket(commons3, context['s3'], args, prefix=context['heroku']['CUBE_PUBLIC'] + PREFIX)
+    # heroku_download_files_in_folder writes to ~/Downloads/<folder>
+    os.environ['HOME'] = context['tmp']
+    return lambda: commonheroku.heroku_download_files_in_folder(PREFIX, context['heroku'])
+
+BENCHMARKS = {
+    's3_list': bench_s3_list,
+    's3_download': bench_s3_download,
+    's3_upload': bench_s3_upload,
+    's3_upload_loop': bench_s3_upload_loop,
+    's3_delete_prefix': bench_s3_delete_prefix,
+    's3_url_transfer': bench_s3_url_transfer,
+    'heroku_list': bench_heroku_list,
+    'heroku_download': bench_heroku_download,
+}
+
+def run_benchmark(name, endpoint_url, http_url, args, results):
+    # Route every boto3 client, including commonheroku's own, to the stand-in
+    os.environ.update(AWS_ENDPOINT_URL=endpoint_url, AWS_ACCESS_KEY_ID=ACCESS_KEY, AWS_SECRET_ACCESS_KEY=SECRET_KEY, AWS_DEFAULT_REGION=REGION)
+    output = quiet_output(args.verbose)
+    if not args.verbose:
+        logging.getLogger('botocore').setLevel(logging.WARNING)
+    from RikPy import commons3
+
+    bucket_name = f"bench-{name.replace('_', '-')}-{os.getpid()}"
+    commons3.get_boto3_s3_client(ACCESS_KEY, SECRET_KEY, REGION, endpoint_url).create_bucket(Bucket=bucket_name)
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp, output:
+            context = {'s3': s3_config(endpoint_url, bucket_name), 'heroku': heroku_config(endpoint_url, bucket_name), 'tmp': tmp, 'http_url': http_url}
+            run = BENCHMARKS[name](commons3, context, args)
+            objects, elapsed, peak_mb = measure(run)
+    except Exception as e:
+        results.put({'benchmark': name, 'error': repr(e)})
+        return
+
+    megabytes = objects * args.size_kb / 1024
+    results.put(result_dict(name, objects, elapsed, peak_mb, mb_per_second=round(megabytes / elapsed, 2) if elapsed else None))
+
+def format_row(result):
+    return (f"{result['benchmark']:<20} {result['objects']:>8} objects  {result['seconds']:>8.2f}s  "
+            f"{result['objects_per_second'] or 0:>9.1f} obj/s  {result['mb_per_second'] or 0:>8.2f} MB/s  "
+            f"{result['peak_memory_mb']:>7.1f}MB peak")
+
+def serve_moto(address, stop):
+    '''Runs the moto S3 stand-in until stop is set, sends its (host, port) through address'''
+    from moto.server import ThreadedMotoServer
+    # The stand-in's request log would drown the results
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    moto_server = ThreadedMotoServer(ip_address='127.0.0.1', port=0, verbose=False)
+    moto_server.start()
+    address.put(moto_server.get_host_and_port())
+    stop.wait()
+    moto_server.stop()
+
+def start_http_server(size_kb):
+    '''Serves size_kb of random bytes for any path, the source side of the url transfer benchmark'''
+    body = os.urandom(size_kb * 1024)
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark commons3 and commonheroku against a local moto S3 server")
+    add_common_arguments(parser, BENCHMARKS)
+    parser.add_argument('--objects', type=int, default=500)
+    parser.add_argument('--size-kb', type=int, default=64, help="size of each object")
+    parser.add_argument('--workers', type=int, default=None, help="thread pool size (default: S3_MAX_WORKERS)")
+    args = parser.parse_args()
+
+    if importlib.util.find_spec('moto') is None:
+        parser.exit(1, 'The S3 benchmarks need moto: pip install "moto[server]"\n')
+
+    context = multiprocessing.get_context('spawn')
+    address, stop = context.Queue(), context.Event()
+    moto_process = context.Process(target=serve_moto, args=(address, stop), daemon=True)
+    moto_process.start()
+    endpoint_url = "http://{}:{}".format(*address.get())
+    http_server = start_http_server(args.size_kb)
+    http_url = f"http://127.0.0.1:{http_server.server_port}"
+
+    try:
+        run_benchmarks(args.only or BENCHMARKS, run_benchmark, (endpoint_url, http_url), args, format_row)
+    finally:
+        http_server.shutdown()
+        stop.set()
+        moto_process.join()
+
+if __name__ == '__main__':
+    main()
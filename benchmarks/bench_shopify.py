@@ -0,0 +1,124 @@
+'''
+Offline throughput benchmarks for commonshopify against the local stand-in server.
+
+    python -m benchmarks.bench_shopify --products 5000 --latency 0.05
+    python -m benchmarks.bench_shopify --only products_query inventory_set_zero
+
+Each benchmark runs in a fresh process, its peak memory is measured from just before the
+benchmark starts (see benchmarks.common). Reports objects per second, peak memory and the
+per-call instrumentation totals (calls, throttle wait, retries).
+'''
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.common import add_common_arguments, quiet_output, measure, result_dict, run_benchmarks
+from benchmarks.shopify_mock_server import ShopifyMockServer
+
+SHOP = "benchmark"
+TOKEN = "benchmark-token"
+
+def bench_products_query(commonshopify, args):
+    custom_response = commonshopify.Shopify_get_products_query(shop=SHOP, access_token=TOKEN)
+    return len(custom_response.data) if custom_response.status_code == 200 else 0
+
+def bench_customers_marketing(commonshopify, args):
+    # Count what Shopify_iter_customers actually streams, not what the server holds
+    streamed = [0]
+    iter_customers = commonshopify.Shopify_iter_customers
+
+    def counting_iter_customers(**kwargs):
+        for customer in iter_customers(**kwargs):
+            streamed[0] += 1
+            yield customer
+
+    commonshopify.Shopify_iter_customers = counting_iter_customers
+    try:
+        custom_response = commonshopify.Shopify_get_marketing_customer_list(shop=SHOP, access_token=TOKEN)
+    finally:
+        commonshopify.Shopify_iter_customers = iter_customers
+    return streamed[0] if custom_response.status_code == 200 else 0
+
+def bench_bulk_mutation(commonshopify, args):
+    mutation = '''
+    mutation productUpdate($input: ProductInput!) {
+        productUpdate(input: $input) {
+            product { id }
+            userErrors { field message }
+        }
+    }
+    '''
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, 'bulk_update.jsonl')
+        with open(file_path, 'w') as file:
+            for i in range(args.products):
+                file.write(json.dumps({'input': {'id': f"gid://shopify/Product/{1000000 + i}", 'status': 'ARCHIVED'}}) + '\n')
+        custom_response = commonshopify.Shopify_bulk_update_products(shop=SHOP, access_token=TOKEN, api_version=commonshopify.API_VERSION, file_path=file_path, mutation=mutation)
+    return args.products if custom_response.status_code == 200 else 0
+
+def inventory_item_ids(args):
+    return [f"gid://shopify/InventoryItem/{i}" for i in range(args.inventory_items)]
+
+def bench_inventory_set_zero(commonshopify, args):
+    custom_response = commonshopify.Shopify_set_inventory_to_zero(shop=SHOP, access_token=TOKEN, inventory_item_ids=inventory_item_ids(args), location_id="gid://shopify/Location/1")
+    return args.inventory_items if custom_response.status_code == 200 else 0
+
+def bench_inventory_adjust(commonshopify, args):
+    custom_response = commonshopify.Shopify_reduce_inventory_by_9999(shop=SHOP, access_token=TOKEN, inventory_item_ids=inventory_item_ids(args), location_id="gid://shopify/Location/1")
+    return args.inventory_items if custom_response.status_code == 200 else 0
+
+BENCHMARKS = {
+    'products_query': bench_products_query,
+    'customers_marketing': bench_customers_marketing,
+    'bulk_mutation': bench_bulk_mutation,
+    'inventory_set_zero': bench_inventory_set_zero,
+    'inventory_adjust': bench_inventory_adjust,
+}
+
+def run_benchmark(name, admin_url, args, results):
+    output = quiet_output(args.verbose)
+    from RikPy import commonshopify
+    commonshopify.SHOPIFY_ADMIN_URL = admin_url
+
+    try:
+        with output, commonshopify.Shopify_instrumented() as stats:
+            objects, elapsed, peak_mb = measure(lambda: BENCHMARKS[name](commonshopify, args))
+    except Exception as e:
+        results.put({'benchmark': name, 'error': repr(e)})
+        return
+
+    totals = stats.summary().get('TOTAL', {})
+    results.put(result_dict(name, objects, elapsed, peak_mb,
+                            calls=totals.get('calls', 0),
+                            mb_received=round(totals.get('bytes_received', 0) / (1024 * 1024), 2),
+                            throttle_wait=round(totals.get('throttle_wait', 0), 2),
+                            retries=totals.get('retries', 0)))
+
+def format_row(result):
+    return (f"{result['benchmark']:<20} {result['objects']:>8} objects  {result['seconds']:>8.2f}s  "
+            f"{result['objects_per_second'] or 0:>10.1f} obj/s  {result['peak_memory_mb']:>7.1f}MB peak  "
+            f"{result['calls']:>5} calls  {result['throttle_wait']:>6.2f}s throttled  {result['retries']} retries")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark commonshopify against a local Shopify stand-in")
+    add_common_arguments(parser, BENCHMARKS)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--variants', type=int, default=3)
+    parser.add_argument('--images', type=int, default=2)
+    parser.add_argument('--customers', type=int, default=1000)
+    parser.add_argument('--inventory-items', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument('--bulk-latency', type=float, default=0.0, help="seconds before a bulk operation completes")
+    parser.add_argument('--bucket-size', type=int, default=10000, help="GraphQL cost bucket size")
+    parser.add_argument('--restore-rate', type=int, default=500, help="GraphQL cost points restored per second")
+    args = parser.parse_args()
+
+    server = ShopifyMockServer(products=args.products, variants=args.variants, images=args.images, customers=args.customers,
+                               latency=args.latency, bulk_latency=args.bulk_latency, bucket_size=args.bucket_size,
+                               restore_rate=args.restore_rate)
+    with server:
+        run_benchmarks(args.only or BENCHMARKS, run_benchmark, (server.admin_url,), args, format_row)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+'''
+Helpers shared by the benchmark scripts: every benchmark runs in a fresh spawned process
+that sends one result dict back to the parent, which prints it as a table row or JSON line.
+
+Children started with the spawn context inherit the parent's ru_maxrss, so peak memory is
+measured from the moment reset_peak_memory() is called instead: on Linux the VmHWM high-water
+mark is reset through /proc/self/clear_refs, elsewhere tracemalloc follows the Python heap.
+'''
+import contextlib
+import json
+import multiprocessing
+import os
+import time
+import tracemalloc
+
+MB = 1024 * 1024
+
+def reset_peak_memory():
+    '''Starts the peak memory measurement of the current process from here'''
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+    except OSError:
+        tracemalloc.start()
+
+def peak_memory_mb():
+    '''Peak memory since reset_peak_memory(), in MB'''
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1] / MB
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith('VmHWM:'):
+                # Reported in kB
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def add_common_arguments(parser, benchmarks):
+    parser.add_argument('--only', nargs='+', choices=sorted(benchmarks), help="benchmarks to run (default: all)")
+    parser.add_argument('--json', action='store_true', help="print results as JSON lines")
+    parser.add_argument('--verbose', action='store_true', help="keep the module's own output")
+
+def quiet_output(verbose):
+    '''Lowers RikPy's log level and returns the context that silences stdout, unless verbose'''
+    if verbose:
+        return contextlib.nullcontext()
+    os.environ.setdefault("RIKPY_LOG_LEVEL", "WARNING")
+    return contextlib.redirect_stdout(open(os.devnull, 'w'))
+
+def measure(run):
+    '''Calls run() from a fresh memory baseline, returns (objects, seconds, peak memory MB)'''
+    reset_peak_memory()
+    start = time.perf_counter()
+    objects = run()
+    elapsed = time.perf_counter() - start
+    return objects, elapsed, peak_memory_mb()
+
+def result_dict(name, objects, elapsed, peak_mb, **extra):
+    result = {
+        'benchmark': name,
+        'objects': objects,
+        'seconds': round(elapsed, 3),
+        'objects_per_second': round(objects / elapsed, 1) if elapsed else None,
+        'peak_memory_mb': round(peak_mb, 1)
+    }
+    result.update(extra)
+    return result
+
+def run_benchmarks(names, target, target_args, args, format_row):
+    '''
+    Runs target(name, *target_args, args, results) in a fresh spawned process per benchmark,
+    target puts one result dict on results. Prints each with format_row, or as JSON with --json.
+    '''
+    context = multiprocessing.get_context('spawn')
+    for name in names:
+        results = context.Queue()
+        process = context.Process(target=target, args=(name, *target_args, args, results))
+        process.start()
+        result = results.get()
+        process.join()
+        if args.json:
+            print(json.dumps(result))
+        elif 'error' in result:
+            print(f"{result['benchmark']:<20} failed: {result['error']}")
+        else:
+            print(format_row(result))
@@ -0,0 +1,505 @@
+'''
+Local stand-in for the Shopify Admin API, good enough to exercise commonshopify offline.
+
+Implements GraphQL query cost and the leaky-bucket throttle (THROTTLED errors plus the
+cost extensions), cursor pagination on connections, REST Link pagination with the
+X-Shopify-Shop-Api-Call-Limit header and 429s, staged uploads and bulk operations.
+Store data is generated on the fly from the object index, so large stores cost no memory.
+
+    with ShopifyMockServer(products=5000, latency=0.05) as server:
+        commonshopify.SHOPIFY_ADMIN_URL = server.admin_url
+        ...
+'''
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+class LeakyBucket:
+    def __init__(self, size, leak_rate):
+        self.size = size
+        self.leak_rate = leak_rate
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _leak(self):
+        now = time.monotonic()
+        self.level = max(0.0, self.level - (now - self.updated) * self.leak_rate)
+        self.updated = now
+
+    def take(self, amount):
+        '''Adds amount to the bucket, returns False (and adds nothing) when it doesn't fit'''
+        with self.lock:
+            self._leak()
+            if self.level + amount > self.size:
+                return False
+            self.level += amount
+            return True
+
+    def available(self):
+        with self.lock:
+            self._leak()
+            return self.size - self.level
+
+class ShopifyMockServer:
+    def __init__(self, host='127.0.0.1', port=0, products=1000, variants=3, images=2, customers=1000, collections=50,
+                 collection_size=500, latency=0.0, bulk_latency=0.0, bucket_size=1000, restore_rate=50,
+                 rest_bucket_size=40, rest_leak_rate=2):
+        self.host = host
+        self.port = port
+        self.products = products
+        self.variants = variants
+        self.images = images
+        self.customers = customers
+        self.collections = collections
+        self.collection_size = collection_size
+        self.latency = latency
+        self.bulk_latency = bulk_latency
+        self.graphql_bucket = LeakyBucket(bucket_size, restore_rate)
+        self.rest_bucket = LeakyBucket(rest_bucket_size, rest_leak_rate)
+        self.bulk_operations = {}
+        self.staged_uploads = {}
+        self.lock = threading.Lock()
+        self.httpd = None
+        self.thread = None
+
+    #### LIFECYCLE
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def admin_url(self):
+        '''Value for commonshopify.SHOPIFY_ADMIN_URL'''
+        return self.base_url + "/{shop}/admin/api/{api_version}"
+
+    #### GENERATED STORE DATA
+
+    def product(self, i):
+        product_id = 1000000 + i
+        return {
+            'id': f"gid://shopify/Product/{product_id}",
+            'legacyResourceId': str(product_id),
+            'admin_graphql_api_id': f"gid://shopify/Product/{product_id}",
+            'title': f"Product {i}",
+            'handle': f"product-{i}",
+            'bodyHtml': f"<p>Description of product {i}</p>",
+            'vendor': f"Vendor {i % 20}",
+            'productType': f"Type {i % 5}",
+            'createdAt': '2024-01-01T00:00:00Z',
+            'updatedAt': '2024-06-01T00:00:00Z',
+            'publishedAt': '2024-01-02T00:00:00Z',
+            'templateSuffix': None,
+            'tags': [f"tag{i % 7}", f"tag{i % 11}"],
+            'status': 'ACTIVE',
+            'metafield': {'value': f"2024-0{1 + i % 9}-15T00:00:00+00:00"},
+            'publishedOnPublication': i % 4 != 0,
+            'options': [{'id': f"gid://shopify/ProductOption/{product_id}", 'name': 'Size', 'values': ['S', 'M', 'L']}],
+            'variants': self.connection_items([self.variant(product_id, v) for v in range(self.variants)]),
+            'images': self.connection_items([self.image(product_id, m) for m in range(self.images)])
+        }
+
+    def collection_product(self, i):
+        product = self.product(i)
+        return {'id': product['id'], 'publishedOnPublication': product['publishedOnPublication']}
+
+    def variant(self, product_id, v):
+        variant_id = product_id * 100 + v
+        return {
+            'id': f"gid://shopify/ProductVariant/{variant_id}",
+            'title': f"Variant {v}",
+            'price': '19.99',
+            'presentmentPrices': self.connection_items([{'price': {'amount': '19.99', 'currencyCode': 'EUR'}}]),
+            'barcode': str(variant_id),
+            'sku': f"SKU-{variant_id}",
+            'inventoryPolicy': 'DENY',
+            'compareAtPrice': None,
+            'taxable': True,
+            'inventoryQuantity': 10,
+            'inventoryItem': {
+                'id': f"gid://shopify/InventoryItem/{variant_id}",
+                'requiresShipping': True,
+                'measurement': {'weight': {'value': 1.0, 'unit': 'KILOGRAMS'}}
+            }
+        }
+
+    def image(self, product_id, m):
+        return {
+            'id': f"gid://shopify/ProductImage/{product_id * 100 + m}",
+            'src': f"https://cdn.example.com/{product_id}_{m}.png",
+            'altText': '',
+            'width': 1024,
+            'height': 1024
+        }
+
+    def customer(self, i):
+        return {
+            'id': f"gid://shopify/Customer/{2000000 + i}",
+            'firstName': f"First{i}",
+            'lastName': f"Last{i}",
+            'defaultEmailAddress': {'emailAddress': f"customer{i}@example.com", 'marketingState': 'SUBSCRIBED' if i % 3 == 0 else 'NOT_SUBSCRIBED'},
+            'defaultPhoneNumber': {'phoneNumber': f"+3460000{i:04d}", 'marketingState': 'SUBSCRIBED' if i % 5 == 0 else 'NOT_SUBSCRIBED'} if i % 2 == 0 else None
+        }
+
+    def customer_matches(self, i, search_query):
+        '''
+        The customer search filters the marketing lists rely on, terms are ANDed like Shopify's:
+        accepts_marketing:true|false (email consent) and phone:* (has a phone number)
+        '''
+        customer = self.customer(i)
+        for term in (search_query or '').split():
+            field, _, value = term.partition(':')
+            if field == 'accepts_marketing':
+                subscribed = customer['defaultEmailAddress']['marketingState'] == 'SUBSCRIBED'
+                if subscribed != (value.lower() == 'true'):
+                    return False
+            elif field == 'phone' and value == '*':
+                if not customer['defaultPhoneNumber']:
+                    return False
+        return True
+
+    def customer_search(self, search_query):
+        '''Returns (make, total) over the customers matching search_query'''
+        if not search_query:
+            return self.customer, self.customers
+        matching = [i for i in range(self.customers) if self.customer_matches(i, search_query)]
+        return (lambda n: self.customer(matching[n])), len(matching)
+
+    def collection(self, i):
+        collection_id = 3000000 + i
+        return {
+            'id': f"gid://shopify/Collection/{collection_id}",
+            'legacyResourceId': str(collection_id),
+            'handle': f"collection-{i}",
+            'title': f"Collection {i}",
+            'descriptionHtml': '',
+            'updatedAt': '2024-06-01T00:00:00Z',
+            'sortOrder': 'BEST_SELLING',
+            'templateSuffix': None,
+            'image': None,
+            'productsCount': {'count': self.collection_size},
+            'ruleSet': {'appliedDisjunctively': False, 'rules': [{'column': 'TAG', 'relation': 'EQUALS', 'condition': f"tag-{i}"}]}
+                       if i % 2 == 0 else None,
+            'metafields': self.connection_items([
+                {'id': f"gid://shopify/Metafield/{collection_id * 10 + k}", 'legacyResourceId': str(collection_id * 10 + k),
+                 'namespace': 'custom', 'key': f"key{k}", 'value': f"value{k}", 'type': 'single_line_text_field'}
+                for k in range(3)
+            ])
+        }
+
+    def rest_customer(self, i):
+        node = self.customer(i)
+        return {
+            'id': 2000000 + i,
+            'first_name': node['firstName'],
+            'last_name': node['lastName'],
+            'email': node['defaultEmailAddress']['emailAddress'],
+            'email_marketing_consent': {'state': node['defaultEmailAddress']['marketingState'].lower()}
+        }
+
+    def rest_collection(self, i):
+        node = self.collection(i)
+        return {'id': int(node['legacyResourceId']), 'handle': node['handle'], 'title': node['title']}
+
+    def rest_product(self, i):
+        return {'id': 1000000 + i, 'title': f"Product {i}", 'admin_graphql_api_id': f"gid://shopify/Product/{1000000 + i}", 'status': 'active', 'published_at': None}
+
+    @staticmethod
+    def connection_items(items):
+        return {'edges': [{'node': item, 'cursor': str(n)} for n, item in enumerate(items)], 'nodes': items}
+
+    @staticmethod
+    def page(make, total, first, after):
+        '''One page of a generated connection, cursors being plain offsets'''
+        start = int(after) + 1 if after else 0
+        end = min(total, start + first)
+        items = [make(i) for i in range(start, end)]
+        return {
+            'edges': [{'node': item, 'cursor': str(start + n)} for n, item in enumerate(items)],
+            'nodes': items,
+            'pageInfo': {'hasNextPage': end < total, 'endCursor': str(end - 1) if items else None}
+        }
+
+    #### GRAPHQL
+
+    @staticmethod
+    def query_cost(query, variables):
+        '''Rough requested cost: one point per object a connection may return, plus the root'''
+        cost = 2 + sum(int(n) for n in re.findall(r'first:\s*(\d+)', query))
+        if '$first' in query:
+            cost += int(variables.get('first') or 0)
+        return min(cost, 1000)
+
+    def graphql(self, query, variables):
+        requested_cost = self.query_cost(query, variables)
+        if not self.graphql_bucket.take(requested_cost):
+            return {
+                'errors': [{'message': 'Throttled', 'extensions': {'code': 'THROTTLED'}}],
+                'extensions': {'cost': self.cost_extension(requested_cost, 0)}
+            }
+        data = self.resolve(query, variables)
+        return {'data': data, 'extensions': {'cost': self.cost_extension(requested_cost, requested_cost)}}
+
+    def cost_extension(self, requested_cost, actual_cost):
+        return {
+            'requestedQueryCost': requested_cost,
+            'actualQueryCost': actual_cost or None,
+            'throttleStatus': {
+                'maximumAvailable': float(self.graphql_bucket.size),
+                'currentlyAvailable': int(self.graphql_bucket.available()),
+                'restoreRate': float(self.graphql_bucket.leak_rate)
+            }
+        }
+
+    @staticmethod
+    def argument(query, name, default=None):
+        match = re.search(name + r':\s*(\d+)', query)
+        return int(match.group(1)) if match else default
+
+    def resolve(self, query, variables):
+        first = variables.get('first') or self.argument(query, 'first', 250)
+        after = variables.get('cursor')
+
+        if 'stagedUploadsCreate' in query:
+            return {'stagedUploadsCreate': self.staged_uploads_create(variables)}
+        if 'bulkOperationRunMutation' in query:
+            operation = self.create_bulk_operation('MUTATION', self.staged_uploads.get(variables.get('stagedUploadPath'), 0))
+            return {'bulkOperationRunMutation': {'bulkOperation': {'id': operation['id'], 'status': 'CREATED'}, 'userErrors': []}}
+        if 'bulkOperationRunQuery' in query:
+            operation = self.create_bulk_operation('QUERY', 0, bulk_query=variables.get('query') or query)
+            return {'bulkOperationRunQuery': {'bulkOperation': {'id': operation['id'], 'status': 'CREATED'}, 'userErrors': []}}
+        if 'currentBulkOperation' in query:
+            operation_type = 'MUTATION' if 'MUTATION' in query else 'QUERY'
+            operations = [operation for operation in self.bulk_operations.values() if operation['type'] == operation_type]
+            return {'currentBulkOperation': self.bulk_operation_status(operations[-1]) if operations else None}
+        if re.search(r'\bnode\(id:', query):
+            operation = self.bulk_operations.get(variables.get('id'))
+            return {'node': self.bulk_operation_status(operation) if operation else None}
+        if re.search(r'\bnodes\(ids:', query):
+            return {'nodes': [self.collection(int(gid.rsplit('/', 1)[1]) - 3000000) for gid in variables.get('ids', [])]}
+        if re.search(r'\bcollection\(id:', query):
+            return {'collection': {'products': self.page(self.collection_product, min(self.collection_size, self.products), first, after)}}
+        if re.search(r'\bcollections\(', query):
+            return {'collections': self.page(self.collection, self.collections, first, after)}
+        if re.search(r'\bcustomers\(', query):
+            make, total = self.customer_search(variables.get('query'))
+            return {'customers': self.page(make, total, first, after)}
+        if re.search(r'\bproducts\(', query):
+            return {'products': self.page(self.product, self.products, first, after)}
+        if 'publications' in query:
+            return {'publications': self.connection_items([{'id': 'gid://shopify/Publication/1', 'name': 'Online Store'}])}
+        if 'inventorySetOnHandQuantities' in query:
+            return {'inventorySetOnHandQuantities': {'inventoryAdjustmentGroup': {'id': 'gid://shopify/InventoryAdjustmentGroup/1'}, 'userErrors': []}}
+        if 'inventoryBulkAdjustQuantityAtLocation' in query:
+            adjustments = variables.get('inventoryItemAdjustments', [])
+            return {'inventoryBulkAdjustQuantityAtLocation': {'inventoryLevels': [{'id': a['inventoryItemId'], 'available': 0} for a in adjustments], 'userErrors': []}}
+        if 'fileCreate' in query:
+            return {'fileCreate': {'files': [{'alt': '', 'id': f"gid://shopify/MediaImage/{uuid.uuid4().int % 10**9}", 'createdAt': '2024-01-01T00:00:00Z'}], 'userErrors': []}}
+        # productUpdate, publishableUnpublish, metaobjectUpdate, ...
+        match = re.search(r'(?:mutation|query)[^{]*\{\s*(\w+)', query)
+        return {match.group(1) if match else 'result': {'userErrors': []}}
+
+    def staged_uploads_create(self, variables):
+        targets = []
+        for upload in variables.get('input', []):
+            key = f"tmp/{uuid.uuid4().hex}/{upload.get('filename', 'upload')}"
+            targets.append({
+                'url': self.base_url + '/staged-uploads',
+                'resourceUrl': f"{self.base_url}/staged-uploads/{key}",
+                'parameters': [{'name': 'key', 'value': key}, {'name': 'Content-Type', 'value': upload.get('mimeType', '')}]
+            })
+        return {'stagedTargets': targets, 'userErrors': []}
+
+    #### BULK OPERATIONS
+
+    def create_bulk_operation(self, operation_type, object_count, bulk_query=''):
+        with self.lock:
+            operation_id = f"gid://shopify/BulkOperation/{len(self.bulk_operations) + 1}"
+            operation = {
+                'id': operation_id,
+                'type': operation_type,
+                'created': time.monotonic(),
+                'object_count': object_count,
+                'bulk_query': bulk_query
+            }
+            self.bulk_operations[operation_id] = operation
+        return operation
+
+    def bulk_operation_status(self, operation):
+        done = time.monotonic() - operation['created'] >= self.bulk_latency
+        number = operation['id'].rsplit('/', 1)[1]
+        return {
+            'id': operation['id'],
+            'status': 'COMPLETED' if done else 'RUNNING',
+            'errorCode': None,
+            'completedAt': '2024-01-01T00:00:00Z' if done else None,
+            'objectCount': str(operation['object_count']),
+            'fileSize': None,
+            'url': f"{self.base_url}/bulk-results/{number}.jsonl" if done and operation['type'] == 'QUERY' else None,
+            'partialDataUrl': None
+        }
+
+    def bulk_results(self, number):
+        '''Yields the JSONL lines of a finished bulk query'''
+        operation = self.bulk_operations.get(f"gid://shopify/BulkOperation/{number}")
+        if not operation:
+            return
+        bulk_query = operation['bulk_query']
+        if 'customers' in bulk_query:
+            search = re.search(r'customers\(query:\s*"([^"]*)"', bulk_query)
+            make, total = self.customer_search(search.group(1) if search else None)
+        elif 'collections' in bulk_query:
+            make, total = self.collection, self.collections
+        else:
+            make, total = self.product, self.products
+        for i in range(total):
+            yield (json.dumps(make(i)) + '\n').encode()
+
+    #### REST
+
+    def rest(self, path, query_string):
+        params = parse_qs(query_string)
+        limit = int(params.get('limit', ['50'])[0])
+        offset = int(params.get('page_info', ['0'])[0])
+        listings = {
+            'products.json': ('products', self.rest_product, self.products),
+            'customers.json': ('customers', self.rest_customer, self.customers),
+            'custom_collections.json': ('custom_collections', self.rest_collection, self.collections // 2),
+            'smart_collections.json': ('smart_collections', self.rest_collection, self.collections - self.collections // 2),
+        }
+        name = path.rsplit('/', 1)[-1]
+        match = re.search(r'collections/(\d+)/products\.json$', path)
+        if match:
+            listings[name] = ('products', self.rest_product, min(self.collection_size, self.products))
+        if name == 'shop.json':
+            return {'shop': {'id': 1, 'name': 'Benchmark', 'myshopify_domain': 'benchmark.myshopify.com'}}, None
+        if name == 'locations.json':
+            return {'locations': [{'id': 1, 'name': 'Warehouse'}]}, None
+        if name not in listings:
+            return None, None
+        key, make, total = listings[name]
+        end = min(total, offset + limit)
+        body = {key: [make(i) for i in range(offset, end)]}
+        next_link = None
+        if end < total:
+            next_link = f'<{self.base_url}{path}?limit={limit}&page_info={end}>; rel="next"'
+        return body, next_link
+
+    #### HTTP
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status, body, headers=None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def read_body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return self.rfile.read(length) if length else b''
+
+            def do_POST(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                body = self.read_body()
+                path = urlparse(self.path).path
+                if path.endswith('/graphql.json'):
+                    request = json.loads(body or b'{}')
+                    self.send_json(200, server.graphql(request.get('query', ''), request.get('variables') or {}))
+                elif path == '/staged-uploads':
+                    match = re.search(rb'name="key"\r\n\r\n([^\r]+)', body)
+                    if match:
+                        server.staged_uploads[match.group(1).decode()] = body.count(b'\n{')
+                    self.send_response(201)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                else:
+                    self.send_json(201, {})
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                parsed = urlparse(self.path)
+                match = re.match(r'/bulk-results/(\d+)\.jsonl$', parsed.path)
+                if match:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/jsonl')
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    for line in server.bulk_results(match.group(1)):
+                        self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                    return
+
+                call_limit = f"{int(server.rest_bucket.size - server.rest_bucket.available())}/{server.rest_bucket.size}"
+                if not server.rest_bucket.take(1):
+                    self.send_json(429, {'errors': 'Exceeded 2 calls per second for api client. Reduce request rates to resume uninterrupted service.'},
+                                   {'Retry-After': '1.0', 'X-Shopify-Shop-Api-Call-Limit': call_limit})
+                    return
+                body, next_link = server.rest(parsed.path, parsed.query)
+                if body is None:
+                    self.send_json(404, {'errors': 'Not Found'})
+                    return
+                headers = {'X-Shopify-Shop-Api-Call-Limit': call_limit}
+                if next_link:
+                    headers['Link'] = next_link
+                self.send_json(200, body, headers)
+
+        return Handler
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the Shopify stand-in server in the foreground")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--customers', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+    server = ShopifyMockServer(port=args.port, products=args.products, customers=args.customers, latency=args.latency)
+    server.start()
+    print(f"SHOPIFY_ADMIN_URL={server.admin_url}")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == '__main__':
+    main()